@@ -2,11 +2,17 @@ from flask import Flask
 from flask_cors import CORS
 from routes.employee_routes import employee_bp
 from routes.bill_routes import bill_bp
+import pymongo
 from pymongo import MongoClient
+from pymongo.errors import PyMongoError
 from config import Config
+from indexes import ensure_indexes
+from cli import register_cli
+from utils import compression, metrics
+from utils.mongo import DATABASE, LazyClient, LazyDatabase, client_options
 import os
 
-def create_app():
+def create_app(client=None):
     app = Flask(__name__)
     
     # Configure CORS with environment-specific origins
@@ -19,25 +25,53 @@ def create_app():
         r"/api/*": {
             "origins": allowed_origins,
             "methods": ["GET", "POST", "PUT", "DELETE"],
-            "allow_headers": ["Content-Type"]
+            "allow_headers": ["Content-Type", "If-None-Match", "Idempotency-Key"],
+            "expose_headers": ["ETag", "Idempotent-Replayed"]
         }
     })
     
-    # Initialize MongoDB
-    client = MongoClient(Config.MONGO_URI)
-    app.db = client.bills_management
+    def build_indexes(mongo_client):
+        for collection, error in ensure_indexes(mongo_client[DATABASE]):
+            app.logger.warning("Could not create index on %s: %s", collection, error)
+
+    # MongoDB: the client is created on first use in each worker, see utils/mongo.py
+    if client is None:
+        client = LazyClient(
+            lambda: MongoClient(Config.MONGO_URI, **client_options()),
+            on_connect=build_indexes if Config.ENSURE_INDEXES_ON_STARTUP else None
+        )
+        app.db = LazyDatabase(client)
+    else:
+        app.db = client[DATABASE]
+        if Config.ENSURE_INDEXES_ON_STARTUP:
+            build_indexes(client)
+    metrics.slow_queries.bind(client)
+
+    register_cli(app)
+    if Config.METRICS_ENABLED:
+        metrics.init_app(app)
+    compression.init_app(app)
     
     # Register blueprints with url_prefix
     app.register_blueprint(employee_bp, url_prefix='/api')
     app.register_blueprint(bill_bp, url_prefix='/api')
     
-    @app.route('/')
-    def home():
-        return {"status": "healthy", "message": "API is running"}
-    
+    @app.route('/livez')
+    def livez():
+        # The process serves requests; says nothing about its dependencies
+        return {"status": "ok"}
+
+    @app.route('/readyz')
+    def readyz():
+        try:
+            with pymongo.timeout(Config.READINESS_TIMEOUT_MS / 1000):
+                app.db.command('ping')
+        except PyMongoError as e:
+            return {"status": "unavailable", "error": str(e)}, 503
+        return {"status": "ready"}
+
     return app
 
-app = create_app()
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=int(os.getenv('PORT', 8000)), debug=True) 
\ No newline at end of file
+    create_app().run(host='0.0.0.0', port=int(os.getenv('PORT', 8000)), debug=True)
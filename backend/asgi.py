@@ -0,0 +1,6 @@
+from asgi_app import create_asgi_app
+
+app = create_asgi_app()
+
+if __name__ == "__main__":
+    app.run()
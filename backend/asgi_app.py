@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pymongo
+from quart import Quart, Response, g, request
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+from routes.async_employee_routes import async_employee_bp
+from routes.async_bill_routes import async_bill_bp
+from config import Config
+from indexes import ensure_indexes
+from utils import metrics
+from utils.asgi import compress_response
+from utils.mongo import DATABASE, LazyClient, LazyDatabase, client_options
+import os
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE",
+    "Access-Control-Allow-Headers": "Content-Type, If-None-Match, Idempotency-Key",
+    "Access-Control-Expose-Headers": "ETag, Idempotent-Replayed",
+}
+
+def create_asgi_app(client=None):
+    """The /api routes on Quart and motor, with the same response shapes as create_app()"""
+    app = Quart(__name__)
+
+    allowed_origins = {
+        "http://localhost:5173",  # Local development
+        os.getenv('FRONTEND_URL', '')  # Production frontend
+    }
+
+    @app.after_request
+    async def add_cors_headers(response):
+        origin = request.headers.get('Origin')
+        if origin and origin in allowed_origins and request.path.startswith('/api/'):
+            response.headers["Access-Control-Allow-Origin"] = origin
+            response.headers.update(CORS_HEADERS)
+            response.vary.add('Origin')
+        return response
+
+    @app.before_request
+    async def preflight():
+        if request.method == 'OPTIONS':
+            return '', 204
+
+    # Index builds are one-off admin work, a short-lived sync client is enough
+    def build_indexes():
+        index_client = MongoClient(Config.MONGO_URI, **client_options(listeners=False))
+        try:
+            for collection, error in ensure_indexes(index_client[DATABASE]):
+                app.logger.warning("Could not create index on %s: %s", collection, error)
+        finally:
+            index_client.close()
+
+    # Nothing connects until a worker starts serving; motor binds to its event loop on first use
+    if client is None:
+        app.db = LazyDatabase(LazyClient(lambda: AsyncIOMotorClient(Config.MONGO_URI, **client_options())))
+        if Config.ENSURE_INDEXES_ON_STARTUP:
+            @app.before_serving
+            async def create_indexes():
+                await asyncio.to_thread(build_indexes)
+    else:
+        app.db = client[DATABASE]
+    if Config.METRICS_ENABLED:
+        # explain() for the slow query log runs on its own thread with a sync client
+        metrics.slow_queries.bind(
+            LazyClient(lambda: MongoClient(Config.MONGO_URI, **client_options(listeners=False)))
+        )
+
+        @app.before_request
+        async def start_timer():
+            g.request_started = time.perf_counter()
+
+        @app.after_request
+        async def record_latency(response):
+            # Measured up to the first byte of streamed responses
+            started = g.pop('request_started', None)
+            if started is not None:
+                metrics.record_request(
+                    time.perf_counter() - started,
+                    (metrics.route_label(request.endpoint), request.method, str(response.status_code))
+                )
+            return response
+
+        @app.route('/metrics')
+        async def prometheus_metrics():
+            return Response(metrics.registry.render(), content_type=metrics.PROMETHEUS_MIMETYPE)
+
+    app.after_request(compress_response)
+
+    app.register_blueprint(async_employee_bp, url_prefix='/api')
+    app.register_blueprint(async_bill_bp, url_prefix='/api')
+
+    @app.route('/livez')
+    async def livez():
+        return {"status": "ok"}
+
+    @app.route('/readyz')
+    async def readyz():
+        try:
+            with pymongo.timeout(Config.READINESS_TIMEOUT_MS / 1000):
+                await app.db.command('ping')
+        except PyMongoError as e:
+            return {"status": "unavailable", "error": str(e)}, 503
+        return {"status": "ready"}
+
+    return app
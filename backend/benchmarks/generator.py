@@ -0,0 +1,196 @@
+"""Seeded synthetic employees and bills for benchmarks.
+
+The same seed and scale always produce the same documents, so runs against
+different revisions of the backend are comparable.
+
+    python -m benchmarks.generator --scale 100k --seed 42 --reset
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from models.bill import BillStatus, StatusUpdate
+from services.aging_service import stage_durations
+from services.bill_service import BillService
+from services.employee_service import EmployeeService
+from services.stats_service import StatsService
+from services.status_history_service import StatusHistoryService
+from utils.search_keys import REFERENCE_KEYS, reference_keys
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+# One employee per this many bills
+BILLS_PER_EMPLOYEE = 20
+
+SUB_DIVISIONS = [
+    "Sewarage Sub Division No 1", "W/S Sub Division No 2", "W/S Sub Division No 6",
+    "PH Division Number 3", "Other",
+]
+HOSPITALS = [
+    "Civil Hospital", "District Hospital", "PGIMER", "AIIMS", "Fortis", "Max Hospital",
+    "Apollo", "CMC Ludhiana", "DMC Ludhiana", "Other",
+]
+DESIGNATIONS = ["Junior Engineer", "Clerk", "Sub Divisional Officer", "Helper", "Pump Operator", "Draftsman"]
+FIRST_NAMES = [
+    "Ravi", "Amit", "Sunita", "Harpreet", "Gurpreet", "Anil", "Neha", "Pooja", "Rajesh", "Simran",
+    "Manoj", "Kavita", "Sandeep", "Jaswinder", "Deepak", "Meena", "Vikram", "Asha", "Balwinder", "Nisha",
+]
+LAST_NAMES = ["Kumar", "Singh", "Sharma", "Kaur", "Verma", "Gupta", "Sidhu", "Gill", "Bansal", "Mehta"]
+RELATIONS = ["Spouse", "Son", "Daughter", "Father", "Mother"]
+
+# The usual path of a bill through the office; bills stop at a random step and
+# a share of them are sent back or rejected along the way
+WORKFLOW = [
+    BillStatus.SENT_TO_MS, BillStatus.RECEIVED_FROM_MS, BillStatus.SENT_TO_CO,
+    BillStatus.RECEIVED_FROM_CO, BillStatus.OFFICE_ORDER, BillStatus.VOUCHER_CREATION,
+    BillStatus.VOUCHER_PASSED,
+]
+EXIT_STATUSES = [BillStatus.SENT_BACK, BillStatus.REJECTED]
+START = datetime(2022, 1, 1)
+
+
+def _name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def generate_employees(rng, count):
+    """Yield employee documents with dependents, as EmployeeService stores them"""
+    for n in range(count):
+        employee = EmployeeService._employee_document({
+            "employee_id": f"EMP{n:07d}",
+            "name": _name(rng),
+            "father_name": _name(rng),
+            "designation": rng.choice(DESIGNATIONS),
+            "status": "RETIRED" if rng.random() < 0.15 else "WORKING",
+            "sub_division": rng.choice(SUB_DIVISIONS),
+            "phone": f"98{rng.randrange(10**8):08d}",
+            "dependents": [
+                {"name": _name(rng), "relation": rng.choice(RELATIONS)} for _ in range(rng.randrange(5))
+            ],
+        })
+        employee["created_at"] = employee["updated_at"] = START + timedelta(minutes=n)
+        yield employee
+
+
+def _entry_id(rng):
+    # Same format as an ObjectId string, but reproducible
+    return f"{rng.getrandbits(96):024x}"
+
+
+def _status_history(rng, received_at, sub_division, amount):
+    received = f"Received From {sub_division}"
+    history = [StatusUpdate(received, received_at, "Bill received from subdivision", entry_id=_entry_id(rng)).to_dict()]
+    date = received_at
+    steps = rng.randrange(len(WORKFLOW) + 1)
+    for step, status in enumerate(WORKFLOW[:steps]):
+        date += timedelta(days=rng.randint(1, 20), minutes=rng.randrange(600))
+        if rng.random() < 0.05:
+            status = rng.choice(EXIT_STATUSES)
+        approved = round(amount * rng.uniform(0.6, 1.0), 2) if status == BillStatus.OFFICE_ORDER else None
+        reference = f"REF/{date.year}/{rng.randrange(100000):05d}" if rng.random() < 0.7 else None
+        history.append(StatusUpdate(status.value, date, None, reference, approved, _entry_id(rng)).to_dict())
+        if status in EXIT_STATUSES:
+            break
+    return history, date
+
+
+def generate_bills(rng, employees, count):
+    """Yield bill documents with multi-step status histories.
+
+    employees is a list of (employee_id, name, sub_division, dependents).
+    """
+    span = (datetime(2025, 1, 1) - START).days
+    for n in range(count):
+        employee_id, name, sub_division, dependents = rng.choice(employees)
+        dependent = rng.choice(dependents)
+        received_at = START + timedelta(days=rng.randrange(span), seconds=rng.randrange(86400))
+        treatment_to = received_at - timedelta(days=rng.randint(5, 60))
+        bill = BillService._bill_document({
+            "bill_number": f"MB/{received_at.year}/{n:07d}",
+            "receipt_date": received_at.isoformat(),
+            "employee_id": employee_id,
+            "employee_name": name,
+            "dependent_name": dependent["name"],
+            "relationship": dependent["relation"],
+            "treatment_period_from": (treatment_to - timedelta(days=rng.randint(0, 15))).isoformat(),
+            "treatment_period_to": treatment_to.isoformat(),
+            "amount_claimed": round(rng.lognormvariate(9, 1), 2),
+            "hospital": rng.choice(HOSPITALS),
+        }, sub_division)
+
+        history, updated_at = _status_history(rng, received_at, sub_division, bill["amount_claimed"])
+        latest = history[-1]
+        approved = [entry["approved_amount"] for entry in history if entry["approved_amount"] is not None]
+        bill.update({
+            "created_at": received_at,
+            "updated_at": updated_at,
+            "current_status": latest["status"],
+            "status_history": history,
+            "status_since": latest["date"],
+            "stage_durations": stage_durations(history),
+            "latest_reference_number": latest["reference_number"],
+            "latest_approved_amount": approved[-1] if approved else None,
+            REFERENCE_KEYS: reference_keys(history),
+        })
+        yield bill
+
+
+def _batches(documents, size):
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed_database(db, bills, seed=42, batch_size=5000):
+    """Insert a deterministic data set of the given number of bills.
+
+    Returns the generated employee ids, in insertion order.
+    """
+    rng = random.Random(seed)
+    stats = StatsService(db)
+    history = StatusHistoryService(db)
+    employees = []
+    for batch in _batches(generate_employees(rng, max(bills // BILLS_PER_EMPLOYEE, 50)), batch_size):
+        db.employees.insert_many(batch)
+        employees.extend(
+            (e["employee_id"], e["name"], e["sub_division"], e["dependents"]) for e in batch
+        )
+    for batch in _batches(generate_bills(rng, employees, bills), batch_size):
+        events = history.split_documents(batch)
+        db.bills.insert_many(batch)
+        history.record(events)
+        stats.record_created(batch)
+    return [employee[0] for employee in employees]
+
+
+def main():
+    from pymongo import MongoClient
+    from config import Config
+    from indexes import ensure_indexes
+
+    parser = argparse.ArgumentParser(description="Seed bills_management with synthetic data.")
+    parser.add_argument("--scale", choices=SCALES, default="10k")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="drop existing employees, bills, stats and history first")
+    args = parser.parse_args()
+
+    db = MongoClient(Config.MONGO_URI).bills_management
+    if args.reset:
+        for collection in (
+            "employees", "bills", "bills_archive", "bill_stats", "bill_status_events", "bill_tombstones",
+            "idempotency_keys"
+        ):
+            db.drop_collection(collection)
+    elif db.bills.estimated_document_count() or db.employees.estimated_document_count():
+        parser.error("bills_management is not empty, pass --reset to replace its data")
+    ensure_indexes(db)
+    seed_database(db, SCALES[args.scale], args.seed)
+    print(f"Seeded {SCALES[args.scale]} bills with seed {args.seed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Construction and serialization cost of the model layer.
+
+Builds and serializes the same request payloads through Bill, StatusUpdate
+and Employee and reports seconds per 100k records as JSON. No database is
+needed.
+
+    python -m benchmarks.models --records 100000
+"""
+import argparse
+import json
+import sys
+import time
+
+from models.bill import Bill, StatusUpdate
+from models.employee import Employee
+from services.bill_service import BillService
+from services.employee_service import EmployeeService
+
+PER = 100_000
+
+
+def bill_payload(n):
+    return {
+        "bill_number": f"MB/2024/{n:07d}",
+        "receipt_date": "2024-06-01T10:00:00.000Z",
+        "employee_id": f"EMP{n % 5000:07d}",
+        "employee_name": "Benchmark Employee",
+        "dependent_name": "Benchmark Dependent",
+        "relationship": "Spouse",
+        "treatment_period_from": "2024-05-01",
+        "treatment_period_to": "2024-05-10",
+        "amount_claimed": "12345.50",
+        "hospital": "Civil Hospital",
+    }
+
+
+def status_payload(n):
+    return {
+        "status": "Office Order", "date": "2024-06-10T12:00:00Z", "remarks": "benchmark",
+        "reference_number": f"REF/2024/{n:05d}", "approved_amount": 10000 + n % 100,
+    }
+
+
+def employee_payload(n):
+    return {
+        "employee_id": f"EMP{n:07d}", "name": "Benchmark Employee", "sub_division": "Other",
+        "retirement_date": "2040-01-31", "dependents": [{"name": "Benchmark Dependent", "relation": "Spouse"}],
+    }
+
+
+def new_bill(payload):
+    return Bill(
+        payload['bill_number'], payload['receipt_date'], payload['employee_id'], payload['employee_name'],
+        payload['dependent_name'], payload['relationship'], payload['treatment_period_from'],
+        payload['treatment_period_to'], payload['amount_claimed'], payload['hospital'], "Other"
+    )
+
+
+# name -> (payload builder, model constructor, full stored-document path)
+CASES = {
+    "bill": (bill_payload, new_bill, lambda payload: BillService._bill_document(payload, "Other")),
+    "status_update": (status_payload, StatusUpdate.from_payload, None),
+    "employee": (
+        employee_payload, lambda payload: Employee(**payload), EmployeeService._employee_document
+    ),
+}
+
+
+def per_100k(seconds, records):
+    return round(seconds * PER / records, 3)
+
+
+def measure(build_payload, construct, document, records):
+    payloads = [build_payload(n) for n in range(records)]
+    started = time.perf_counter()
+    instances = [construct(payload) for payload in payloads]
+    constructed = time.perf_counter()
+    for instance in instances:
+        instance.to_dict()
+    serialized = time.perf_counter()
+    result = {
+        "construct_s_per_100k": per_100k(constructed - started, records),
+        "serialize_s_per_100k": per_100k(serialized - constructed, records),
+        "bytes_per_instance": sys.getsizeof(instances[0]),
+    }
+    if document is not None:
+        started = time.perf_counter()
+        for payload in payloads:
+            document(payload)
+        result["stored_document_s_per_100k"] = per_100k(time.perf_counter() - started, records)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time model construction and serialization.")
+    parser.add_argument("--records", type=int, default=PER)
+    parser.add_argument("--only", help="comma separated cases to run")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(CASES)
+    unknown = set(names) - set(CASES)
+    if unknown:
+        parser.error(f"Unknown cases: {', '.join(sorted(unknown))}")
+    report = {
+        "python": sys.version.split()[0],
+        "records": args.records,
+        "cases": {name: measure(*CASES[name], args.records) for name in names},
+    }
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Run the workload suite through the Flask test client and report JSON.
+
+For every workload in benchmarks.workloads the report has p50/p95/p99 latency,
+throughput, status codes and the mean response body size as sent, plus the time create_app() takes and the peak
+RSS of the process. The data set comes from benchmarks.generator, so the same
+--scale and --seed always benchmark the same data. Startup time and memory
+per worker of the real servers are measured by benchmarks/serving_modes.py.
+
+    # in-memory stand-in (needs mongomock, no mongod or network)
+    python -m benchmarks.run --backend memory --scale 10k --output bench.json
+    # local mongod at MONGO_URI; replaces the data in bills_management
+    python -m benchmarks.run --backend mongod --scale 100k --reset
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+# Same as benchmarks.generator.SCALES, which can only be imported once the
+# environment below is set
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_workload(client, ctx, build, iterations):
+    latencies, statuses, errors, sent = [], {}, 0, 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        method, path, options = build(ctx)
+        on_response = options.pop("on_response", None)
+        request_started = time.perf_counter()
+        response = client.open(path, method=method, **options)
+        # Streamed bodies are produced while they are read; compressed ones stay compressed
+        sent += len(response.get_data())
+        latencies.append(time.perf_counter() - request_started)
+        response.close()
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        if response.status_code >= 400:
+            errors += 1
+        if on_response:
+            on_response(response)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda seconds: round(seconds * 1000, 3) if seconds is not None else None
+    return {
+        "requests": iterations,
+        "errors": errors,
+        "status_codes": {str(code): n for code, n in sorted(statuses.items())},
+        "p50_ms": ms(percentile(latencies, 0.50)),
+        "p95_ms": ms(percentile(latencies, 0.95)),
+        "p99_ms": ms(percentile(latencies, 0.99)),
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "throughput_rps": round(iterations / elapsed, 1) if elapsed else None,
+        "mean_body_bytes": round(sent / iterations) if iterations else None,
+    }
+
+
+def open_client(backend):
+    if backend == "memory":
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("--backend memory needs the mongomock package")
+        return mongomock.MongoClient()
+    from pymongo import MongoClient
+    from config import Config
+    return MongoClient(Config.MONGO_URI)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every API route against synthetic data.")
+    parser.add_argument("--backend", choices=("memory", "mongod"), default="memory")
+    parser.add_argument("--scale", choices=SCALES, default="10k")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--iterations", type=int, default=200, help="requests per workload")
+    parser.add_argument("--only", help="comma separated workload names to run")
+    parser.add_argument("--reset", action="store_true", help="replace existing data in bills_management (mongod)")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    # Must be set before the backend modules read their configuration
+    os.environ["ENSURE_INDEXES_ON_STARTUP"] = "false"
+    if args.backend == "memory":
+        # The in-memory stand-in rejects the slow query log's find comment
+        os.environ["SLOW_QUERY_MS"] = "0"
+
+    from app import create_app
+    from benchmarks.generator import seed_database
+    from benchmarks.workloads import WORKLOADS, Context
+    from indexes import ensure_indexes
+
+    mongo = open_client(args.backend)
+    db = mongo.bills_management
+    if args.backend == "mongod":
+        if args.reset:
+            for collection in (
+                "employees", "bills", "bills_archive", "bill_stats", "bill_status_events", "bill_tombstones",
+                "idempotency_keys"
+            ):
+                db.drop_collection(collection)
+        elif db.bills.estimated_document_count() or db.employees.estimated_document_count():
+            parser.error("bills_management is not empty, pass --reset to replace its data")
+    ensure_indexes(db)
+
+    seed_started = time.perf_counter()
+    seed_database(db, SCALES[args.scale], args.seed)
+    seed_seconds = time.perf_counter() - seed_started
+    rss_after_seed = peak_rss_mb()
+
+    app_started = time.perf_counter()
+    app = create_app(mongo)
+    create_app_ms = (time.perf_counter() - app_started) * 1000
+    client = app.test_client()
+    ctx = Context(random.Random(args.seed), db)
+    names = args.only.split(",") if args.only else list(WORKLOADS)
+    unknown = set(names) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"Unknown workloads: {', '.join(sorted(unknown))}")
+
+    results = {}
+    for name in names:
+        results[name] = run_workload(client, ctx, WORKLOADS[name], args.iterations)
+        print(f"{name}: p50 {results[name]['p50_ms']} ms", file=sys.stderr)
+
+    report = {
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "backend": args.backend,
+        "scale": args.scale,
+        "bills": SCALES[args.scale],
+        "seed": args.seed,
+        "iterations": args.iterations,
+        "seed_seconds": round(seed_seconds, 2),
+        "create_app_ms": round(create_app_ms, 2),
+        "rss_after_seed_mb": rss_after_seed,
+        "peak_rss_mb": peak_rss_mb(),
+        "workloads": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Compare requests per second of the WSGI (gunicorn) and ASGI (uvicorn) modes.
+
+Both servers are started against MONGO_URI with the same number of worker
+processes, loaded with the same read-heavy request mix, and measured for
+startup time (until /readyz answers), throughput and memory: resident memory
+summed over the server's process tree and RSS/PSS of each worker, read from
+/proc, so Linux only. PSS splits pages shared with the gunicorn master
+(--preload) between the processes sharing them. Results are printed as JSON,
+including requests per second per MB of RSS so the modes can be compared at
+equal memory.
+
+    python benchmarks/serving_modes.py --workers 2 --concurrency 64 --duration 20
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PATHS = [
+    "/api/bills?limit=50",
+    "/api/bills/stats",
+    "/api/employees",
+    "/api/bills/status/Office%20Order?limit=50",
+]
+
+
+def server_command(mode, port, workers, preload=True):
+    if mode == "asgi":
+        return [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1",
+                "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    return [sys.executable, "-m", "gunicorn", "--bind", f"127.0.0.1:{port}",
+            "--workers", str(workers), "--log-level", "warning", *(["--preload"] if preload else []), "wsgi:app"]
+
+
+def wait_until_ready(port, timeout=30):
+    """Seconds until /readyz answers 200"""
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/readyz")
+            response = conn.getresponse()
+            response.read()
+            if response.status == 200:
+                return time.monotonic() - started
+        except OSError:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError(f"Server on port {port} did not become ready")
+
+
+def _memory_kb(pid, path, field):
+    try:
+        with open(f"/proc/{pid}/{path}") as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def process_children():
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except OSError:
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def tree_rss_mb(pid):
+    """Resident memory of a process and all its descendants"""
+    children = process_children()
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, []))
+        total += _memory_kb(current, "status", "VmRSS:")
+    return round(total / 1024, 1)
+
+
+def worker_memory_mb(pid):
+    """RSS and PSS of each direct child of the server process"""
+    return [
+        {"rss_mb": round(_memory_kb(child, "status", "VmRSS:") / 1024, 1),
+         "pss_mb": round(_memory_kb(child, "smaps_rollup", "Pss:") / 1024, 1)}
+        for child in sorted(process_children().get(pid, []))
+    ]
+
+
+def load(port, concurrency, duration):
+    counts, errors = [0] * concurrency, [0] * concurrency
+    deadline = time.monotonic() + duration
+
+    def worker(index):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        n = index
+        while time.monotonic() < deadline:
+            try:
+                conn.request("GET", PATHS[n % len(PATHS)])
+                response = conn.getresponse()
+                response.read()
+                if response.status == 200:
+                    counts[index] += 1
+                else:
+                    errors[index] += 1
+            except (OSError, http.client.HTTPException):
+                errors[index] += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            n += 1
+        conn.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    return sum(counts), sum(errors), elapsed
+
+
+def run_mode(mode, port, args):
+    env = dict(os.environ, SERVER_MODE=mode, ENSURE_INDEXES_ON_STARTUP="false")
+    process = subprocess.Popen(server_command(mode, port, args.workers, args.preload), cwd=BACKEND_DIR, env=env)
+    try:
+        startup = wait_until_ready(port)
+        load(port, args.concurrency, min(3, args.duration))  # warm up caches and pools
+        requests, errors, elapsed = load(port, args.concurrency, args.duration)
+        rss = tree_rss_mb(process.pid)
+        workers = worker_memory_mb(process.pid)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    rps = requests / elapsed
+    return {
+        "mode": mode,
+        "workers": args.workers,
+        "concurrency": args.concurrency,
+        "requests": requests,
+        "errors": errors,
+        "rps": round(rps, 1),
+        "preload": args.preload if mode == "wsgi" else None,
+        "startup_s": round(startup, 2),
+        "rss_mb": rss,
+        "worker_memory_mb": workers,
+        "rps_per_mb": round(rps / rss, 3) if rss else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", default="wsgi,asgi")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--preload", action=argparse.BooleanOptionalAction, default=True,
+                        help="gunicorn --preload, as run_prod.sh starts it")
+    args = parser.parse_args()
+
+    results = [run_mode(mode, args.port + i, args) for i, mode in enumerate(args.modes.split(","))]
+    json.dump({"mongo_uri": os.environ.get("MONGO_URI", "default"), "paths": PATHS, "results": results},
+              sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""Request mixes covering every route in bill_routes.py and employee_routes.py.
+
+Each workload builds one request per call as (method, path, options) for the
+Flask test client; an optional "on_response" option receives the response.
+Workloads run in the order listed, so the ones that delete or deactivate
+only touch records created by earlier workloads.
+"""
+import json
+from itertools import count
+
+from benchmarks.generator import HOSPITALS, SUB_DIVISIONS
+from models.bill import BillStatus
+
+STATUSES = [status.value for status in BillStatus]
+BULK_ROWS = 100
+# What a browser sends; the fields= workloads measure projection and compression together
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+class Context:
+    """Shared state of one benchmark run: ids to pick from and records created so far"""
+
+    def __init__(self, rng, db, sample_size=1000):
+        self.rng = rng
+        self.bill_ids = [str(bill["_id"]) for bill in db.bills.find({}, {"_id": 1}).limit(sample_size)]
+        self.employee_ids = [
+            employee["employee_id"] for employee in db.employees.find({}, {"employee_id": 1}).limit(sample_size)
+        ]
+        self.created_bills = []
+        self.created_employees = []
+        self.sync_token = None
+        self.sequence = count()
+
+    def bill_id(self):
+        return self.rng.choice(self.bill_ids)
+
+    def employee_id(self):
+        return self.rng.choice(self.employee_ids)
+
+    def unique(self, prefix):
+        return f"{prefix}-{next(self.sequence):07d}"
+
+    def new_bill(self):
+        return {
+            "bill_number": self.unique("BENCH/BILL"),
+            "receipt_date": "2024-06-01T10:00:00",
+            "employee_id": self.employee_id(),
+            "employee_name": "Benchmark Employee",
+            "dependent_name": "Benchmark Dependent",
+            "relationship": "Self",
+            "amount_claimed": round(self.rng.uniform(500, 50000), 2),
+            "hospital": self.rng.choice(HOSPITALS),
+        }
+
+
+def create_employee(ctx):
+    employee_id = ctx.unique("BENCH-EMP")
+    ctx.created_employees.append(employee_id)
+    return "POST", "/api/employees", {"json": {
+        "employee_id": employee_id, "name": "Benchmark Employee",
+        "sub_division": ctx.rng.choice(SUB_DIVISIONS),
+        "dependents": [{"name": "Benchmark Dependent", "relation": "Spouse"}],
+    }}
+
+
+def bulk_create_employees(ctx):
+    rows = [
+        {"employee_id": ctx.unique("BENCH-BULKEMP"), "name": "Bulk Employee", "sub_division": ctx.rng.choice(SUB_DIVISIONS)}
+        for _ in range(BULK_ROWS)
+    ]
+    body = "\n".join(json.dumps(row) for row in rows)
+    return "POST", "/api/employees/bulk", {"data": body, "content_type": "application/x-ndjson"}
+
+
+def list_employees(ctx):
+    return "GET", "/api/employees", {}
+
+
+def list_employees_dropdown(ctx):
+    return "GET", "/api/employees", {"query_string": {"fields": "dropdown"}, "headers": GZIP}
+
+
+def search_employees(ctx):
+    return "GET", "/api/employees", {"query_string": {"name": ctx.rng.choice(["ravi", "kaur", "sin", "harpreet s"])}}
+
+
+def employee_cache_stats(ctx):
+    return "GET", "/api/employees/cache/stats", {}
+
+
+def get_employee(ctx):
+    return "GET", f"/api/employees/{ctx.employee_id()}", {}
+
+
+def update_employee(ctx):
+    return "PUT", f"/api/employees/{ctx.rng.choice(ctx.created_employees)}", {"json": {"phone": "9800000000"}}
+
+
+def deactivate_employee(ctx):
+    return "POST", f"/api/employees/{ctx.rng.choice(ctx.created_employees)}/deactivate", {}
+
+
+def delete_employee(ctx):
+    employee_id = ctx.created_employees.pop() if ctx.created_employees else ctx.unique("BENCH-MISSING")
+    return "DELETE", f"/api/employees/{employee_id}", {}
+
+
+def create_bill(ctx):
+    def remember(response):
+        if response.status_code == 201:
+            ctx.created_bills.append(response.get_json()["id"])
+    return "POST", "/api/bills", {"json": ctx.new_bill(), "on_response": remember}
+
+
+def bulk_create_bills(ctx):
+    body = "\n".join(json.dumps(ctx.new_bill()) for _ in range(BULK_ROWS))
+    return "POST", "/api/bills/bulk", {"data": body, "content_type": "application/x-ndjson"}
+
+
+def list_bills(ctx):
+    return "GET", "/api/bills", {}
+
+
+def list_bills_summary(ctx):
+    return "GET", "/api/bills", {"query_string": {"fields": "summary"}, "headers": GZIP}
+
+
+def list_bills_ndjson(ctx):
+    return "GET", "/api/bills", {"query_string": {"format": "ndjson", "limit": 200}}
+
+
+def bill_stats(ctx):
+    return "GET", "/api/bills/stats", {}
+
+
+def get_bill(ctx):
+    return "GET", f"/api/bills/{ctx.bill_id()}", {}
+
+
+def update_bill(ctx):
+    return "PUT", f"/api/bills/{ctx.bill_id()}", {"json": {"hospital": ctx.rng.choice(HOSPITALS)}}
+
+
+def employee_bills(ctx):
+    return "GET", f"/api/employees/{ctx.employee_id()}/bills", {}
+
+
+def update_bill_status(ctx):
+    return "PUT", f"/api/bills/{ctx.bill_id()}/status", {"json": {
+        "status": ctx.rng.choice(STATUSES), "remarks": "benchmark",
+        "reference_number": ctx.unique("BENCH/REF"),
+    }}
+
+
+def update_bills_status_batch(ctx):
+    return "PUT", "/api/bills/status/batch", {"json": {
+        "bill_ids": [ctx.bill_id() for _ in range(25)], "status": ctx.rng.choice(STATUSES),
+    }}
+
+
+def bills_by_status(ctx):
+    return "GET", f"/api/bills/status/{ctx.rng.choice(STATUSES)}", {}
+
+
+def filter_bills(ctx):
+    filters = ctx.rng.choice([
+        {},
+        {"hospital": ctx.rng.choice(HOSPITALS)},
+        {"employee_id": ctx.employee_id()},
+        {"status": "Received From Subdivision"},
+        {"bill_number": "MB/2023/00"},
+        {"reference_search": {"number": "REF/2024", "status": "Office Order"}},
+        {"date_from": "2023-01-01", "date_to": "2023-06-30", "amount_from": 1000},
+    ])
+    return "POST", "/api/bills/filter", {"json": filters}
+
+
+def filter_bills_summary(ctx):
+    method, path, options = filter_bills(ctx)
+    return method, path, {"json": {**options["json"], "fields": "summary"}, "headers": GZIP}
+
+
+def export_bills(ctx):
+    return "GET", "/api/bills/export", {"query_string": {
+        "format": ctx.rng.choice(["csv", "xlsx"]), "filter": json.dumps({"employee_id": ctx.employee_id()}),
+    }}
+
+
+def employee_profile(ctx):
+    return "GET", f"/api/employees/{ctx.employee_id()}/profile", {}
+
+
+def bill_changes(ctx):
+    # The stream endpoint is left out, it holds the connection for CHANGES_STREAM_SECONDS
+    def remember(response):
+        if response.status_code == 200:
+            ctx.sync_token = response.get_json()["token"]
+    return "GET", "/api/bills/changes", {"query_string": {"since": ctx.sync_token}, "on_response": remember}
+
+
+def bill_aging(ctx):
+    return "GET", "/api/bills/aging", {"query_string": {"threshold_days": ctx.rng.choice([7, 30, 90])}}
+
+
+def bill_cache_stats(ctx):
+    return "GET", "/api/bills/cache/stats", {}
+
+
+def update_status_entry(ctx):
+    return "PUT", f"/api/bills/{ctx.bill_id()}/status/0", {"json": {"remarks": "benchmark edit"}}
+
+
+def delete_bill(ctx):
+    bill_id = ctx.created_bills.pop() if ctx.created_bills else ctx.bill_id()
+    return "DELETE", f"/api/bills/{bill_id}", {}
+
+
+def readiness(ctx):
+    return "GET", "/readyz", {}
+
+
+# name -> request builder, in execution order
+WORKLOADS = {
+    "app.readyz": readiness,
+    "employees.get_employees": list_employees,
+    "employees.get_employees_dropdown": list_employees_dropdown,
+    "employees.search_employees": search_employees,
+    "employees.get_employee": get_employee,
+    "employees.create_employee": create_employee,
+    "employees.bulk_create_employees": bulk_create_employees,
+    "employees.update_employee": update_employee,
+    "employees.deactivate_employee": deactivate_employee,
+    "employees.get_employee_cache_stats": employee_cache_stats,
+    "bills.get_bills": list_bills,
+    "bills.get_bills_summary": list_bills_summary,
+    "bills.get_bills_ndjson": list_bills_ndjson,
+    "bills.get_bill": get_bill,
+    "bills.get_employee_bills": employee_bills,
+    "bills.get_employee_profile": employee_profile,
+    "bills.get_bills_by_status": bills_by_status,
+    "bills.filter_bills": filter_bills,
+    "bills.filter_bills_summary": filter_bills_summary,
+    "bills.get_bill_cache_stats": bill_cache_stats,
+    "bills.export_bills": export_bills,
+    "bills.get_bill_changes": bill_changes,
+    "bills.get_bill_stats": bill_stats,
+    "bills.get_bill_aging": bill_aging,
+    "bills.create_bill": create_bill,
+    "bills.bulk_create_bills": bulk_create_bills,
+    "bills.update_bill": update_bill,
+    "bills.update_bill_status": update_bill_status,
+    "bills.update_bills_status_batch": update_bills_status_batch,
+    "bills.update_status_entry": update_status_entry,
+    "bills.delete_bill": delete_bill,
+    "employees.delete_employee": delete_employee,
+}
@@ -0,0 +1,133 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from config import Config
+from indexes import ensure_indexes, check_query_plans
+from services.aging_service import AgingService
+from services.archive_service import ArchiveService
+from services.bill_service import BillService
+from services.employee_service import EmployeeService
+from services.stats_service import StatsService
+from services.status_history_service import StatusHistoryService
+
+index_cli = AppGroup('indexes', help='Manage MongoDB indexes.')
+
+
+@index_cli.command('ensure')
+def ensure_indexes_command():
+    """Create all registered indexes (idempotent)"""
+    errors = ensure_indexes(current_app.db)
+    for collection, error in errors:
+        click.echo(f"{collection}: {error}", err=True)
+    if errors:
+        raise SystemExit(1)
+    click.echo("Indexes are up to date")
+
+
+@index_cli.command('check')
+def check_indexes_command():
+    """Fail if any service query shape uses COLLSCAN or an in-memory SORT"""
+    failures = check_query_plans(current_app.db)
+    for shape, stages in failures:
+        click.echo(f"{shape}: {' -> '.join(stages)}", err=True)
+    if failures:
+        raise SystemExit(1)
+    click.echo("All query shapes are served by an index")
+
+
+search_cli = AppGroup('search', help='Maintain derived search keys.')
+
+
+@search_cli.command('backfill')
+@click.option('--batch-size', default=500, show_default=True)
+def backfill_search_command(batch_size):
+    """Compute search keys for documents written before they existed"""
+    bills = BillService(current_app.db).backfill_search_keys(batch_size)
+    employees = EmployeeService(current_app.db).backfill_search_keys(batch_size)
+    events = StatusHistoryService(current_app.db).backfill_search_keys(batch_size)
+    click.echo(f"Updated {bills} bills, {employees} employees and {events} status history events")
+
+
+stats_cli = AppGroup('stats', help='Maintain the dashboard summary collection.')
+
+
+@stats_cli.command('rebuild')
+def rebuild_stats_command():
+    """Recompute bill_stats from scratch with an aggregation pipeline"""
+    groups = StatsService(current_app.db).rebuild()
+    click.echo(f"Rebuilt {groups} stats groups")
+
+
+history_cli = AppGroup('history', help='Manage where bill status history is stored.')
+
+
+@history_cli.command('migrate')
+@click.option('--batch-size', default=500, show_default=True)
+@click.option('--summary-size', type=int, help='entries kept on each bill [default: STATUS_SUMMARY_SIZE]')
+def migrate_history_command(batch_size, summary_size):
+    """Move embedded status history into bill_status_events (split layout)"""
+    # Writers must already maintain the events, or pushes to converted bills
+    # would bypass them
+    if Config.STATUS_HISTORY_LAYOUT != 'split':
+        click.echo("Set STATUS_HISTORY_LAYOUT=split on every app server before migrating", err=True)
+        raise SystemExit(1)
+    history = StatusHistoryService(current_app.db, summary_size=summary_size)
+    converted, skipped = history.migrate(batch_size)
+    click.echo(f"Converted {converted} bills")
+    if skipped:
+        click.echo(f"{skipped} bills changed during the migration, run it again to convert them", err=True)
+
+
+aging_cli = AppGroup('aging', help='Maintain the per-status time records used by /bills/aging.')
+
+
+@aging_cli.command('backfill')
+@click.option('--batch-size', default=500, show_default=True)
+def backfill_aging_command(batch_size):
+    """Record stage durations of bills by replaying their status history"""
+    converted, skipped = AgingService(current_app.db).backfill(batch_size)
+    click.echo(f"Recorded stages of {converted} bills")
+    if skipped:
+        click.echo(f"{skipped} bills changed during the backfill, run it again to record them", err=True)
+
+
+archive_cli = AppGroup('archive', help='Move finished bills out of the hot bills collection.')
+
+
+@archive_cli.command('run')
+@click.option('--older-than-days', type=int, help='days since the last write [default: ARCHIVE_AFTER_DAYS]')
+@click.option('--batch-size', default=500, show_default=True)
+def archive_bills_command(older_than_days, batch_size):
+    """Move bills in a terminal status to bills_archive"""
+    archived, skipped = ArchiveService(current_app.db).archive(older_than_days, batch_size)
+    click.echo(f"Archived {archived} bills")
+    if skipped:
+        click.echo(f"{skipped} bills changed during the run and were left in place", err=True)
+
+
+dates_cli = AppGroup('dates', help='Maintain how bill dates are stored.')
+
+
+@dates_cli.command('migrate')
+@click.option('--batch-size', default=500, show_default=True)
+def migrate_dates_command(batch_size):
+    """Convert ISO string bill dates to BSON dates and fill in receipt_month"""
+    converted, skipped = BillService(current_app.db).migrate_dates(batch_size)
+    click.echo(f"Converted {converted} bills")
+    if skipped:
+        click.echo(
+            f"{skipped} bills changed during the migration or hold unparseable dates, run it again to retry them",
+            err=True
+        )
+    elif Config.LEGACY_DATE_STRINGS:
+        click.echo("All bill dates are converted, LEGACY_DATE_STRINGS can be set to false")
+
+
+def register_cli(app):
+    app.cli.add_command(index_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(history_cli)
+    app.cli.add_command(aging_cli)
+    app.cli.add_command(archive_cli)
+    app.cli.add_command(dates_cli)
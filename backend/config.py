@@ -5,5 +5,112 @@ load_dotenv()
 
 class Config:
     MONGO_URI = environ.get('MONGO_URI', 'mongodb://localhost:27017/bills_management')
+
+    # Client pool per worker process; 0 leaves MONGO_MAX_IDLE_TIME_MS and
+    # MONGO_SOCKET_TIMEOUT_MS unlimited
+    MONGO_MAX_POOL_SIZE = int(environ.get('MONGO_MAX_POOL_SIZE', 100))
+    MONGO_MIN_POOL_SIZE = int(environ.get('MONGO_MIN_POOL_SIZE', 0))
+    MONGO_MAX_IDLE_TIME_MS = int(environ.get('MONGO_MAX_IDLE_TIME_MS', 0))
+    MONGO_CONNECT_TIMEOUT_MS = int(environ.get('MONGO_CONNECT_TIMEOUT_MS', 20000))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 30000))
+    MONGO_SOCKET_TIMEOUT_MS = int(environ.get('MONGO_SOCKET_TIMEOUT_MS', 0))
+
+    # Deadline of the Mongo ping behind /readyz
+    READINESS_TIMEOUT_MS = int(environ.get('READINESS_TIMEOUT_MS', 2000))
     PORT = int(environ.get('PORT', 8000))
-    FRONTEND_URL = environ.get('FRONTEND_URL', 'http://localhost:5173') 
\ No newline at end of file
+    FRONTEND_URL = environ.get('FRONTEND_URL', 'http://localhost:5173')
+
+    # 'wsgi' serves app:app with gunicorn, 'asgi' serves asgi:app (Quart + motor) with uvicorn
+    SERVER_MODE = environ.get('SERVER_MODE', 'wsgi').lower()
+
+    # Keyset pagination for list endpoints
+    DEFAULT_PAGE_SIZE = int(environ.get('DEFAULT_PAGE_SIZE', 50))
+    MAX_PAGE_SIZE = int(environ.get('MAX_PAGE_SIZE', 200))
+
+    # Create registered indexes when a worker first connects to Mongo (see indexes.py)
+    ENSURE_INDEXES_ON_STARTUP = environ.get('ENSURE_INDEXES_ON_STARTUP', 'true').lower() == 'true'
+
+    # Rows per insert_many during bulk imports
+    BULK_CHUNK_SIZE = int(environ.get('BULK_CHUNK_SIZE', 1000))
+
+    # Upper bound on bills moved by one batch status update
+    MAX_BATCH_SIZE = int(environ.get('MAX_BATCH_SIZE', 500))
+
+    # Most recent bills included in an employee profile (?limit= overrides, up to MAX_PAGE_SIZE)
+    PROFILE_RECENT_BILLS = int(environ.get('PROFILE_RECENT_BILLS', 10))
+
+    # Documents per cursor batch while streaming bill exports
+    EXPORT_BATCH_SIZE = int(environ.get('EXPORT_BATCH_SIZE', 2000))
+
+    # Bill change feed (/bills/changes): bills per delta, how far behind the newest
+    # write a sync token stops, how long tombstones of deleted bills are kept, and
+    # the poll interval and lifetime of an SSE stream (keep it under the worker timeout)
+    CHANGES_PAGE_SIZE = int(environ.get('CHANGES_PAGE_SIZE', 1000))
+    CHANGES_LAG_SECONDS = int(environ.get('CHANGES_LAG_SECONDS', 5))
+    CHANGES_RETENTION_DAYS = int(environ.get('CHANGES_RETENTION_DAYS', 7))
+    CHANGES_POLL_SECONDS = int(environ.get('CHANGES_POLL_SECONDS', 2))
+    CHANGES_STREAM_SECONDS = int(environ.get('CHANGES_STREAM_SECONDS', 25))
+
+    # /bills/aging: bills waiting longer than AGING_THRESHOLD_DAYS in their current
+    # status are listed as overdue (at most AGING_OVERDUE_LIMIT); reports are cached per worker
+    AGING_THRESHOLD_DAYS = float(environ.get('AGING_THRESHOLD_DAYS', 30))
+    AGING_OVERDUE_LIMIT = int(environ.get('AGING_OVERDUE_LIMIT', 200))
+    AGING_CACHE_TTL = int(environ.get('AGING_CACHE_TTL', 300))
+
+    # Responses to requests sent with an Idempotency-Key are replayed to retries for
+    # IDEMPOTENCY_KEY_TTL_HOURS; a key whose request died unfinished is reusable after
+    # IDEMPOTENCY_LOCK_SECONDS
+    IDEMPOTENCY_KEY_TTL_HOURS = int(environ.get('IDEMPOTENCY_KEY_TTL_HOURS', 24))
+    IDEMPOTENCY_LOCK_SECONDS = int(environ.get('IDEMPOTENCY_LOCK_SECONDS', 60))
+
+    # `flask archive run` moves bills in a terminal status last written more than
+    # ARCHIVE_AFTER_DAYS ago to bills_archive
+    ARCHIVE_AFTER_DAYS = int(environ.get('ARCHIVE_AFTER_DAYS', 180))
+
+    # Bill dates are stored as BSON dates; until `flask dates migrate` has converted the
+    # ISO strings older bills hold, date filters match those too (set to false afterwards)
+    LEGACY_DATE_STRINGS = environ.get('LEGACY_DATE_STRINGS', 'true').lower() == 'true'
+
+    # Caching: 'local' keeps a shared-backend stand-in in process, 'redis' uses CACHE_URL
+    CACHE_BACKEND = environ.get('CACHE_BACKEND', 'none')
+    CACHE_URL = environ.get('CACHE_URL', 'redis://localhost:6379/0')
+    EMPLOYEE_CACHE_SIZE = int(environ.get('EMPLOYEE_CACHE_SIZE', 2048))
+    # Employee entries are keyed by the employees generation. Unless generations are
+    # shared (redis), other workers only see a change once their entries expire, so
+    # entries then only live a few seconds, enough to absorb bursts like an import
+    EMPLOYEE_CACHE_TTL = int(environ.get('EMPLOYEE_CACHE_TTL', 300 if CACHE_BACKEND == 'redis' else 5))
+
+    # ETag/304 support needs shared write generations once there is more than
+    # one worker, so it defaults to on only with the redis backend
+    CONDITIONAL_GET = environ.get(
+        'CONDITIONAL_GET', 'true' if CACHE_BACKEND == 'redis' else 'false'
+    ).lower() == 'true'
+
+    # filter_bills pages cached per worker (and in the shared backend) under the bills
+    # write generation; on by default only when generations are shared, like CONDITIONAL_GET
+    FILTER_CACHE_ENABLED = environ.get(
+        'FILTER_CACHE_ENABLED', 'true' if CACHE_BACKEND == 'redis' else 'false'
+    ).lower() == 'true'
+    FILTER_CACHE_MAX_BYTES = int(environ.get('FILTER_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    FILTER_CACHE_SIZE = int(environ.get('FILTER_CACHE_SIZE', 4096))
+    FILTER_CACHE_TTL = int(environ.get('FILTER_CACHE_TTL', 60))
+
+    # JSON, NDJSON and CSV responses of at least COMPRESSION_MIN_BYTES are sent gzip or,
+    # when the brotli package is installed, brotli compressed
+    COMPRESSION_ENABLED = environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_BYTES = int(environ.get('COMPRESSION_MIN_BYTES', 1024))
+    GZIP_LEVEL = int(environ.get('GZIP_LEVEL', 6))
+    BROTLI_QUALITY = int(environ.get('BROTLI_QUALITY', 5))
+
+    # Per-route and Mongo command metrics at /metrics; filter_bills finds slower
+    # than SLOW_QUERY_MS are logged with their shape and explain() summary (0 disables)
+    METRICS_ENABLED = environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    SLOW_QUERY_MS = int(environ.get('SLOW_QUERY_MS', 500))
+    # With more than one worker, a directory where workers share their metrics so every
+    # scrape covers all of them; run_prod.sh empties it on start
+    PROMETHEUS_MULTIPROC_DIR = environ.get('PROMETHEUS_MULTIPROC_DIR', '')
+
+    # 'split' keeps the last STATUS_SUMMARY_SIZE history entries on each bill and
+    # the full history in bill_status_events; run `flask history migrate` after switching
+    STATUS_HISTORY_LAYOUT = environ.get('STATUS_HISTORY_LAYOUT', 'embedded').lower()
+    STATUS_SUMMARY_SIZE = int(environ.get('STATUS_SUMMARY_SIZE', 5))
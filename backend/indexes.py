@@ -0,0 +1,145 @@
+from datetime import datetime
+
+from bson import ObjectId
+from config import Config
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+# Declarative index registry. Every query issued by BillService and
+# EmployeeService should be served by one of these; keyset pagination
+# sorts on (<field>, _id) so the sort keys end with _id.
+BILL_INDEXES = [
+    IndexModel([("bill_number", ASCENDING)], name="bill_number_unique", unique=True),
+    IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at_id"),
+    IndexModel([("updated_at", DESCENDING), ("_id", DESCENDING)], name="updated_at_id"),
+    IndexModel(
+        [("employee_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+        name="employee_created_at_id"
+    ),
+    IndexModel(
+        [("employee_id", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)],
+        name="employee_updated_at_id"
+    ),
+    IndexModel(
+        [("current_status", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)],
+        name="status_updated_at_id"
+    ),
+    IndexModel(
+        [("hospital", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)],
+        name="hospital_updated_at_id"
+    ),
+    IndexModel(
+        [("receipt_month", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)],
+        name="receipt_month_updated_at_id"
+    ),
+    IndexModel([("receipt_date", ASCENDING)], name="receipt_date"),
+    IndexModel([("status_history.reference_number", ASCENDING)], name="history_reference_number"),
+    IndexModel([("bill_number_keys", ASCENDING)], name="bill_number_keys"),
+    IndexModel([("reference_keys", ASCENDING)], name="reference_keys"),
+]
+
+INDEXES = {
+    "bills": BILL_INDEXES,
+    # Unioned reads run the same queries on the archive
+    "bills_archive": BILL_INDEXES,
+    "bill_status_events": [
+        IndexModel([("bill_id", ASCENDING), ("_id", ASCENDING)], name="bill_id_id"),
+        IndexModel([("bill_id", ASCENDING), ("entry_id", ASCENDING)], name="bill_entry_unique", unique=True),
+        IndexModel([("reference_keys", ASCENDING)], name="reference_keys"),
+    ],
+    "bill_tombstones": [
+        IndexModel(
+            [("deleted_at", ASCENDING)], name="deleted_at_ttl",
+            expireAfterSeconds=Config.CHANGES_RETENTION_DAYS * 24 * 3600
+        ),
+    ],
+    "idempotency_keys": [
+        IndexModel(
+            [("created_at", ASCENDING)], name="created_at_ttl",
+            expireAfterSeconds=Config.IDEMPOTENCY_KEY_TTL_HOURS * 3600
+        ),
+    ],
+    "employees": [
+        IndexModel([("employee_id", ASCENDING)], name="employee_id_unique", unique=True),
+        IndexModel([("name", ASCENDING)], name="name"),
+        IndexModel([("name_keys", ASCENDING), ("name", ASCENDING)], name="name_keys_name"),
+    ],
+}
+
+# Representative (filter, sort) shapes of the service queries, used by the
+# plan check. Values only need the right type, not real data.
+QUERY_SHAPES = [
+    ("bills", "find_one by bill_number", {"bill_number": "B-1"}, None),
+    ("bills", "get_all_bills", {}, [("created_at", -1), ("_id", -1)]),
+    ("bills", "get_bills_by_employee", {"employee_id": "E-1"}, [("created_at", -1), ("_id", -1)]),
+    ("bills", "get_bills_by_status", {"current_status": "Office Order"}, [("updated_at", -1), ("_id", -1)]),
+    ("bills", "filter_bills (no criteria)", {}, [("updated_at", -1), ("_id", -1)]),
+    ("bills", "filter_bills by employee", {"employee_id": "E-1"}, [("updated_at", -1), ("_id", -1)]),
+    ("bills", "filter_bills by hospital", {"hospital": "Other"}, [("updated_at", -1), ("_id", -1)]),
+    (
+        "bills", "filter_bills by receipt months",
+        {"receipt_month": {"$in": ["2024-01", "2024-02"]}, "receipt_date": {"$gte": datetime(2024, 1, 15)}},
+        [("updated_at", -1), ("_id", -1)]
+    ),
+    ("bills", "reference number lookup", {"status_history.reference_number": "R-1"}, None),
+    ("bills", "bill number search", {"bill_number_keys": {"$all": ["b-1", "-12"]}}, None),
+    ("bills", "reference number search", {"reference_keys": "r-1"}, None),
+    ("bills", "change feed", {"updated_at": {"$gte": datetime(2024, 1, 1)}}, [("updated_at", 1), ("_id", 1)]),
+    ("bills_archive", "get_bills_by_status", {"current_status": "Rejected"}, [("updated_at", -1), ("_id", -1)]),
+    ("bills_archive", "employee profile", {"employee_id": "E-1"}, None),
+    ("bill_tombstones", "change feed deletions", {"deleted_at": {"$gte": datetime(2024, 1, 1)}}, None),
+    ("bill_status_events", "full history", {"bill_id": ObjectId()}, [("_id", 1)]),
+    ("bill_status_events", "entry edit", {"bill_id": ObjectId(), "entry_id": "e-1"}, None),
+    ("bill_status_events", "reference search", {"reference_keys": {"$all": ["co/", "o/1"]}}, None),
+    ("employees", "find_one by employee_id", {"employee_id": "E-1"}, None),
+    ("employees", "get_all_employees", {}, [("name", 1)]),
+    ("employees", "search_employees", {"name_keys": "rav"}, [("name", 1)]),
+]
+
+BAD_STAGES = {"COLLSCAN", "SORT"}
+
+
+def ensure_indexes(db):
+    """Create every registered index. Safe to run repeatedly.
+
+    Returns a list of (collection, error) pairs for indexes that could not be
+    built, e.g. a unique index over data that still holds duplicates.
+    """
+    errors = []
+    for collection, models in INDEXES.items():
+        for model in models:
+            try:
+                db[collection].create_indexes([model])
+            except OperationFailure as e:
+                errors.append((collection, f"{model.document['name']}: {e}"))
+    return errors
+
+
+def _plan_stages(plan):
+    """Yield every stage name in an explain() winning plan"""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+
+def check_query_plans(db):
+    """Explain every registered query shape.
+
+    Returns a list of (description, stages) for each shape that still needs a
+    collection scan or an in-memory sort.
+    """
+    failures = []
+    for collection, description, query, sort in QUERY_SHAPES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = cursor.limit(1).explain()
+        stages = list(_plan_stages(explain.get('queryPlanner', {}).get('winningPlan', {})))
+        if BAD_STAGES.intersection(stages):
+            failures.append((f"{collection}: {description}", stages))
+    return failures
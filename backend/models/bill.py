@@ -1,5 +1,9 @@
 from datetime import datetime
 from enum import Enum
+from bson import ObjectId
+from models.fields import (
+    amount_field, apply_parsers, date_field, isoformat, month_of, parse_amount, parse_date
+)
 
 class BillStatus(str, Enum):
     RECEIVED = "Received From Subdivision"
@@ -13,72 +17,132 @@ class BillStatus(str, Enum):
     SENT_BACK = "Sent Back to Subdivision"
     REJECTED = "Rejected"
 
+# Built once; status checks are set lookups
+BILL_STATUSES = frozenset(status.value for status in BillStatus)
+# Bills are not worked on after these
+TERMINAL_STATUSES = (BillStatus.VOUCHER_PASSED.value, BillStatus.REJECTED.value)
+
+
+def validate_status(status):
+    if status not in BILL_STATUSES:
+        raise ValueError(f"Invalid status: {status}")
+    return status
+
+
 class StatusUpdate:
-    def __init__(self, status, date, remarks=None, reference_number=None, approved_amount=None):
+    __slots__ = ('entry_id', 'status', 'date', 'remarks', 'reference_number', 'approved_amount')
+
+    # Parsers for the entry fields that can be edited after the fact
+    EDIT_PARSERS = {"approved_amount": amount_field('approved_amount')}
+
+    def __init__(self, status, date, remarks=None, reference_number=None, approved_amount=None, entry_id=None):
+        # Stable id so one entry can be edited without relying on its position
+        self.entry_id = entry_id or str(ObjectId())
         self.status = status
-        self.date = datetime.fromisoformat(date.replace('Z', '')) if isinstance(date, str) else date
+        # Naive UTC like every stored date, so stages can be subtracted
+        self.date = parse_date(date, 'date')
         self.remarks = remarks
         self.reference_number = reference_number
-        self.approved_amount = approved_amount
+        self.approved_amount = parse_amount(approved_amount, 'approved_amount')
+
+    @classmethod
+    def from_payload(cls, status_data):
+        """A new history entry from a status update request"""
+        return cls(
+            status=validate_status(status_data['status']),
+            date=status_data.get('date') or datetime.utcnow(),
+            remarks=status_data.get('remarks'),
+            reference_number=status_data.get('reference_number'),
+            approved_amount=status_data.get('approved_amount')
+        )
+
+    @classmethod
+    def validate_changes(cls, changes):
+        return apply_parsers(cls.EDIT_PARSERS, changes)
 
     def to_dict(self):
         return {
+            "entry_id": self.entry_id,
             "status": self.status,
-            "date": self.date.isoformat() if self.date else None,
+            "date": isoformat(self.date),
             "remarks": self.remarks,
             "reference_number": self.reference_number,
             "approved_amount": self.approved_amount
         }
 
 class Bill:
-    def __init__(self, bill_number, receipt_date, employee_id, employee_name, dependent_name, 
+    __slots__ = ('bill_number', 'receipt_date', 'employee_id', 'employee_name', 'dependent_name', 'relationship',
+                 'treatment_period_from', 'treatment_period_to', 'amount_claimed', 'hospital', 'sub_division',
+                 'created_at', 'updated_at', 'current_status', 'status_history')
+
+    # Applied to partial updates so they store the same types as new bills
+    UPDATE_PARSERS = {
+        "receipt_date": date_field('receipt_date', required=True),
+        "treatment_period_from": date_field('treatment_period_from'),
+        "treatment_period_to": date_field('treatment_period_to'),
+        "amount_claimed": amount_field('amount_claimed', default=0.0),
+    }
+    # Maintained by the server; clients echo them back from GET
+    READ_ONLY_FIELDS = ('created_at', 'updated_at', 'receipt_month')
+
+    def __init__(self, bill_number, receipt_date, employee_id, employee_name, dependent_name,
                  relationship, treatment_period_from=None, treatment_period_to=None, amount_claimed=None, hospital=None, sub_division="Unknown"):
         self.bill_number = bill_number
-        self.receipt_date = datetime.fromisoformat(receipt_date.replace('Z', '')) if isinstance(receipt_date, str) else receipt_date
+        self.receipt_date = parse_date(receipt_date, 'receipt_date')
+        if self.receipt_date is None:
+            raise ValueError("receipt_date is required")
         self.employee_id = employee_id
         self.employee_name = employee_name
         self.dependent_name = dependent_name
         self.relationship = relationship
-        
+
         # Handle optional treatment period
-        self.treatment_period_from = (
-            datetime.fromisoformat(treatment_period_from.replace('Z', ''))
-            if treatment_period_from and isinstance(treatment_period_from, str)
-            else treatment_period_from
-        )
-        self.treatment_period_to = (
-            datetime.fromisoformat(treatment_period_to.replace('Z', ''))
-            if treatment_period_to and isinstance(treatment_period_to, str)
-            else treatment_period_to
-        )
-        
-        self.amount_claimed = float(amount_claimed) if amount_claimed else 0
+        self.treatment_period_from = parse_date(treatment_period_from, 'treatment_period_from')
+        self.treatment_period_to = parse_date(treatment_period_to, 'treatment_period_to')
+
+        amount = parse_amount(amount_claimed, 'amount_claimed')
+        self.amount_claimed = 0.0 if amount is None else amount
         self.hospital = hospital
-        self.created_at = datetime.utcnow()
-        self.updated_at = datetime.utcnow()
+        self.sub_division = sub_division
+        now = datetime.utcnow()
+        self.created_at = now
+        self.updated_at = now
         self.current_status = f"Received From {sub_division}"
         self.status_history = [
-            StatusUpdate(
-                self.current_status,
-                datetime.utcnow(),
-                "Bill received from subdivision"
-            ).to_dict()
+            StatusUpdate(self.current_status, now, "Bill received from subdivision").to_dict()
         ]
 
+    @classmethod
+    def validate_update(cls, update_data):
+        for field in cls.READ_ONLY_FIELDS:
+            update_data.pop(field, None)
+        apply_parsers(cls.UPDATE_PARSERS, update_data)
+        if 'receipt_date' in update_data:
+            update_data['receipt_month'] = month_of(update_data['receipt_date'])
+        return update_data
+
     def to_dict(self):
         return {
             "bill_number": self.bill_number,
-            "receipt_date": self.receipt_date.isoformat(),
+            "receipt_date": self.receipt_date,
+            # Month bucket, so month ranges are index lookups
+            "receipt_month": month_of(self.receipt_date),
             "employee_id": self.employee_id,
             "employee_name": self.employee_name,
             "dependent_name": self.dependent_name,
             "relationship": self.relationship,
-            "treatment_period_from": self.treatment_period_from.isoformat() if self.treatment_period_from else None,
-            "treatment_period_to": self.treatment_period_to.isoformat() if self.treatment_period_to else None,
+            "treatment_period_from": self.treatment_period_from,
+            "treatment_period_to": self.treatment_period_to,
             "amount_claimed": self.amount_claimed,
             "hospital": self.hospital,
+            "sub_division": self.sub_division,
             "created_at": self.created_at,
             "updated_at": self.updated_at,
             "current_status": self.current_status,
-            "status_history": self.status_history
-        } 
\ No newline at end of file
+            "status_history": self.status_history,
+            # Start of the current status and the time spent in each earlier one
+            "status_since": self.status_history[-1]["date"],
+            "stage_durations": [],
+            # Bumped by every write, clients send it back to detect conflicting edits
+            "version": 1
+        }
@@ -1,5 +1,6 @@
 from datetime import datetime
 from enum import Enum
+from models.fields import apply_parsers, iso_string_field
 
 class EmployeeStatus(str, Enum):
     WORKING = "WORKING"
@@ -17,6 +18,17 @@ class LifeStatus(str, Enum):
 #     OTHER = "Other"
 
 class Employee:
+    __slots__ = ('employee_id', 'name', 'father_name', 'designation', 'status', 'sub_division', 'phone',
+                 'bank_account', 'bank_name', 'bank_branch', 'retirement_date', 'life_status', 'death_date',
+                 'dependents', 'created_at', 'updated_at')
+
+    # Dates stay the YYYY-MM-DD strings the forms send, but must parse
+    DATE_PARSERS = {
+        "retirement_date": iso_string_field('retirement_date'),
+        "death_date": iso_string_field('death_date'),
+    }
+    READ_ONLY_FIELDS = ('created_at', 'updated_at')
+
     def __init__(self, employee_id, name, father_name=None, designation=None, status="WORKING", 
                  sub_division=None, phone=None, bank_account=None, bank_name=None, bank_branch=None,
                  retirement_date=None, life_status="ALIVE", death_date=None, dependents=None):
@@ -34,16 +46,23 @@ class Employee:
         self.bank_account = bank_account
         self.bank_name = bank_name
         self.bank_branch = bank_branch
-        self.retirement_date = retirement_date
+        self.retirement_date = self.DATE_PARSERS["retirement_date"](retirement_date)
         self.life_status = str(life_status)
-        self.death_date = death_date
+        self.death_date = self.DATE_PARSERS["death_date"](death_date)
         # Add employee themselves as first dependent
         self.dependents = [{"name": name, "relation": "Self"}]
         # Add other dependents if provided
         if dependents:
             self.dependents.extend(dependents)
-        self.created_at = datetime.utcnow()
-        self.updated_at = datetime.utcnow()
+        now = datetime.utcnow()
+        self.created_at = now
+        self.updated_at = now
+
+    @classmethod
+    def validate_update(cls, update_data):
+        for field in cls.READ_ONLY_FIELDS:
+            update_data.pop(field, None)
+        return apply_parsers(cls.DATE_PARSERS, update_data)
 
     def to_dict(self):
         return {
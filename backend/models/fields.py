@@ -0,0 +1,83 @@
+import math
+from datetime import datetime, timezone
+
+
+def parse_datetime(value, field):
+    """datetime from a datetime, an ISO 8601 string or {"$date": ...}, None for empty values"""
+    # Strings are the common case, so they are checked first
+    if isinstance(value, str):
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(value[:-1] if value[-1] == 'Z' else value)
+        except ValueError:
+            pass
+    elif value is None or isinstance(value, datetime):
+        return value
+    elif isinstance(value, dict) and list(value) == ['$date']:
+        # Extended JSON, the way bills are served
+        return parse_datetime(value['$date'], field)
+    raise ValueError(f"{field} must be an ISO 8601 date")
+
+
+def parse_date(value, field):
+    """parse_datetime as naive UTC, the way Mongo stores and returns dates"""
+    parsed = parse_datetime(value, field)
+    if parsed is not None and parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def month_of(value):
+    """"YYYY-MM" bucket of a date"""
+    return value.strftime('%Y-%m') if value else None
+
+
+def parse_amount(value, field):
+    """Non-negative float from a number or numeric string, None for empty values"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float, str)) and not isinstance(value, bool):
+        try:
+            amount = float(value)
+        except ValueError:
+            amount = None
+        if amount is not None and math.isfinite(amount) and amount >= 0:
+            return amount
+    raise ValueError(f"{field} must be a non-negative number")
+
+
+def isoformat(value):
+    return value.isoformat() if value else None
+
+
+def date_field(field, required=False):
+    """Parser that normalizes a date field to a datetime, stored as a BSON date"""
+    def parse(value):
+        parsed = parse_date(value, field)
+        if parsed is None and required:
+            raise ValueError(f"{field} is required")
+        return parsed
+    return parse
+
+
+def iso_string_field(field):
+    """Parser that checks a date field but keeps the string as given"""
+    def parse(value):
+        return value if parse_datetime(value, field) is not None else None
+    return parse
+
+
+def amount_field(field, default=None):
+    def parse(value):
+        amount = parse_amount(value, field)
+        return default if amount is None else amount
+    return parse
+
+
+def apply_parsers(parsers, data):
+    """Run the parser of every field present in data, in place"""
+    for field, parse in parsers.items():
+        if field in data:
+            data[field] = parse(data[field])
+    return data
@@ -0,0 +1,300 @@
+from quart import Blueprint, Response, request, jsonify
+from services.async_bill_service import AsyncBillService
+from services.bill_service import BILL_REQUIRED_FIELDS, BillArchivedError, VersionConflictError
+from models.bill import BILL_STATUSES
+from models.fields import parse_amount
+from utils.asgi import conditional, idempotent, rows_from_request, stream_page, json_document
+from utils.changes import SSE_HEADERS, ExpiredTokenError, change_events_async, validate_token
+from utils.export import export_chunks_async, export_writer, parse_filter
+from utils.ingest import IngestError
+from utils.pagination import InvalidCursorError
+from config import Config
+
+async_bill_bp = Blueprint('bills', __name__)
+bill_service = None
+
+@async_bill_bp.record
+def record_params(setup_state):
+    global bill_service
+    app = setup_state.app
+    bill_service = AsyncBillService(app.db)
+
+@async_bill_bp.route('/bills', methods=['POST'])
+@idempotent
+async def create_bill():
+    data = await request.get_json()
+
+    if not all(field in data for field in BILL_REQUIRED_FIELDS):
+        return jsonify({"error": "Missing required fields"}), 400
+
+    try:
+        bill_id = await bill_service.create_bill(data)
+        return jsonify({"message": "Bill created successfully", "id": bill_id}), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_bill_bp.route('/bills/bulk', methods=['POST'])
+async def bulk_create_bills():
+    try:
+        report = await bill_service.bulk_create_bills(await rows_from_request())
+        return jsonify(report), 200 if not report["failed"] else 207
+    except IngestError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_bill_bp.route('/bills', methods=['GET'])
+@conditional('bills')
+async def get_bills():
+    try:
+        # ?include_archived=true also lists bills moved to the archive; ?fields=summary
+        # or ?fields=a,b returns only those fields
+        page = bill_service.get_all_bills(
+            request.args.get('cursor'), request.args.get('limit'), request.args.get('include_archived') == 'true',
+            request.args.get('fields')
+        )
+        return stream_page(page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_bill_bp.route('/bills/stats', methods=['GET'])
+@conditional('bills')
+async def get_bill_stats():
+    try:
+        return jsonify(await bill_service.get_stats()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_bill_bp.route('/bills/changes', methods=['GET'])
+async def get_bill_changes():
+    # ?since=<token>&filter=<json>; without since only a starting token is returned
+    try:
+        changes = await bill_service.get_changes(request.args.get('since'), parse_filter(request.args.get('filter')))
+        return json_document(changes)
+    except ExpiredTokenError as e:
+        return jsonify({"error": str(e)}), 410
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_bill_bp.route('/bills/changes/stream', methods=['GET'])
+async def stream_bill_changes():
+    # EventSource resends the id of the last event it received when reconnecting
+    token = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        filter_data = parse_filter(request.args.get('filter'))
+        validate_token(token)
+    except ExpiredTokenError as e:
+        return jsonify({"error": str(e)}), 410
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return Response(
+        change_events_async(bill_service.get_changes, token, filter_data),
+        mimetype='text/event-stream', headers=SSE_HEADERS
+    )
+
+@async_bill_bp.route('/bills/aging', methods=['GET'])
+async def get_bill_aging():
+    # ?threshold_days= overrides AGING_THRESHOLD_DAYS, ?status= limits the overdue list
+    try:
+        threshold_days = parse_amount(request.args.get('threshold_days'), 'threshold_days')
+        report = await bill_service.aging.report(threshold_days, request.args.get('status'))
+        return json_document(report)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_bill_bp.route('/bills/cache/stats', methods=['GET'])
+async def get_bill_cache_stats():
+    """Hit and miss counters and size of this worker's filter result cache"""
+    return jsonify(bill_service.cache_stats()), 200
+
+@async_bill_bp.route('/bills/<bill_id>', methods=['GET'])
+@conditional('bills')
+async def get_bill(bill_id):
+    try:
+        # ?history=full also loads history kept outside the bill (split layout)
+        bill = await bill_service.get_bill_by_id(bill_id, request.args.get('history') == 'full')
+        if not bill:
+            return jsonify({"error": "Bill not found"}), 404
+        return json_document(bill)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_bill_bp.route('/bills/<bill_id>', methods=['PUT'])
+async def update_bill(bill_id):
+    data = await request.get_json()
+    try:
+        success = await bill_service.update_bill(bill_id, data)
+        if not success:
+            return jsonify({"error": "Bill not found"}), 404
+        return jsonify({"message": "Bill updated successfully"}), 200
+    except VersionConflictError as e:
+        return jsonify({"error": str(e), "version": e.current_version}), 409
+    except BillArchivedError as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_bill_bp.route('/bills/<bill_id>', methods=['DELETE'])
+async def delete_bill(bill_id):
+    try:
+        success = await bill_service.delete_bill(bill_id)
+        if not success:
+            return jsonify({"error": "Bill not found"}), 404
+        return jsonify({"message": "Bill deleted successfully"}), 200
+    except BillArchivedError as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_bill_bp.route('/employees/<employee_id>/bills', methods=['GET'])
+@conditional('bills')
+async def get_employee_bills(employee_id):
+    try:
+        page = bill_service.get_bills_by_employee(
+            employee_id, request.args.get('cursor'), request.args.get('limit'), request.args.get('fields')
+        )
+        return stream_page(page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_bill_bp.route('/employees/<employee_id>/profile', methods=['GET'])
+@conditional('employees', 'bills')
+async def get_employee_profile(employee_id):
+    try:
+        profile = await bill_service.get_employee_profile(employee_id, request.args.get('limit'))
+        if not profile:
+            return jsonify({"error": "Employee not found"}), 404
+        return json_document(profile, extended=False)
+    except InvalidCursorError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_bill_bp.route('/bills/<bill_id>/status', methods=['PUT'])
+async def update_bill_status(bill_id):
+    data = await request.get_json()
+
+    if 'status' not in data:
+        return jsonify({"error": "Status is required"}), 400
+
+    try:
+        success = await bill_service.update_bill_status(bill_id, data)
+        if not success:
+            return jsonify({"error": "Bill not found"}), 404
+        return jsonify({"message": "Bill status updated successfully"}), 200
+    except VersionConflictError as e:
+        return jsonify({"error": str(e), "version": e.current_version}), 409
+    except BillArchivedError as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_bill_bp.route('/bills/status/batch', methods=['PUT'])
+async def update_bills_status_batch():
+    data = await request.get_json() or {}
+    bill_ids = data.pop('bill_ids', None)
+
+    if not bill_ids or not isinstance(bill_ids, list):
+        return jsonify({"error": "bill_ids must be a non-empty list"}), 400
+    if len(bill_ids) > Config.MAX_BATCH_SIZE:
+        return jsonify({"error": f"At most {Config.MAX_BATCH_SIZE} bills can be updated at once"}), 400
+    if 'status' not in data:
+        return jsonify({"error": "Status is required"}), 400
+
+    try:
+        report = await bill_service.update_bills_status_batch(bill_ids, data)
+        return jsonify(report), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_bill_bp.route('/bills/status/<status>', methods=['GET'])
+@conditional('bills')
+async def get_bills_by_status(status):
+    try:
+        if status not in BILL_STATUSES:
+            return jsonify({"error": "Invalid status"}), 400
+
+        page = bill_service.get_bills_by_status(
+            status, request.args.get('cursor'), request.args.get('limit'), request.args.get('fields')
+        )
+        return stream_page(page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_bill_bp.route('/bills/filter', methods=['POST'])
+async def filter_bills():
+    filter_data = await request.get_json() or {}
+    try:
+        page = await bill_service.filter_bills(filter_data)
+        return stream_page(page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_bill_bp.route('/bills/export', methods=['GET', 'POST'])
+async def export_bills():
+    try:
+        filter_data = (await request.get_json() or {}) if request.method == 'POST' else parse_filter(request.args.get('filter'))
+        writer, content_type, filename = export_writer(request.args.get('format', 'csv'))
+        bills = await bill_service.export_bills(filter_data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return Response(
+        export_chunks_async(writer, bills), content_type=content_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@async_bill_bp.route('/bills/<bill_id>/status/<int:status_index>', methods=['PUT'])
+async def update_status_entry(bill_id, status_index):
+    data = await request.get_json()
+    try:
+        success = await bill_service.update_status_entry(bill_id, status_index, data)
+        if not success:
+            return jsonify({"error": "Status entry not found"}), 404
+        return jsonify({"message": "Status entry updated successfully"}), 200
+    except VersionConflictError as e:
+        return jsonify({"error": str(e), "version": e.current_version}), 409
+    except BillArchivedError as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_bill_bp.route('/bills/<bill_id>/status/entries/<entry_id>', methods=['PUT'])
+async def update_status_entry_by_id(bill_id, entry_id):
+    data = await request.get_json()
+    try:
+        success = await bill_service.update_status_entry_by_id(bill_id, entry_id, data)
+        if not success:
+            return jsonify({"error": "Status entry not found"}), 404
+        return jsonify({"message": "Status entry updated successfully"}), 200
+    except VersionConflictError as e:
+        return jsonify({"error": str(e), "version": e.current_version}), 409
+    except BillArchivedError as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
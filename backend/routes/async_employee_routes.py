@@ -0,0 +1,101 @@
+from quart import Blueprint, request, jsonify
+from services.async_employee_service import AsyncEmployeeService
+from services.employee_service import EMPLOYEE_REQUIRED_FIELDS
+from utils.asgi import conditional, idempotent, rows_from_request, json_document, stream_list
+from utils.ingest import IngestError
+
+async_employee_bp = Blueprint('employees', __name__)
+employee_service = None
+
+@async_employee_bp.record
+def record_params(setup_state):
+    global employee_service
+    app = setup_state.app
+    employee_service = AsyncEmployeeService(app.db)
+
+def serialize_employee(employee, status=200):
+    """Serialize an employee document, ObjectId and datetimes become plain strings"""
+    return json_document(employee, status, extended=False)
+
+@async_employee_bp.route('/employees', methods=['POST'])
+@idempotent
+async def create_employee():
+    data = await request.get_json()
+
+    if not all(field in data for field in EMPLOYEE_REQUIRED_FIELDS):
+        return jsonify({"error": "Missing required fields"}), 400
+
+    try:
+        employee_id = await employee_service.create_employee(data)
+        return jsonify({"message": "Employee created successfully", "id": employee_id}), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_employee_bp.route('/employees/bulk', methods=['POST'])
+async def bulk_create_employees():
+    try:
+        report = await employee_service.bulk_create_employees(await rows_from_request())
+        return jsonify(report), 200 if not report["failed"] else 207
+    except IngestError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_employee_bp.route('/employees', methods=['GET'])
+@conditional('employees')
+async def get_employees():
+    name = request.args.get('name', '')
+    try:
+        # ?fields=dropdown or ?fields=a,b returns only those fields
+        fields = request.args.get('fields')
+        if name:
+            employees = await employee_service.search_employees(name, fields)
+        else:
+            employees = await employee_service.get_all_employees(fields)
+
+        return stream_list(employees, extended=False)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_employee_bp.route('/employees/cache/stats', methods=['GET'])
+async def get_employee_cache_stats():
+    """Hit and miss counters of this worker's employee cache"""
+    return jsonify(employee_service.cache_stats()), 200
+
+@async_employee_bp.route('/employees/<employee_id>', methods=['GET'])
+@conditional('employees')
+async def get_employee(employee_id):
+    try:
+        employee = await employee_service.get_employee_by_id(employee_id)
+        if not employee:
+            return jsonify({"error": "Employee not found"}), 404
+        return serialize_employee(employee)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_employee_bp.route('/employees/<employee_id>', methods=['PUT'])
+async def update_employee(employee_id):
+    data = await request.get_json()
+    try:
+        success = await employee_service.update_employee(employee_id, data)
+        if not success:
+            return jsonify({"error": "Employee not found"}), 404
+        return jsonify({"message": "Employee updated successfully"}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@async_employee_bp.route('/employees/<employee_id>', methods=['DELETE'])
+async def delete_employee(employee_id):
+    try:
+        success = await employee_service.delete_employee(employee_id)
+        if not success:
+            return jsonify({"error": "Employee not found"}), 404
+        return jsonify({"message": "Employee deleted successfully"}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
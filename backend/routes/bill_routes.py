@@ -1,8 +1,16 @@
-from flask import Blueprint, request, jsonify
-from services.bill_service import BillService
-from models.bill import BillStatus
-from bson import ObjectId, json_util
-import json
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from services.bill_service import BillArchivedError, BillService, BILL_REQUIRED_FIELDS, VersionConflictError
+from models.bill import BILL_STATUSES
+from models.fields import parse_amount
+from utils.changes import SSE_HEADERS, ExpiredTokenError, change_events, validate_token
+from utils.etag import conditional
+from utils.export import export_chunks, export_writer, parse_filter
+from utils.idempotency import idempotent
+from utils.ingest import IngestError, rows_from_request
+from utils.pagination import InvalidCursorError
+from utils.serialization import stream_page, json_document
+from bson import ObjectId
+from config import Config
 
 bill_bp = Blueprint('bills', __name__)
 bill_service = None
@@ -14,35 +22,110 @@ def record_params(setup_state):
     bill_service = BillService(app.db)
 
 @bill_bp.route('/bills', methods=['POST'])
+@idempotent
 def create_bill():
     data = request.get_json()
-    required_fields = ['bill_number', 'receipt_date', 'employee_id', 'employee_name', 
-                      'dependent_name', 'relationship', 'amount_claimed', 'hospital']
     
-    if not all(field in data for field in required_fields):
+    if not all(field in data for field in BILL_REQUIRED_FIELDS):
         return jsonify({"error": "Missing required fields"}), 400
 
     try:
         bill_id = bill_service.create_bill(data)
         return jsonify({"message": "Bill created successfully", "id": bill_id}), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bill_bp.route('/bills/bulk', methods=['POST'])
+def bulk_create_bills():
+    try:
+        report = bill_service.bulk_create_bills(rows_from_request(request))
+        return jsonify(report), 200 if not report["failed"] else 207
+    except IngestError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @bill_bp.route('/bills', methods=['GET'])
+@conditional('bills')
 def get_bills():
     try:
-        bills = bill_service.get_all_bills()
-        return json.loads(json_util.dumps(bills)), 200
+        # ?include_archived=true also lists bills moved to the archive; ?fields=summary
+        # or ?fields=a,b returns only those fields
+        page = bill_service.get_all_bills(
+            request.args.get('cursor'), request.args.get('limit'), request.args.get('include_archived') == 'true',
+            request.args.get('fields')
+        )
+        return stream_page(page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bill_bp.route('/bills/stats', methods=['GET'])
+@conditional('bills')
+def get_bill_stats():
+    try:
+        return jsonify(bill_service.get_stats()), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@bill_bp.route('/bills/changes', methods=['GET'])
+def get_bill_changes():
+    # ?since=<token>&filter=<json>; without since only a starting token is returned
+    try:
+        changes = bill_service.get_changes(request.args.get('since'), parse_filter(request.args.get('filter')))
+        return json_document(changes)
+    except ExpiredTokenError as e:
+        return jsonify({"error": str(e)}), 410
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bill_bp.route('/bills/changes/stream', methods=['GET'])
+def stream_bill_changes():
+    # EventSource resends the id of the last event it received when reconnecting
+    token = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        filter_data = parse_filter(request.args.get('filter'))
+        validate_token(token)
+    except ExpiredTokenError as e:
+        return jsonify({"error": str(e)}), 410
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return Response(
+        stream_with_context(change_events(bill_service.get_changes, token, filter_data)),
+        mimetype='text/event-stream', headers=SSE_HEADERS
+    )
+
+@bill_bp.route('/bills/aging', methods=['GET'])
+def get_bill_aging():
+    # ?threshold_days= overrides AGING_THRESHOLD_DAYS, ?status= limits the overdue list
+    try:
+        threshold_days = parse_amount(request.args.get('threshold_days'), 'threshold_days')
+        report = bill_service.aging.report(threshold_days, request.args.get('status'))
+        return json_document(report)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bill_bp.route('/bills/cache/stats', methods=['GET'])
+def get_bill_cache_stats():
+    """Hit and miss counters and size of this worker's filter result cache"""
+    return jsonify(bill_service.cache_stats()), 200
+
 @bill_bp.route('/bills/<bill_id>', methods=['GET'])
+@conditional('bills')
 def get_bill(bill_id):
     try:
-        bill = bill_service.get_bill_by_id(bill_id)
+        # ?history=full also loads history kept outside the bill (split layout)
+        bill = bill_service.get_bill_by_id(bill_id, request.args.get('history') == 'full')
         if not bill:
             return jsonify({"error": "Bill not found"}), 404
-        return json.loads(json_util.dumps(bill)), 200
+        return json_document(bill)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -54,6 +137,12 @@ def update_bill(bill_id):
         if not success:
             return jsonify({"error": "Bill not found"}), 404
         return jsonify({"message": "Bill updated successfully"}), 200
+    except VersionConflictError as e:
+        return jsonify({"error": str(e), "version": e.current_version}), 409
+    except BillArchivedError as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -64,14 +153,34 @@ def delete_bill(bill_id):
         if not success:
             return jsonify({"error": "Bill not found"}), 404
         return jsonify({"message": "Bill deleted successfully"}), 200
+    except BillArchivedError as e:
+        return jsonify({"error": str(e)}), 409
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @bill_bp.route('/employees/<employee_id>/bills', methods=['GET'])
+@conditional('bills')
 def get_employee_bills(employee_id):
     try:
-        bills = bill_service.get_bills_by_employee(employee_id)
-        return json.loads(json_util.dumps(bills)), 200
+        page = bill_service.get_bills_by_employee(
+            employee_id, request.args.get('cursor'), request.args.get('limit'), request.args.get('fields')
+        )
+        return stream_page(page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bill_bp.route('/employees/<employee_id>/profile', methods=['GET'])
+@conditional('employees', 'bills')
+def get_employee_profile(employee_id):
+    try:
+        profile = bill_service.get_employee_profile(employee_id, request.args.get('limit'))
+        if not profile:
+            return jsonify({"error": "Employee not found"}), 404
+        return json_document(profile, extended=False)
+    except InvalidCursorError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -87,31 +196,79 @@ def update_bill_status(bill_id):
         if not success:
             return jsonify({"error": "Bill not found"}), 404
         return jsonify({"message": "Bill status updated successfully"}), 200
+    except VersionConflictError as e:
+        return jsonify({"error": str(e), "version": e.current_version}), 409
+    except BillArchivedError as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bill_bp.route('/bills/status/batch', methods=['PUT'])
+def update_bills_status_batch():
+    data = request.get_json() or {}
+    bill_ids = data.pop('bill_ids', None)
+
+    if not bill_ids or not isinstance(bill_ids, list):
+        return jsonify({"error": "bill_ids must be a non-empty list"}), 400
+    if len(bill_ids) > Config.MAX_BATCH_SIZE:
+        return jsonify({"error": f"At most {Config.MAX_BATCH_SIZE} bills can be updated at once"}), 400
+    if 'status' not in data:
+        return jsonify({"error": "Status is required"}), 400
+
+    try:
+        report = bill_service.update_bills_status_batch(bill_ids, data)
+        return jsonify(report), 200
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @bill_bp.route('/bills/status/<status>', methods=['GET'])
+@conditional('bills')
 def get_bills_by_status(status):
     try:
-        if status not in [s.value for s in BillStatus]:
+        if status not in BILL_STATUSES:
             return jsonify({"error": "Invalid status"}), 400
             
-        bills = bill_service.get_bills_by_status(status)
-        return json.loads(json_util.dumps(bills)), 200
+        page = bill_service.get_bills_by_status(
+            status, request.args.get('cursor'), request.args.get('limit'), request.args.get('fields')
+        )
+        return stream_page(page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @bill_bp.route('/bills/filter', methods=['POST'])
 def filter_bills():
-    filter_data = request.get_json()
+    filter_data = request.get_json() or {}
     try:
-        bills = bill_service.filter_bills(filter_data)
-        return json.loads(json_util.dumps(bills)), 200
+        page = bill_service.filter_bills(filter_data)
+        return stream_page(page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@bill_bp.route('/bills/export', methods=['GET', 'POST'])
+def export_bills():
+    # Same payload as /bills/filter: the JSON body of a POST, or ?filter=<json>
+    # on a GET so a plain link can start the download
+    try:
+        filter_data = (request.get_json() or {}) if request.method == 'POST' else parse_filter(request.args.get('filter'))
+        writer, content_type, filename = export_writer(request.args.get('format', 'csv'))
+        bills = bill_service.export_bills(filter_data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return Response(
+        stream_with_context(export_chunks(writer, bills)), content_type=content_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @bill_bp.route('/bills/<bill_id>/status/<int:status_index>', methods=['PUT'])
 def update_status_entry(bill_id, status_index):
     data = request.get_json()
@@ -120,7 +277,28 @@ def update_status_entry(bill_id, status_index):
         if not success:
             return jsonify({"error": "Status entry not found"}), 404
         return jsonify({"message": "Status entry updated successfully"}), 200
+    except VersionConflictError as e:
+        return jsonify({"error": str(e), "version": e.current_version}), 409
+    except BillArchivedError as e:
+        return jsonify({"error": str(e)}), 409
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
-        return jsonify({"error": str(e)}), 500 
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+@bill_bp.route('/bills/<bill_id>/status/entries/<entry_id>', methods=['PUT'])
+def update_status_entry_by_id(bill_id, entry_id):
+    data = request.get_json()
+    try:
+        success = bill_service.update_status_entry_by_id(bill_id, entry_id, data)
+        if not success:
+            return jsonify({"error": "Status entry not found"}), 404
+        return jsonify({"message": "Status entry updated successfully"}), 200
+    except VersionConflictError as e:
+        return jsonify({"error": str(e), "version": e.current_version}), 409
+    except BillArchivedError as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,5 +1,9 @@
-from flask import Blueprint, request, jsonify
-from services.employee_service import EmployeeService
+from flask import Blueprint, current_app, request, jsonify
+from services.employee_service import EmployeeService, EMPLOYEE_REQUIRED_FIELDS
+from utils.etag import conditional
+from utils.idempotency import idempotent
+from utils.ingest import IngestError, rows_from_request
+from utils.serialization import json_document, stream_list
 from bson import ObjectId
 
 employee_bp = Blueprint('employees', __name__)
@@ -11,63 +15,70 @@ def record_params(setup_state):
     app = setup_state.app
     employee_service = EmployeeService(app.db)
 
-def serialize_employee(employee):
-    """Helper function to serialize employee document"""
-    if employee:
-        employee['_id'] = str(employee['_id'])  # Convert ObjectId to string
-        # Convert datetime objects if they exist
-        if 'created_at' in employee and hasattr(employee['created_at'], 'isoformat'):
-            employee['created_at'] = employee['created_at'].isoformat()
-        if 'updated_at' in employee and hasattr(employee['updated_at'], 'isoformat'):
-            employee['updated_at'] = employee['updated_at'].isoformat()
-    return employee
+def serialize_employee(employee, status=200):
+    """Serialize an employee document, ObjectId and datetimes become plain strings"""
+    return json_document(employee, status, extended=False)
 
 @employee_bp.route('/employees', methods=['POST'])
+@idempotent
 def create_employee():
     data = request.get_json()
-    required_fields = ['employee_id', 'name']
     
-    if not all(field in data for field in required_fields):
+    if not all(field in data for field in EMPLOYEE_REQUIRED_FIELDS):
         return jsonify({"error": "Missing required fields"}), 400
 
     try:
-        # Print received data for debugging
-        print("Received employee data:", data)
         employee_id = employee_service.create_employee(data)
         return jsonify({"message": "Employee created successfully", "id": employee_id}), 201
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error creating employee: {str(e)}")  # Add logging
+        current_app.logger.exception("Error creating employee")
+        return jsonify({"error": str(e)}), 500
+
+@employee_bp.route('/employees/bulk', methods=['POST'])
+def bulk_create_employees():
+    try:
+        report = employee_service.bulk_create_employees(rows_from_request(request))
+        return jsonify(report), 200 if not report["failed"] else 207
+    except IngestError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        current_app.logger.exception("Error importing employees")
         return jsonify({"error": str(e)}), 500
 
 @employee_bp.route('/employees', methods=['GET'])
+@conditional('employees')
 def get_employees():
     name = request.args.get('name', '')
     try:
+        # ?fields=dropdown or ?fields=a,b returns only those fields
+        fields = request.args.get('fields')
         if name:
-            employees = employee_service.search_employees(name)
+            employees = employee_service.search_employees(name, fields)
         else:
-            employees = employee_service.get_all_employees()
-        
-        # Format response and ensure dependents are included
-        formatted_employees = []
-        for emp in employees:
-            emp['_id'] = str(emp['_id'])
-            formatted_employees.append(emp)
-            
-        return jsonify(formatted_employees), 200
+            employees = employee_service.get_all_employees(fields)
+
+        return stream_list(employees, extended=False)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error fetching employees: {str(e)}")  # Add logging
+        current_app.logger.exception("Error fetching employees")
         return jsonify({"error": str(e)}), 500
 
+@employee_bp.route('/employees/cache/stats', methods=['GET'])
+def get_employee_cache_stats():
+    """Hit and miss counters of this worker's employee cache"""
+    return jsonify(employee_service.cache_stats()), 200
+
 @employee_bp.route('/employees/<employee_id>', methods=['GET'])
+@conditional('employees')
 def get_employee(employee_id):
     try:
         employee = employee_service.get_employee_by_id(employee_id)
         if not employee:
             return jsonify({"error": "Employee not found"}), 404
-        return jsonify(serialize_employee(employee)), 200
+        return serialize_employee(employee)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -79,6 +90,8 @@ def update_employee(employee_id):
         if not success:
             return jsonify({"error": "Employee not found"}), 404
         return jsonify({"message": "Employee updated successfully"}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -100,5 +113,5 @@ def delete_employee(employee_id):
             return jsonify({"error": "Employee not found"}), 404
         return jsonify({"message": "Employee deleted successfully"}), 200
     except Exception as e:
-        print(f"Error deleting employee: {str(e)}")
+        current_app.logger.exception("Error deleting employee")
         return jsonify({"error": str(e)}), 500 
\ No newline at end of file
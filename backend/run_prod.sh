@@ -1,2 +1,15 @@
 #!/bin/bash
-gunicorn --bind 0.0.0.0:$PORT wsgi:app 
\ No newline at end of file
+# SERVER_MODE=asgi serves the Quart/motor app with uvicorn, otherwise Flask runs under gunicorn.
+# Both honour WEB_CONCURRENCY for the number of worker processes. gunicorn imports the
+# app once in the master (--preload); workers connect to Mongo on their first request.
+# With several workers, set PROMETHEUS_MULTIPROC_DIR so /metrics covers all of them; the
+# directory is emptied here, so counters restart with the server.
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+    exec uvicorn asgi:app --host 0.0.0.0 --port $PORT --workers ${WEB_CONCURRENCY:-1}
+else
+    exec gunicorn --preload --bind 0.0.0.0:$PORT wsgi:app
+fi
@@ -0,0 +1,457 @@
+"""Time spent by bills in each status, and bills waiting longer than an SLA.
+
+Every status transition records the stage it closes on the bill
+(stage_durations) and when the current stage began (status_since), so a report
+reads a few fields per bill. Bills written before that have no
+stage_durations; their status_history is replayed until `flask aging backfill`
+has recorded their stages, from bill_status_events for split bills. The
+arithmetic runs on NumPy arrays over all bills at once.
+"""
+import asyncio
+import warnings
+from datetime import datetime
+from itertools import chain
+
+import numpy as np
+from pymongo import UpdateOne
+from config import Config
+from models.bill import TERMINAL_STATUSES, BillStatus
+from models.fields import parse_date
+from services.status_history_service import SPLIT, StatusHistoryService
+from utils.cache import LRUCache
+from utils.generations import generations
+from utils.ingest import chunked
+
+# Bills are received from their own sub-division, stored as "Received From <name>"
+RECEIVED = BillStatus.RECEIVED.value
+# Time spent after these is not waiting time
+CLOSED_STATUSES = TERMINAL_STATUSES
+STATUS_ORDER = {status.value: position for position, status in enumerate(BillStatus)}
+PERCENTILES = (50, 90, 95)
+DAY = 86400.0
+
+RECORDED = {"stage_durations": {"$exists": True}}
+LEGACY = {"stage_durations": {"$exists": False}}
+
+
+def _column(array, field, default):
+    """An array field of a list of subdocuments as one value per element, in order"""
+    return {"$map": {
+        "input": {"$ifNull": [array, []]}, "as": "item", "in": {"$ifNull": [f"$$item.{field}", default]}
+    }}
+
+
+# Reports read columns rather than documents: each bill comes back with its
+# stages (or legacy history entries) as parallel arrays ready for NumPy
+BILL_COLUMNS = {"bill_number": 1, "sub_division": 1, "current_status": 1}
+RECORDED_PIPELINE = [
+    {"$match": RECORDED},
+    {"$project": {
+        **BILL_COLUMNS, "status_since": 1,
+        "stage_statuses": _column("$stage_durations", "status", ""),
+        "stage_seconds": _column("$stage_durations", "seconds", {"$literal": float("nan")}),
+    }},
+]
+LEGACY_PIPELINE = [
+    {"$match": LEGACY},
+    {"$project": {
+        **BILL_COLUMNS, "history_layout": 1,
+        "entry_statuses": _column("$status_history", "status", ""),
+        "entry_dates": _column("$status_history", "date", None),
+    }},
+]
+# History entries of split legacy bills, whose status_history is only a summary
+EVENT_FIELDS = {"_id": 0, "bill_id": 1, "status": 1, "date": 1}
+
+aging_cache = LRUCache("bill_aging", max_entries=64, ttl=Config.AGING_CACHE_TTL)
+
+
+def _timestamp(value):
+    # Naive ISO strings and datetimes parse as UTC; a trailing Z would only add a warning
+    if isinstance(value, str) and value.endswith('Z'):
+        return value[:-1]
+    return value
+
+
+def _seconds(values):
+    """Epoch seconds of ISO strings or datetimes, NaN where missing or unparseable"""
+    with warnings.catch_warnings():
+        # Explicit offsets are converted to UTC, which is what we want
+        warnings.simplefilter('ignore', DeprecationWarning)
+        try:
+            stamps = np.array(values, dtype='datetime64[ms]')
+        except ValueError:
+            stamps = np.array([_parse_or_nat(value) for value in values], dtype='datetime64[ms]')
+    seconds = stamps.astype('int64').astype(float) / 1000
+    seconds[np.isnat(stamps)] = np.nan
+    return seconds
+
+
+def _parse_or_nat(value):
+    try:
+        return np.datetime64(value, 'ms')
+    except ValueError:
+        return np.datetime64('NaT')
+
+
+def stage_labels(statuses):
+    """Fold the per-sub-division "Received From ..." statuses into one stage"""
+    labels = np.array(statuses, dtype=object)
+    if len(labels):
+        received = np.char.startswith(labels.astype(str), "Received From ")
+        labels[received] = RECEIVED
+    return labels
+
+
+def replay(entry_bills, dates):
+    """Stage boundaries of flattened status histories, entries in history order.
+
+    dates are the entries' epoch seconds. Returns (closed, last): closed holds,
+    per entry, the seconds until the next entry of the same bill (NaN for each
+    bill's last entry), and last marks the entry that opened each bill's
+    current stage.
+    """
+    entry_bills = np.asarray(entry_bills)
+    closed = np.full(len(dates), np.nan)
+    last = np.ones(len(dates), dtype=bool)
+    if len(dates) > 1:
+        same_bill = entry_bills[1:] == entry_bills[:-1]
+        closed[:-1] = np.where(same_bill, dates[1:] - dates[:-1], np.nan)
+        last[:-1] = ~same_bill
+    return closed, last
+
+
+def _grouped_percentiles(groups, values):
+    """{group: (count, percentiles..., max)} in days, groups sorted and split once"""
+    if not len(values):
+        return {}
+    order = np.argsort(groups, kind='stable')
+    groups, values = groups[order], values[order] / DAY
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    result = {}
+    for group, segment in zip(groups[starts], np.split(values, starts[1:])):
+        result[int(group)] = (
+            len(segment), *np.round(np.percentile(segment, PERCENTILES), 2), round(float(segment.max()), 2)
+        )
+    return result
+
+
+def _percentile_row(stats):
+    count, *percentiles, maximum = stats
+    row = {"bills": count}
+    row.update({f"p{p}_days": float(value) for p, value in zip(PERCENTILES, percentiles)})
+    row["max_days"] = maximum
+    return row
+
+
+def _concatenate(arrays, dtype):
+    return np.concatenate(arrays).astype(dtype) if arrays else np.empty(0, dtype=dtype)
+
+
+def _flatten(bills, field):
+    """(per-bill counts, flattened values) of an array column"""
+    counts = np.fromiter((len(bill[field]) for bill in bills), dtype=np.int64, count=len(bills))
+    return counts, chain.from_iterable(bill[field] for bill in bills)
+
+
+class AgingRows:
+    """Accumulates batches of projected bills into flat columns for one report"""
+
+    def __init__(self):
+        self.ids, self.numbers, self.sub_divisions, self.statuses = [], [], [], []
+        # Stages recorded on the bill at each transition
+        self.stage_bills, self.stage_statuses, self.stage_seconds = [], [], []
+        # Start of the current stage of recorded bills
+        self.open_bills, self.open_since = [], []
+        # History entries of bills without recorded stages
+        self.entry_bills, self.entry_statuses, self.entry_dates = [], [], []
+
+    def _add_bills(self, bills):
+        """Append the bill columns, returns the row index of each bill"""
+        start = len(self.ids)
+        self.ids.extend(bill["_id"] for bill in bills)
+        self.numbers.extend(bill.get("bill_number") for bill in bills)
+        self.sub_divisions.extend(bill.get("sub_division") or "Unknown" for bill in bills)
+        self.statuses.extend(bill.get("current_status") or "Unknown" for bill in bills)
+        return np.arange(start, len(self.ids), dtype=np.int64)
+
+    def add_recorded(self, bills):
+        """Bills read with RECORDED_PIPELINE"""
+        index = self._add_bills(bills)
+        counts, statuses = _flatten(bills, "stage_statuses")
+        self.stage_bills.append(np.repeat(index, counts))
+        self.stage_statuses.extend(status or "Unknown" for status in statuses)
+        self.stage_seconds.append(np.fromiter(_flatten(bills, "stage_seconds")[1], dtype=float, count=counts.sum()))
+        self.open_bills.append(index)
+        self.open_since.extend(_timestamp(bill.get("status_since")) for bill in bills)
+
+    def add_replayed(self, bills):
+        """Bills read with LEGACY_PIPELINE, entries in history order"""
+        index = self._add_bills(bills)
+        counts, statuses = _flatten(bills, "entry_statuses")
+        self.entry_bills.append(np.repeat(index, counts))
+        self.entry_statuses.extend(status or "Unknown" for status in statuses)
+        self.entry_dates.extend(_timestamp(date) for date in _flatten(bills, "entry_dates")[1])
+
+    def _stages(self, now):
+        """(bills, statuses, seconds) of closed stages and (bills, seconds) of open ones"""
+        entry_dates = _seconds(self.entry_dates)
+        entry_bills = _concatenate(self.entry_bills, np.int64)
+        closed, last = replay(entry_bills, entry_dates)
+        replayed = ~np.isnan(closed)
+        stage_bills = np.concatenate([_concatenate(self.stage_bills, np.int64), entry_bills[replayed]])
+        stage_statuses = np.concatenate([
+            np.asarray(self.stage_statuses, dtype=object), np.asarray(self.entry_statuses, dtype=object)[replayed]
+        ])
+        stage_seconds = np.concatenate([_concatenate(self.stage_seconds, float), closed[replayed]])
+
+        open_bills = np.concatenate([_concatenate(self.open_bills, np.int64), entry_bills[last]])
+        since = np.concatenate([_seconds(self.open_since), entry_dates[last]])
+        open_seconds = _seconds([now])[0] - since
+        return (stage_bills, stage_statuses, stage_seconds), (open_bills, open_seconds)
+
+    def report(self, now, threshold_days, status=None):
+        current = stage_labels(self.statuses)
+        (stage_bills, stage_statuses, stage_seconds), (open_bills, open_seconds) = self._stages(now)
+        waiting = ~np.isin(current[open_bills], CLOSED_STATUSES) & ~np.isnan(open_seconds)
+        open_bills, open_seconds = open_bills[waiting], open_seconds[waiting]
+
+        bills = np.concatenate([stage_bills, open_bills])
+        labels = np.concatenate([stage_labels(stage_statuses), current[open_bills]]).astype(str)
+        seconds = np.concatenate([stage_seconds, open_seconds])
+        valid = ~np.isnan(seconds)
+        bills, labels, seconds = bills[valid], labels[valid], np.maximum(seconds[valid], 0)
+
+        # Total time per (bill, stage), a bill can pass through a stage more than once
+        names, codes = np.unique(labels, return_inverse=True)
+        keys, inverse = np.unique(bills * len(names) + codes, return_inverse=True)
+        totals = np.bincount(inverse, weights=seconds, minlength=len(keys))
+        key_bills, key_stages = keys // len(names), keys % len(names)
+
+        sub_division_names, sub_division_codes = np.unique(
+            np.asarray(self.sub_divisions, dtype=str), return_inverse=True
+        )
+        by_status = _grouped_percentiles(key_stages, totals)
+        by_sub_division = _grouped_percentiles(sub_division_codes[key_bills] * len(names) + key_stages, totals)
+
+        def stage_order(code):
+            return STATUS_ORDER.get(names[code], len(STATUS_ORDER)), names[code]
+
+        threshold = threshold_days * DAY
+        overdue = open_seconds > threshold
+        if status:
+            overdue &= current[open_bills] == stage_labels([status])[0]
+        overdue_bills, overdue_seconds = open_bills[overdue], open_seconds[overdue]
+        order = np.argsort(-overdue_seconds, kind='stable')[:Config.AGING_OVERDUE_LIMIT]
+
+        return {
+            "generated_at": now.isoformat(),
+            "threshold_days": threshold_days,
+            "statuses": [
+                {"status": str(names[code]), **_percentile_row(by_status[code])}
+                for code in sorted(by_status, key=stage_order)
+            ],
+            "sub_divisions": [
+                {
+                    "sub_division": str(sub_division_names[group // len(names)]),
+                    "status": str(names[group % len(names)]),
+                    **_percentile_row(stats)
+                }
+                for group, stats in sorted(
+                    by_sub_division.items(),
+                    key=lambda item: (sub_division_names[item[0] // len(names)], stage_order(item[0] % len(names)))
+                )
+            ],
+            "overdue": {
+                "count": int(overdue.sum()),
+                "bills": [
+                    {
+                        "_id": self.ids[index],
+                        "bill_number": self.numbers[index],
+                        "sub_division": self.sub_divisions[index],
+                        "current_status": self.statuses[index],
+                        "days_in_status": round(float(days) / DAY, 2),
+                    }
+                    for index, days in zip(overdue_bills[order].tolist(), overdue_seconds[order])
+                ],
+            },
+        }
+
+
+def _stage_records(entries, closed):
+    """stage_durations of one bill from its replayed history"""
+    return [
+        {"status": entry.get("status"), "seconds": max(float(seconds), 0.0)}
+        for entry, seconds in zip(entries, closed)
+        if not np.isnan(seconds)
+    ]
+
+
+def stage_durations(entries):
+    """stage_durations of one bill's full status history"""
+    dates = _seconds([_timestamp(entry.get("date")) for entry in entries])
+    closed, _ = replay(np.zeros(len(entries), dtype=np.int64), dates)
+    return _stage_records(entries, closed)
+
+
+class AgingService:
+    def __init__(self, db, cache=aging_cache):
+        self.db = db
+        self.cache = cache
+
+    @staticmethod
+    def transition_operations(before, entry):
+        """Record the stage each bill leaves when a status entry is pushed.
+
+        before are the bills as they were just before the transition. Bills
+        without recorded stages are left for the backfill, which replays them.
+        Dates compare as naive UTC, whatever offset they were sent with; runs
+        after the bills are written, so it must not raise.
+        """
+        left = parse_date(entry["date"], "date")
+        operations = []
+        for bill in before:
+            try:
+                since = parse_date(bill.get("status_since"), "status_since")
+            except ValueError:
+                since = None
+            if since is None:
+                continue
+            stage = {"status": bill.get("current_status"), "seconds": max((left - since).total_seconds(), 0.0)}
+            operations.append(UpdateOne({"_id": bill["_id"], **RECORDED}, {"$push": {"stage_durations": stage}}))
+        return operations
+
+    def record_transitions(self, before, entry):
+        operations = self.transition_operations(before, entry)
+        if operations:
+            self.db.bills.bulk_write(operations, ordered=False)
+
+    @staticmethod
+    def _cache_key(threshold_days, status):
+        generation, = generations.current("bills")
+        return f"{generation}:{threshold_days}:{status or ''}"
+
+    def _reads(self):
+        # Archived bills are closed but their stages still count
+        for collection in (self.db.bills, self.db.bills_archive):
+            yield collection, RECORDED_PIPELINE, True
+            yield collection, LEGACY_PIPELINE, False
+
+    @staticmethod
+    def _add(rows, bills, recorded, summarized):
+        """Add a batch of projected bills; split legacy bills are set aside in summarized"""
+        if recorded:
+            rows.add_recorded(bills)
+            return
+        summarized.extend(bill for bill in bills if bill.get("history_layout") == SPLIT)
+        rows.add_replayed([bill for bill in bills if bill.get("history_layout") != SPLIT])
+
+    @staticmethod
+    def _add_with_events(rows, bills, events):
+        """Add split legacy bills to rows with their full history, events sorted by _id"""
+        histories = {}
+        for event in events:
+            histories.setdefault(event["bill_id"], []).append(event)
+        rows.add_replayed([
+            {
+                **bill,
+                "entry_statuses": [event.get("status") for event in histories.get(bill["_id"], [])],
+                "entry_dates": [event.get("date") for event in histories.get(bill["_id"], [])],
+            }
+            for bill in bills
+        ])
+
+    def report(self, threshold_days=None, status=None):
+        """Dwell-time percentiles per status and sub-division, and the bills over threshold_days"""
+        threshold_days = Config.AGING_THRESHOLD_DAYS if threshold_days is None else threshold_days
+        key = self._cache_key(threshold_days, status)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        rows, summarized = AgingRows(), []
+        for collection, pipeline, recorded in self._reads():
+            cursor = collection.aggregate(pipeline, batchSize=Config.EXPORT_BATCH_SIZE)
+            for bills in chunked(cursor, Config.EXPORT_BATCH_SIZE):
+                self._add(rows, bills, recorded, summarized)
+        for bills in chunked(summarized, Config.EXPORT_BATCH_SIZE):
+            events = self.db.bill_status_events.find(
+                {"bill_id": {"$in": [bill["_id"] for bill in bills]}}, EVENT_FIELDS
+            ).sort("_id", 1)
+            self._add_with_events(rows, bills, events)
+        report = rows.report(datetime.utcnow(), threshold_days, status)
+        self.cache.set(key, report)
+        return report
+
+    def backfill(self, batch_size=500):
+        """Record the stages of bills written before transitions recorded them.
+
+        Returns (converted, skipped); skipped bills changed while their batch
+        was replayed and are picked up by the next run.
+        """
+        history = StatusHistoryService(self.db)
+        converted = skipped = 0
+        last_id = None
+        while True:
+            query = dict(LEGACY)
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            bills = list(
+                self.db.bills.find(query, {"status_history": 1, "history_layout": 1, "version": 1})
+                .sort("_id", 1).limit(batch_size)
+            )
+            if not bills:
+                break
+            histories = [history.load_full(bill).get("status_history") or [] for bill in bills]
+            entry_bills = [index for index, entries in enumerate(histories) for _ in entries]
+            entry_dates = [_timestamp(entry.get("date")) for entries in histories for entry in entries]
+            closed, _ = replay(entry_bills, _seconds(entry_dates))
+
+            updates, start = [], 0
+            for bill, entries in zip(bills, histories):
+                stages = _stage_records(entries, closed[start:start + len(entries)])
+                start += len(entries)
+                version = bill.get("version", 0)
+                updates.append(UpdateOne(
+                    {"_id": bill["_id"], "version": version if version else {"$in": [0, None]}, **LEGACY},
+                    {"$set": {
+                        "stage_durations": stages,
+                        "status_since": entries[-1].get("date") if entries else None,
+                    }}
+                ))
+            modified = self.db.bills.bulk_write(updates, ordered=False).modified_count
+            converted += modified
+            skipped += len(bills) - modified
+            last_id = bills[-1]["_id"]
+        if converted:
+            generations.bump("bills")
+        return converted, skipped
+
+
+class AsyncAgingService(AgingService):
+    """AgingService on an async (motor) database; the backfill runs on the sync service"""
+
+    async def record_transitions(self, before, entry):
+        operations = self.transition_operations(before, entry)
+        if operations:
+            await self.db.bills.bulk_write(operations, ordered=False)
+
+    async def report(self, threshold_days=None, status=None):
+        threshold_days = Config.AGING_THRESHOLD_DAYS if threshold_days is None else threshold_days
+        key = self._cache_key(threshold_days, status)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        rows, summarized = AgingRows(), []
+        for collection, pipeline, recorded in self._reads():
+            cursor = collection.aggregate(pipeline, batchSize=Config.EXPORT_BATCH_SIZE)
+            while bills := await cursor.to_list(Config.EXPORT_BATCH_SIZE):
+                self._add(rows, bills, recorded, summarized)
+        for bills in chunked(summarized, Config.EXPORT_BATCH_SIZE):
+            events = await self.db.bill_status_events.find(
+                {"bill_id": {"$in": [bill["_id"] for bill in bills]}}, EVENT_FIELDS
+            ).sort("_id", 1).to_list(None)
+            self._add_with_events(rows, bills, events)
+        # The NumPy part is CPU bound, keep it off the event loop
+        report = await asyncio.to_thread(rows.report, datetime.utcnow(), threshold_days, status)
+        self.cache.set(key, report)
+        return report
@@ -0,0 +1,77 @@
+"""Hot/archive tiering of bills that are no longer worked on.
+
+Bills in a terminal status that were last written more than ARCHIVE_AFTER_DAYS
+ago are moved from bills to bills_archive, so listings, status pages and the
+working set only cover bills still in progress. BillService reads the archive
+too when a request can match archived bills; they stay fetchable by id and are
+still counted by the stats and aging reports.
+"""
+from datetime import datetime, timedelta
+
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+from config import Config
+from models.bill import TERMINAL_STATUSES
+from utils.generations import generations
+
+
+def archivable_query(cutoff):
+    return {"current_status": {"$in": list(TERMINAL_STATUSES)}, "updated_at": {"$lt": cutoff}}
+
+
+class ArchiveService:
+    def __init__(self, db):
+        self.db = db
+
+    def archive(self, older_than_days=None, batch_size=500):
+        """Move archivable bills to bills_archive in batches.
+
+        Each batch is copied before it is removed from bills, so an interrupted
+        run leaves bills in both tiers (reads show them once) and never in
+        neither. Returns (archived, skipped); skipped bills changed while their
+        batch was copied and stay in bills until the next run. Bills deleted
+        meanwhile are neither.
+        """
+        days = Config.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        archived = skipped = 0
+        last_id = None
+        while True:
+            query = archivable_query(cutoff)
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            bills = list(self.db.bills.find(query).sort("_id", 1).limit(batch_size))
+            if not bills:
+                break
+            last_id = bills[-1]["_id"]
+            ids = [bill["_id"] for bill in bills]
+
+            self.db.bills_archive.bulk_write(
+                [ReplaceOne({"_id": bill["_id"]}, bill, upsert=True) for bill in bills], ordered=False
+            )
+            deleted = self.db.bills.bulk_write([
+                DeleteOne({"_id": bill["_id"], "version": bill.get("version") or {"$in": [0, None]}})
+                for bill in bills
+            ], ordered=False).deleted_count
+            changed = {bill["_id"] for bill in self.db.bills.find({"_id": {"$in": ids}}, {"_id": 1})}
+            gone = [bill_id for bill_id in ids if bill_id not in changed]
+            removed = set()
+            if deleted < len(gone):
+                # Some bills were deleted through the API after they were read;
+                # their copies would bring them back next to their tombstones
+                removed = {tombstone["_id"] for tombstone in self.db.bill_tombstones.find(
+                    {"_id": {"$in": gone}, "archived": {"$ne": True}}, {"_id": 1}
+                )}
+            if changed or removed:
+                self.db.bills_archive.delete_many({"_id": {"$in": list(changed | removed)}})
+            moved = [bill_id for bill_id in gone if bill_id not in removed]
+            if moved:
+                # Lets synced clients drop the bills from their (hot) lists
+                now = datetime.utcnow()
+                self.db.bill_tombstones.bulk_write([
+                    UpdateOne({"_id": bill_id}, {"$set": {"deleted_at": now, "archived": True}}, upsert=True)
+                    for bill_id in moved
+                ], ordered=False)
+                generations.bump("bills")
+            archived += len(moved)
+            skipped += len(changed)
+        return archived, skipped
@@ -0,0 +1,20 @@
+from services.async_employee_service import AsyncEmployeeService
+from services.aging_service import AsyncAgingService
+from services.bill_service import BillService
+from services.stats_service import AsyncStatsService
+from services.status_history_service import AsyncStatusHistoryService
+from utils.steps import AsyncIO
+
+
+class AsyncBillService(AsyncIO, BillService):
+    """BillService on an async (motor) database.
+
+    Every method is inherited; AsyncIO swaps in the motor I/O hooks and the
+    collaborators below are their motor versions, so the Mongo round trips are
+    awaited. Listing methods return an AsyncPage.
+    """
+
+    stats_service = AsyncStatsService
+    employee_service = AsyncEmployeeService
+    history_service = AsyncStatusHistoryService
+    aging_service = AsyncAgingService
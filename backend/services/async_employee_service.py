@@ -0,0 +1,10 @@
+from services.employee_service import EmployeeService
+from utils.steps import AsyncIO
+
+
+class AsyncEmployeeService(AsyncIO, EmployeeService):
+    """EmployeeService on an async (motor) database.
+
+    Every method is inherited; AsyncIO only swaps in the motor I/O hooks, so
+    the Mongo round trips are awaited.
+    """
@@ -1,22 +1,194 @@
-from datetime import datetime
+import hashlib
+import json
+import re
+from datetime import datetime, timedelta
 
-from flask import jsonify
-from models.bill import Bill, BillStatus, StatusUpdate
+from models.bill import TERMINAL_STATUSES, Bill, StatusUpdate
+from models.fields import isoformat, month_of, parse_date
+import bson
 from bson import ObjectId
+from config import Config
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from services.aging_service import AgingService
+from services.employee_service import EmployeeService, HIDDEN_FIELDS as EMPLOYEE_HIDDEN_FIELDS
+from services.stats_service import StatsService, STATS_PROJECTION
+from services.status_history_service import SPLIT, StatusHistoryService
+from utils.changes import changed_query, check_expiry, decode_token, encode_token, horizon, next_token
+from utils.cache import LRUCache, get_backend
+from utils.generations import generations
+from utils.export import EXPORT_PROJECTION
+from utils.metrics import SLOW_QUERY_COMMENT
+from utils.ingest import chunked, missing_fields
+from utils.pagination import clamp_page_size
+from utils.projection import parse_fields, projection
+from utils.search_keys import (
+    BILL_NUMBER_KEYS, REFERENCE_KEYS, search_keys, reference_keys, substring_query, substring_regex, key_match,
+    backfill_keys
+)
+from utils.steps import SyncIO, steps
 
-class BillService:
-    def __init__(self, db):
+# Derived search keys are internal and never returned to clients
+HIDDEN_FIELDS = {BILL_NUMBER_KEYS: 0, REFERENCE_KEYS: 0}
+
+# Named fields= views of the list endpoints; summary has what the bill list shows
+BILL_VIEWS = {
+    "summary": (
+        "_id", "amount_claimed", "bill_number", "current_status", "dependent_name", "employee_id", "employee_name",
+        "latest_approved_amount", "latest_reference_number", "receipt_date", "relationship", "updated_at", "version"
+    ),
+}
+
+BILL_REQUIRED_FIELDS = ['bill_number', 'receipt_date', 'employee_id', 'employee_name',
+                        'dependent_name', 'relationship', 'amount_claimed', 'hospital']
+
+# Bill fields read before a status transition: stats deltas and the stage being left
+TRANSITION_PROJECTION = {**STATS_PROJECTION, "status_since": 1}
+# What a batch status write is conditional on, besides the transition fields
+BATCH_PROJECTION = {**TRANSITION_PROJECTION, "version": 1, "history_layout": 1}
+
+# History entry fields that can be edited after the fact
+STATUS_ENTRY_FIELDS = ['reference_number', 'approved_amount', 'remarks']
+
+# Bill fields shown in the recent bills of an employee profile; ids are plain
+# strings so the whole profile serializes like an employee document
+PROFILE_BILL_PROJECTION = {
+    "_id": {"$toString": "$_id"}, "bill_number": 1, "receipt_date": 1, "dependent_name": 1,
+    "relationship": 1, "hospital": 1, "amount_claimed": 1, "current_status": 1,
+    "latest_approved_amount": 1, "created_at": 1, "updated_at": 1
+}
+
+
+def _amount_totals(key):
+    return {"$group": {
+        "_id": key,
+        "count": {"$sum": 1},
+        "amount_claimed": {"$sum": {"$convert": {"input": "$amount_claimed", "to": "double", "onError": 0, "onNull": 0}}},
+        "approved_amount": {"$sum": {"$convert": {"input": "$latest_approved_amount", "to": "double", "onError": 0, "onNull": 0}}}
+    }}
+
+
+# filter_data keys that take part in the query, see BillService._filter_query
+FILTER_FIELDS = (
+    'bill_number', 'employee_id', 'status', 'date_from', 'date_to', 'month_from', 'month_to', 'hospital'
+)
+AMOUNT_FILTER_FIELDS = ('amount_from', 'amount_to')
+DATE_FIELDS = ('receipt_date', 'treatment_period_from', 'treatment_period_to')
+# Longest receipt date range still queried month by month
+MAX_MONTH_BUCKETS = 36
+MONTH_PATTERN = re.compile(r'^(\d{4})-(0[1-9]|1[0-2])$')
+
+
+def _parse_month(value, field):
+    match = MONTH_PATTERN.match(str(value))
+    if not match:
+        raise ValueError(f"{field} must be a YYYY-MM month")
+    return datetime(int(match.group(1)), int(match.group(2)), 1)
+
+
+def _add_months(value, count):
+    """First day of the month count months after the month of value"""
+    month = value.month - 1 + count
+    return datetime(value.year + month // 12, month % 12 + 1, 1)
+
+
+def _receipt_range(filter_data):
+    """(start, end) of the receipt dates a filter_bills payload asks for; end is exclusive"""
+    bounds = []
+    if filter_data.get('date_from'):
+        bounds.append((parse_date(filter_data['date_from'], 'date_from'), None))
+    if filter_data.get('date_to'):
+        date_to = parse_date(filter_data['date_to'], 'date_to')
+        if len(str(filter_data['date_to'])) == 10:
+            # A bare date includes the whole day
+            bounds.append((None, date_to + timedelta(days=1)))
+        else:
+            # Stored dates keep milliseconds, so this is date_to inclusive
+            bounds.append((None, date_to.replace(microsecond=date_to.microsecond // 1000 * 1000)
+                           + timedelta(milliseconds=1)))
+    if filter_data.get('month_from'):
+        bounds.append((_parse_month(filter_data['month_from'], 'month_from'), None))
+    if filter_data.get('month_to'):
+        bounds.append((None, _add_months(_parse_month(filter_data['month_to'], 'month_to'), 1)))
+    starts = [start for start, _ in bounds if start is not None]
+    ends = [end for _, end in bounds if end is not None]
+    return max(starts, default=None), min(ends, default=None)
+
+
+def _month_condition(start, end):
+    """receipt_month condition covering [start, end).
+
+    Short ranges list their months, so a sort on updated_at merges one
+    receipt_month_updated_at_id scan per month instead of sorting in memory.
+    """
+    last = month_of(end - timedelta(milliseconds=1)) if end is not None else None
+    if start is not None and end is not None:
+        months, month = [], _add_months(start, 0)
+        while month < end and len(months) <= MAX_MONTH_BUCKETS:
+            months.append(month_of(month))
+            month = _add_months(month, 1)
+        if len(months) <= MAX_MONTH_BUCKETS:
+            return {'$in': months}
+    condition = {}
+    if start is not None:
+        condition['$gte'] = month_of(start)
+    if last is not None:
+        condition['$lte'] = last
+    return condition
+
+
+def _page_bytes(value):
+    """BSON size of a cached (items, next_cursor) page"""
+    items, next_cursor = value
+    return sum(len(bson.encode(item)) for item in items) + len(next_cursor or '')
+
+
+# The same views ("all bills Sent to Circle Office", this month's receipts) are
+# opened by many users, so filter_bills pages are cached under the bills write
+# generation; any write makes every older entry unreachable.
+filter_cache = LRUCache(
+    "bill_filters",
+    max_entries=Config.FILTER_CACHE_SIZE,
+    ttl=Config.FILTER_CACHE_TTL,
+    backend=get_backend(Config.CACHE_BACKEND, Config.CACHE_URL),
+    max_bytes=Config.FILTER_CACHE_MAX_BYTES,
+    sizeof=_page_bytes
+)
+
+
+class VersionConflictError(Exception):
+    """The bill was written by someone else after the client read it"""
+
+    def __init__(self, current_version):
+        super().__init__("Bill was modified by another user, reload it and try again")
+        self.current_version = current_version
+
+
+class BillArchivedError(Exception):
+    """The bill was moved to bills_archive, which is read-only"""
+
+    def __init__(self):
+        super().__init__("Bill is archived and can no longer be changed")
+
+
+class BillService(SyncIO):
+    # Collaborators, swapped for their motor versions by AsyncBillService
+    stats_service = StatsService
+    employee_service = EmployeeService
+    history_service = StatusHistoryService
+    aging_service = AgingService
+
+    def __init__(self, db, filter_cache=filter_cache):
         self.db = db
+        self.filter_cache = filter_cache if Config.FILTER_CACHE_ENABLED else None
+        self.stats = self.stats_service(db)
+        self.employees = self.employee_service(db)
+        self.history = self.history_service(db)
+        self.aging = self.aging_service(db)
 
-    def create_bill(self, bill_data):
-        bill_number = bill_data['bill_number']
-        if self.db.bills.find_one({"bill_number": bill_number}):
-            return jsonify({"error": "Bill number already exists"}), 400
-        
-        # Get employee details to fetch sub_division
-        employee = self.db.employees.find_one({"employee_id": bill_data['employee_id']})
-        sub_division = employee.get('sub_division', 'Unknown') if employee else 'Unknown'
-        
+    @staticmethod
+    def _bill_document(bill_data, sub_division):
+        """Build the stored document for a new bill, including its search keys"""
         bill = Bill(
             bill_number=bill_data['bill_number'],
             receipt_date=bill_data['receipt_date'],
@@ -24,92 +196,645 @@ class BillService:
             employee_name=bill_data['employee_name'],
             dependent_name=bill_data['dependent_name'],
             relationship=bill_data['relationship'],
-            treatment_period_from=bill_data['treatment_period_from'],
-            treatment_period_to=bill_data['treatment_period_to'],
+            treatment_period_from=bill_data.get('treatment_period_from'),
+            treatment_period_to=bill_data.get('treatment_period_to'),
             amount_claimed=bill_data['amount_claimed'],
             hospital=bill_data['hospital'],
             sub_division=sub_division
         )
+        bill_doc = bill.to_dict()
+        bill_doc[BILL_NUMBER_KEYS] = search_keys(bill.bill_number)
+        bill_doc[REFERENCE_KEYS] = reference_keys(bill.status_history)
+        return bill_doc
+
+    @steps
+    def create_bill(self, bill_data):
+        """Insert one bill; duplicate bill numbers are rejected by the unique index"""
+        # Archived bill numbers stay taken, the index only covers bills
+        if (yield self.db.bills_archive.find_one({"bill_number": bill_data['bill_number']}, {"_id": 1})):
+            raise ValueError("Bill number already exists")
+
+        # Get employee details to fetch sub_division
+        employee = yield self.employees.get_employee_by_id(bill_data['employee_id'])
+        sub_division = employee.get('sub_division', 'Unknown') if employee else 'Unknown'
         
-        result = self.db.bills.insert_one(bill.to_dict())
+        bill_doc = self._bill_document(bill_data, sub_division)
+        events = self.history.split_documents([bill_doc])
+        try:
+            result = yield self.db.bills.insert_one(bill_doc)
+        except DuplicateKeyError:
+            raise ValueError("Bill number already exists")
+        yield self.history.record(events)
+        generations.bump("bills")
+        yield self.stats.record_created([bill_doc])
         return str(result.inserted_id)
 
-    def get_all_bills(self):
-        return list(self.db.bills.find().sort("created_at", -1))
+    @staticmethod
+    def _import_report():
+        report = {"inserted": 0, "failed": 0, "errors": []}
 
-    def get_bill_by_id(self, bill_id):
-        return self.db.bills.find_one({"_id": ObjectId(bill_id)})
+        def fail(row_number, error):
+            report["failed"] += 1
+            report["errors"].append({"row": row_number, "error": error})
 
-    def get_bills_by_employee(self, employee_id):
-        return list(self.db.bills.find({"employee_id": employee_id}).sort("created_at", -1))
+        return report, fail
 
-    def update_bill(self, bill_id, update_data):
+    @staticmethod
+    def _validate_rows(chunk, fail):
+        """Return the rows of a chunk that parsed and carry every required field"""
+        valid = []
+        for row_number, row in chunk:
+            if isinstance(row, Exception):
+                fail(row_number, str(row))
+                continue
+            missing = missing_fields(row, BILL_REQUIRED_FIELDS)
+            if missing:
+                fail(row_number, f"Missing required fields: {', '.join(missing)}")
+                continue
+            valid.append((row_number, row))
+        return valid
+
+    @staticmethod
+    def _unarchived(valid, archived, fail):
+        """Drop rows whose bill number belongs to an archived bill; the unique index only covers bills"""
+        kept = []
+        for row_number, row in valid:
+            if row['bill_number'] in archived:
+                fail(row_number, "Bill number already exists")
+            else:
+                kept.append((row_number, row))
+        return kept
+
+    @classmethod
+    def _build_documents(cls, valid, sub_divisions, fail):
+        row_numbers, documents = [], []
+        for row_number, row in valid:
+            try:
+                documents.append(cls._bill_document(row, sub_divisions.get(row['employee_id'], 'Unknown')))
+                row_numbers.append(row_number)
+            except (TypeError, ValueError) as e:
+                fail(row_number, str(e))
+        return row_numbers, documents
+
+    @staticmethod
+    def _inserted_documents(documents, row_numbers, write_errors, fail):
+        """Report rejected rows and return the documents that were stored"""
+        for index, error in write_errors:
+            fail(row_numbers[index], "Bill number already exists" if error['code'] == 11000 else error['errmsg'])
+        rejected = {index for index, _ in write_errors}
+        return [doc for index, doc in enumerate(documents) if index not in rejected]
+
+    @staticmethod
+    def _stored_events(events, stored):
+        """History events of the bills that were actually inserted"""
+        stored_ids = {bill["_id"] for bill in stored}
+        return [event for event in events if event["bill_id"] in stored_ids]
+
+    @steps
+    def bulk_create_bills(self, rows, chunk_size=None):
+        """Insert bills from an iterable of (row_number, row) pairs.
+
+        Each chunk costs one employee lookup and one unordered insert_many;
+        duplicate bill numbers are rejected by the unique index. Returns a report
+        with per-row errors.
+        """
+        report, fail = self._import_report()
+
+        for chunk in chunked(rows, chunk_size or Config.BULK_CHUNK_SIZE):
+            valid = self._validate_rows(chunk, fail)
+            archived = yield self.to_list(self.db.bills_archive.find(
+                {"bill_number": {"$in": [row['bill_number'] for _, row in valid]}}, {"bill_number": 1}
+            ))
+            valid = self._unarchived(valid, {bill['bill_number'] for bill in archived}, fail)
+            employee_ids = list({row['employee_id'] for _, row in valid})
+            employees = yield self.to_list(self.db.employees.find(
+                {"employee_id": {"$in": employee_ids}}, {"employee_id": 1, "sub_division": 1}
+            ))
+            sub_divisions = {
+                employee['employee_id']: employee.get('sub_division') or 'Unknown' for employee in employees
+            }
+            row_numbers, documents = self._build_documents(valid, sub_divisions, fail)
+            events = self.history.split_documents(documents)
+
+            inserted, write_errors = yield self.insert_unordered(self.db.bills, documents)
+            report["inserted"] += inserted
+            if inserted:
+                generations.bump("bills")
+            stored = self._inserted_documents(documents, row_numbers, write_errors, fail)
+            yield self.history.record(self._stored_events(events, stored))
+            yield self.stats.record_created(stored)
+
+        report["errors"].sort(key=lambda error: error["row"])
+        return report
+
+    def _union(self, include_archive):
+        """Collections read besides bills: the archive, when a request can match archived bills"""
+        return (self.db.bills_archive,) if include_archive else ()
+
+    @staticmethod
+    def _includes_archive(filter_data):
+        """Whether a filter_bills payload reads bills_archive too.
+
+        Asked for with include_archived, or implied by a date range or a status
+        filter; only terminal bills are archived, so other statuses stay hot.
+        """
+        if filter_data.get('include_archived') in (True, 'true', '1'):
+            return True
+        if filter_data.get('status'):
+            return filter_data['status'] in TERMINAL_STATUSES
+        return any(filter_data.get(field) for field in ('date_from', 'date_to', 'month_from', 'month_to'))
+
+    @staticmethod
+    def _list_projection(fields, sort_field):
+        """find() projection of a fields= value; pages keep the fields their cursors are built from"""
+        return projection(parse_fields(fields, BILL_VIEWS), HIDDEN_FIELDS, ("_id", sort_field))
+
+    def get_all_bills(self, cursor=None, limit=None, include_archived=False, fields=None):
+        return self.paginate(
+            self.db.bills, {}, "created_at", cursor, limit, self._list_projection(fields, "created_at"),
+            union=self._union(include_archived)
+        )
+
+    @steps
+    def get_bill_by_id(self, bill_id, full_history=False):
+        """One bill; split bills carry only their recent history unless full_history is set"""
+        bill = yield self.db.bills.find_one({"_id": ObjectId(bill_id)}, HIDDEN_FIELDS)
+        if not bill:
+            bill = yield self.db.bills_archive.find_one({"_id": ObjectId(bill_id)}, HIDDEN_FIELDS)
+        return (yield self.history.load_full(bill)) if full_history else bill
+
+    def get_bills_by_employee(self, employee_id, cursor=None, limit=None, fields=None):
+        return self.paginate(
+            self.db.bills, {"employee_id": employee_id}, "created_at", cursor, limit,
+            self._list_projection(fields, "created_at")
+        )
+
+    @staticmethod
+    def _profile_pipeline(employee_id, recent):
+        # The lookup equality is served by the employee_id indexes and the facets
+        # only see that employee's bills; localField with a pipeline needs MongoDB 5.0.
+        # The equality does not apply to $unionWith, so archived bills are matched there
+        bill_facets = {
+            "by_status": [_amount_totals({"$ifNull": ["$current_status", "Unknown"]}), {"$sort": {"_id": 1}}],
+            "by_dependent": [
+                _amount_totals({"dependent_name": "$dependent_name", "relationship": "$relationship"}),
+                {"$sort": {"_id.dependent_name": 1, "_id.relationship": 1}}
+            ],
+            "recent": [{"$sort": {"created_at": -1, "_id": -1}}, {"$limit": recent}, {"$project": PROFILE_BILL_PROJECTION}],
+        }
+        return [
+            {"$match": {"employee_id": employee_id}},
+            {"$limit": 1},
+            {"$project": EMPLOYEE_HIDDEN_FIELDS},
+            {"$lookup": {
+                "from": "bills", "localField": "employee_id", "foreignField": "employee_id",
+                "pipeline": [
+                    {"$unionWith": {"coll": "bills_archive", "pipeline": [{"$match": {"employee_id": employee_id}}]}},
+                    {"$facet": bill_facets},
+                ],
+                "as": "bills"
+            }},
+        ]
+
+    @staticmethod
+    def _profile(employee):
+        """Reshape the aggregation result into {employee, bills}"""
+        facets = next(iter(employee.pop("bills", [])), {})
+        totals = {"count": 0, "amount_claimed": 0.0, "approved_amount": 0.0}
+
+        def amounts(group):
+            return {
+                "count": group["count"],
+                "amount_claimed": round(group["amount_claimed"], 2),
+                "approved_amount": round(group["approved_amount"], 2)
+            }
+
+        by_status = []
+        for group in facets.get("by_status", []):
+            by_status.append({"status": group["_id"], **amounts(group)})
+            for field in totals:
+                totals[field] += group[field]
+        return {
+            "employee": employee,
+            "bills": {
+                "total": amounts(totals),
+                "by_status": by_status,
+                "by_dependent": [
+                    {
+                        "dependent_name": group["_id"].get("dependent_name"),
+                        "relationship": group["_id"].get("relationship"),
+                        **amounts(group)
+                    }
+                    for group in facets.get("by_dependent", [])
+                ],
+                "recent": facets.get("recent", []),
+            }
+        }
+
+    @steps
+    def get_employee_profile(self, employee_id, recent=None):
+        """An employee with bill counts and totals and their most recent bills, in one round trip"""
+        recent = clamp_page_size(Config.PROFILE_RECENT_BILLS if recent is None else recent)
+        employees = yield self.to_list(self.db.employees.aggregate(self._profile_pipeline(employee_id, recent)))
+        return self._profile(employees[0]) if employees else None
+
+    def _prepare_update(self, update_data):
         # Remove _id from update data if it exists
         if '_id' in update_data:
             del update_data['_id']
+        for field in HIDDEN_FIELDS:
+            update_data.pop(field, None)
+        Bill.validate_update(update_data)
+        if self.history.split:
+            # History is only written through the status endpoints, which keep
+            # bill_status_events in step; the summary sent back here may be partial
+            for field in ('status_history', 'history_count', 'history_layout'):
+                update_data.pop(field, None)
+
+        # Keep search keys in step with the fields they are derived from
+        if 'bill_number' in update_data:
+            update_data[BILL_NUMBER_KEYS] = search_keys(update_data['bill_number'])
+        if 'status_history' in update_data:
+            update_data[REFERENCE_KEYS] = reference_keys(update_data['status_history'])
         
         update_data["updated_at"] = datetime.utcnow()
-        result = self.db.bills.update_one(
-            {"_id": ObjectId(bill_id)},
-            {"$set": update_data}
+        return update_data
+
+    @staticmethod
+    def _versioned(bill_id, expected_version):
+        """Filter for one bill, optionally only while it is still at expected_version"""
+        query = {"_id": ObjectId(bill_id)}
+        if expected_version is not None:
+            expected_version = int(expected_version)
+            # Bills written before versioning have no version field and count as 0
+            query["version"] = expected_version if expected_version else {"$in": [0, None]}
+        return query
+
+    @steps
+    def _check_conflict(self, bill_id, expected_version):
+        """Called when a write matched nothing; raises if the bill is archived or its version moved on"""
+        current = yield self.db.bills.find_one({"_id": ObjectId(bill_id)}, {"version": 1})
+        if current is None:
+            if (yield self.db.bills_archive.find_one({"_id": ObjectId(bill_id)}, {"_id": 1})):
+                raise BillArchivedError()
+        elif expected_version is not None and current.get("version", 0) != int(expected_version):
+            raise VersionConflictError(current.get("version", 0))
+
+    @steps
+    def update_bill(self, bill_id, update_data):
+        expected_version = update_data.pop('version', None)
+        update_data = self._prepare_update(update_data)
+        before = yield self.db.bills.find_one_and_update(
+            self._versioned(bill_id, expected_version),
+            {"$set": update_data, "$inc": {"version": 1}},
+            projection=STATS_PROJECTION
         )
-        return result.modified_count > 0
+        if not before:
+            yield self._check_conflict(bill_id, expected_version)
+            return False
+        generations.bump("bills")
+        yield self.stats.record_change(before, {**before, **update_data})
+        return True
 
+    @steps
     def delete_bill(self, bill_id):
-        result = self.db.bills.delete_one({"_id": ObjectId(bill_id)})
-        return result.deleted_count > 0 
+        deleted = yield self.db.bills.find_one_and_delete({"_id": ObjectId(bill_id)}, projection=STATS_PROJECTION)
+        if not deleted:
+            yield self._check_conflict(bill_id, None)
+            return False
+        yield self.history.delete(bill_id)
+        # Lets change feed clients drop the bill; expires with CHANGES_RETENTION_DAYS
+        yield self.db.bill_tombstones.insert_one({"_id": deleted["_id"], "deleted_at": datetime.utcnow()})
+        generations.bump("bills")
+        yield self.stats.record_change(deleted, None)
+        return True
+
+    @staticmethod
+    def _status_update(status_data):
+        """Validate a status payload and build the $set/$push update for it"""
+        status_update = StatusUpdate.from_payload(status_data).to_dict()
+
+        return {
+            "$set": {
+                "current_status": status_update['status'],
+                "updated_at": datetime.utcnow(),
+                "status_since": status_update['date'],
+                # Store the latest values at bill level for easy querying
+                "latest_reference_number": status_update['reference_number'],
+                "latest_approved_amount": status_update['approved_amount']
+            },
+            "$push": {
+                "status_history": status_update
+            },
+            "$addToSet": {
+                REFERENCE_KEYS: {"$each": search_keys(status_update['reference_number'])}
+            },
+            "$inc": {"version": 1}
+        }
 
+    def _status_targets(self, query, update):
+        """(filter, update, split) attempts for a status write, split bills first"""
+        if not self.history.split:
+            return [(query, update, False)]
+        return [
+            ({**query, **self.history.layout_condition(True)}, self.history.bounded(update), True),
+            ({**query, **self.history.layout_condition(False)}, update, False),
+        ]
+
+    @steps
     def update_bill_status(self, bill_id, status_data):
         """Update bill status and add to history"""
+        expected_version = status_data.get('version')
         try:
-            # Validate the new status
-            new_status = status_data['status']
-            if new_status not in [status.value for status in BillStatus]:
-                raise ValueError(f"Invalid status: {new_status}")
-
-            # Use provided date or current date
-            status_date = status_data.get('date', datetime.utcnow().isoformat())
-
-            # Create new status update with additional fields
-            status_update = StatusUpdate(
-                status=new_status,
-                date=status_date,
-                remarks=status_data.get('remarks'),
-                reference_number=status_data.get('reference_number'),
-                approved_amount=status_data.get('approved_amount')
-            ).to_dict()
-
-            # Update the document
-            result = self.db.bills.update_one(
-                {"_id": ObjectId(bill_id)},
-                {
-                    "$set": {
-                        "current_status": new_status,
-                        "updated_at": datetime.utcnow(),
-                        # Store the latest values at bill level for easy querying
-                        "latest_reference_number": status_data.get('reference_number'),
-                        "latest_approved_amount": status_data.get('approved_amount')
-                    },
-                    "$push": {
-                        "status_history": status_update
-                    }
-                }
-            )
-            return result.modified_count > 0
+            update = self._status_update(status_data)
+            for query, layout_update, split in self._status_targets(self._versioned(bill_id, expected_version), update):
+                before = yield self.db.bills.find_one_and_update(query, layout_update, projection=TRANSITION_PROJECTION)
+                if before:
+                    break
+        except Exception as e:
+            raise ValueError(f"Failed to update bill status: {str(e)}")
+        if not before:
+            yield self._check_conflict(bill_id, expected_version)
+            return False
+        # The bill is written from here on, so failures are not reported as a failed update
+        entry = update["$push"]["status_history"]
+        try:
+            if split:
+                yield self.history.record_pushed([before["_id"]], entry)
+            yield self.aging.record_transitions([before], entry)
+        finally:
+            generations.bump("bills")
+        yield self.stats.record_change(before, {**before, **update["$set"]})
+        return True
+
+    @steps
+    def update_bills_status_batch(self, bill_ids, status_data):
+        """Apply one status update to many bills with a single bulk_write.
+
+        The payload is validated once for the whole batch. Each bill is only
+        written while it still has the version and history layout it was read
+        with, so stats, aging and history events follow what was actually
+        written; bills changed in between are reported as conflicts. Returns a
+        result per requested bill id.
+        """
+        try:
+            update = self._status_update(status_data)
         except Exception as e:
             raise ValueError(f"Failed to update bill status: {str(e)}")
 
-    def get_bills_by_status(self, status):
-        """Get all bills with a specific status"""
-        return list(self.db.bills.find({"current_status": status}).sort("updated_at", -1))
+        bill_ids, object_ids = self._normalize_ids(bill_ids)
+        before = yield self.to_list(self.db.bills.find({"_id": {"$in": object_ids}}, BATCH_PROJECTION))
+        archived = []
+        if len(before) < len(object_ids):
+            archived = yield self.to_list(self.db.bills_archive.find({"_id": {"$in": object_ids}}, {"_id": 1}))
+        applied = []
+        if before:
+            result = yield self.db.bills.bulk_write(self._batch_writes(before, update), ordered=False)
+            applied = before
+            if result.matched_count < len(before):
+                applied = self._batch_applied(before, (yield self.to_list(self.db.bills.find(
+                    self._batch_entry_query(before, update), {"_id": 1}
+                ))))
+        if applied:
+            entry = update["$push"]["status_history"]
+            split_ids = [bill["_id"] for bill in applied if bill.get("history_layout") == SPLIT]
+            try:
+                if split_ids:
+                    yield self.history.record_pushed(split_ids, entry)
+                yield self.aging.record_transitions(applied, entry)
+            finally:
+                generations.bump("bills")
+            yield self.stats.record_changes((bill, {**bill, **update["$set"]}) for bill in applied)
+        return self._batch_report(bill_ids, before, applied, archived)
+
+    def _batch_writes(self, before, update):
+        """One UpdateOne per bill, conditional on the version and layout it was read with"""
+        bounded = self.history.bounded(update)
+        writes = []
+        for bill in before:
+            split = bill.get("history_layout") == SPLIT
+            writes.append(UpdateOne(
+                {**self._versioned(bill["_id"], bill.get("version", 0)), **self.history.layout_condition(split)},
+                bounded if split else update
+            ))
+        return writes
+
+    @staticmethod
+    def _batch_entry_query(before, update):
+        """Bills of a batch that carry its new history entry, i.e. were written by it"""
+        return {
+            "_id": {"$in": [bill["_id"] for bill in before]},
+            "status_history.entry_id": update["$push"]["status_history"]["entry_id"],
+        }
+
+    @staticmethod
+    def _batch_applied(before, written):
+        written = {bill["_id"] for bill in written}
+        return [bill for bill in before if bill["_id"] in written]
+
+    @staticmethod
+    def _normalize_ids(bill_ids):
+        # Ids may arrive as plain strings or in extended JSON form ({"$oid": ...})
+        bill_ids = [bill_id.get('$oid') if isinstance(bill_id, dict) else bill_id for bill_id in bill_ids]
+        return bill_ids, [ObjectId(bill_id) for bill_id in bill_ids if ObjectId.is_valid(bill_id)]
 
+    @staticmethod
+    def _batch_report(bill_ids, before, applied, archived=()):
+        found = {str(bill["_id"]) for bill in before}
+        written = {str(bill["_id"]) for bill in applied}
+        archived = {str(bill["_id"]) for bill in archived}
+        results = []
+        for bill_id in bill_ids:
+            if not ObjectId.is_valid(bill_id):
+                results.append({"id": bill_id, "success": False, "error": "Invalid bill id"})
+            elif str(bill_id) in written:
+                results.append({"id": bill_id, "success": True})
+            elif str(bill_id) in found:
+                results.append({"id": bill_id, "success": False, "error": "Bill was modified, try again"})
+            elif str(bill_id) in archived:
+                results.append({"id": bill_id, "success": False, "error": "Bill is archived"})
+            else:
+                results.append({"id": bill_id, "success": False, "error": "Bill not found"})
+        return {"updated": len(applied), "results": results}
+
+    def get_stats(self):
+        """Dashboard counts and totals per status, sub-division, hospital and receipt month"""
+        return self.stats.summary()
+
+    def get_bills_by_status(self, status, cursor=None, limit=None, fields=None):
+        """Get one page of bills with a specific status"""
+        return self.paginate(
+            self.db.bills, {"current_status": status}, "updated_at", cursor, limit,
+            self._list_projection(fields, "updated_at"),
+            union=self._union(status in TERMINAL_STATUSES)
+        )
+
+    @classmethod
+    def filter_cache_key(cls, filter_data):
+        """Cache key of a filter_bills payload under the current bills generation.
+
+        Payloads that build the same query share a key: empty criteria and
+        unknown keys are dropped, amounts are compared as numbers and the page
+        size is clamped.
+        """
+        canonical = {field: filter_data[field] for field in FILTER_FIELDS if filter_data.get(field)}
+        for field in AMOUNT_FILTER_FIELDS:
+            if filter_data.get(field):
+                canonical[field] = float(filter_data[field])
+        reference = filter_data.get('reference_search') or {}
+        if reference.get('number'):
+            canonical['reference_search'] = [reference['number'], reference.get('status') or None]
+        canonical['archive'] = cls._includes_archive(filter_data)
+        canonical['fields'] = parse_fields(filter_data.get('fields'), BILL_VIEWS)
+        canonical['cursor'] = filter_data.get('cursor') or None
+        canonical['limit'] = clamp_page_size(filter_data.get('limit'))
+        raw = json.dumps(canonical, sort_keys=True, separators=(',', ':'), default=str)
+        generation, = generations.current("bills")
+        return f"{generation}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+    def cache_stats(self):
+        return self.filter_cache.stats() if self.filter_cache else {"name": "bill_filters", "enabled": False}
+
+    @steps
     def filter_bills(self, filter_data):
         """Filter bills based on multiple criteria"""
+        if self.filter_cache is not None:
+            # Taken before the query, so a write landing meanwhile only orphans the entry
+            key = self.filter_cache_key(filter_data)
+            cached = self.filter_cache.get(key)
+            if cached is not None:
+                return self.page_class.loaded(*cached)
+        query = self._filter_query(filter_data, (yield self._split_reference_ids(filter_data)))
+        page = self.paginate(
+            self.db.bills, query, "updated_at", filter_data.get('cursor'), filter_data.get('limit'),
+            self._list_projection(filter_data.get('fields'), "updated_at"), SLOW_QUERY_COMMENT,
+            self._union(self._includes_archive(filter_data))
+        )
+        if self.filter_cache is not None:
+            yield page.load()
+            self.filter_cache.set(key, (page.items, page.next_cursor))
+        return page
+
+    # Newest first, served by the updated_at_id index like filter_bills
+    EXPORT_SORT = [("updated_at", DESCENDING), ("_id", DESCENDING)]
+
+    @steps
+    def export_bills(self, filter_data):
+        """Cursor over every bill matching a filter_bills payload, with only the exported fields"""
+        split_bill_ids = yield self._split_reference_ids(filter_data)
+        query = self._filter_query(filter_data, split_bill_ids)
+        union = self._union(self._includes_archive(filter_data))
+        # Merging the tiers compares sort keys the export itself leaves out
+        projection = {**EXPORT_PROJECTION, "_id": 1, "updated_at": 1} if union else EXPORT_PROJECTION
+        cursors = [
+            collection.find(query, projection, batch_size=Config.EXPORT_BATCH_SIZE).sort(self.EXPORT_SORT)
+            for collection in (self.db.bills, *union)
+        ]
+        return self.merged_cursor_class(cursors, self.EXPORT_SORT) if union else cursors[0]
+
+    CHANGES_SORT = [("updated_at", ASCENDING), ("_id", ASCENDING)]
+
+    def _changes_start(self, token):
+        """(now, since, last_id) of a sync; a missing token starts from now"""
+        now = datetime.utcnow()
+        if not token:
+            return now, None, None
+        since, last_id = decode_token(token)
+        check_expiry(since, now)
+        return now, since, last_id
+
+    @classmethod
+    def _changed_ids_query(cls, ids, filter_data, split_bill_ids=None):
+        query = {"_id": {"$in": ids}}
+        if filter_data:
+            query = {"$and": [query, cls._filter_query(filter_data, split_bill_ids)]}
+        return query
+
+    def _tombstones_query(self, since, filter_data):
+        query = {"deleted_at": {"$gte": since}}
+        if filter_data and self._includes_archive(filter_data):
+            # Archived bills are still in lists that read the archive
+            query["archived"] = {"$ne": True}
+        return query
+
+    @staticmethod
+    def _changes(since, changed, upserts, deleted, now):
+        """Delta response: changed bills still matching the filter are upserts,
+        the others are removed from the client's list like deleted ones, and
+        so are archived bills"""
+        has_more = len(changed) > Config.CHANGES_PAGE_SIZE
+        changed = changed[:Config.CHANGES_PAGE_SIZE]
+        matched = {bill["_id"] for bill in upserts}
+        return {
+            "upserts": upserts,
+            "removed": [bill["_id"] for bill in changed if bill["_id"] not in matched]
+            + [tombstone["_id"] for tombstone in deleted if tombstone.get("archived")],
+            "deleted": [tombstone["_id"] for tombstone in deleted if not tombstone.get("archived")],
+            "token": next_token(since, changed, has_more, now),
+            "has_more": has_more,
+        }
+
+    @steps
+    def get_changes(self, token=None, filter_data=None):
+        """Bills written and deleted since a sync token, limited to a filter_bills payload.
+
+        Without a token only a fresh token is returned; clients take one
+        before loading their list so nothing written meanwhile is missed.
+        """
+        now, since, last_id = self._changes_start(token)
+        if since is None:
+            return {"upserts": [], "removed": [], "deleted": [], "token": encode_token(horizon(now)), "has_more": False}
+        changed = yield self.to_list(
+            self.db.bills.find(changed_query(since, last_id), {"updated_at": 1})
+            .sort(self.CHANGES_SORT).limit(Config.CHANGES_PAGE_SIZE + 1)
+        )
+        ids = [bill["_id"] for bill in changed[:Config.CHANGES_PAGE_SIZE]]
+        upserts = []
+        if ids:
+            split_bill_ids = (yield self._split_reference_ids(filter_data)) if filter_data else None
+            upserts = yield self.to_list(
+                self.db.bills.find(self._changed_ids_query(ids, filter_data, split_bill_ids), HIDDEN_FIELDS)
+                .sort(self.EXPORT_SORT)
+            )
+        deleted = yield self.to_list(
+            self.db.bill_tombstones.find(self._tombstones_query(since, filter_data), {"archived": 1})
+        )
+        return self._changes(since, changed, upserts, deleted, now)
+
+    def _reference_search(self, filter_data):
+        """(number, status condition) of a split-layout reference search, else None"""
+        ref_search = filter_data.get('reference_search') or {}
+        if not self.history.split or not ref_search.get('number'):
+            return None
+        return ref_search['number'], self._reference_status(ref_search.get('status'))
+
+    @steps
+    def _split_reference_ids(self, filter_data):
+        search = self._reference_search(filter_data)
+        return (yield self.history.reference_bill_ids(*search)) if search else None
+
+    @staticmethod
+    def _reference_status(status):
+        if not status:
+            return None
+        # Special handling for "Received From Subdivision" in reference search
+        if status == "Received From Subdivision":
+            return {'$regex': '^Received From', '$options': 'i'}
+        return status
+
+    @classmethod
+    def _filter_query(cls, filter_data, split_bill_ids=None):
+        """Build the Mongo query for a filter_bills payload.
+
+        split_bill_ids are the split-layout bills whose full history matched the
+        reference search; without them only embedded histories are searched.
+        """
         query = {}
+        conditions = []
         
-        # Basic filters
+        # Basic filters; substring searches are narrowed through the search key indexes
         if filter_data.get('bill_number'):
-            query['bill_number'] = {'$regex': filter_data['bill_number'], '$options': 'i'}
+            conditions.append(substring_query(BILL_NUMBER_KEYS, 'bill_number', filter_data['bill_number']))
         
         if filter_data.get('employee_id'):
             query['employee_id'] = filter_data['employee_id']  # Exact match since we're using dropdown
@@ -126,36 +851,39 @@ class BillService:
         if filter_data.get('reference_search'):
             ref_search = filter_data['reference_search']
             if ref_search.get('number'):
-                if ref_search.get('status'):
-                    # Special handling for "Received From Subdivision" in reference search
-                    if ref_search['status'] == "Received From Subdivision":
-                        query['status_history'] = {
-                            '$elemMatch': {
-                                'status': {'$regex': '^Received From', '$options': 'i'},
-                                'reference_number': {'$regex': ref_search['number'], '$options': 'i'}
-                            }
-                        }
-                    else:
-                        query['status_history'] = {
-                            '$elemMatch': {
-                                'status': ref_search['status'],
-                                'reference_number': {'$regex': ref_search['number'], '$options': 'i'}
-                            }
-                        }
-                else:
-                    query['status_history.reference_number'] = {
-                        '$regex': ref_search['number'],
-                        '$options': 'i'
+                conditions.append(key_match(REFERENCE_KEYS, ref_search['number']))
+                number = substring_regex(ref_search['number'])
+                status = cls._reference_status(ref_search.get('status'))
+                if status is not None:
+                    history_condition = {
+                        'status_history': {'$elemMatch': {'status': status, 'reference_number': number}}
                     }
+                else:
+                    history_condition = {'status_history.reference_number': number}
+                if split_bill_ids is None:
+                    query.update(history_condition)
+                else:
+                    # Split bills only embed their recent entries
+                    conditions.append({"$or": [
+                        {"_id": {"$in": split_bill_ids}},
+                        {**history_condition, "history_layout": {"$ne": SPLIT}}
+                    ]})
 
         # Date range filters
-        if filter_data.get('date_from'):
-            query['receipt_date'] = {'$gte': filter_data['date_from']}
-        if filter_data.get('date_to'):
-            if 'receipt_date' in query:
-                query['receipt_date']['$lte'] = filter_data['date_to']
+        start, end = _receipt_range(filter_data)
+        if start is not None or end is not None:
+            dates = {}
+            if start is not None:
+                dates['$gte'] = start
+            if end is not None:
+                dates['$lt'] = end
+            typed = {'receipt_month': _month_condition(start, end), 'receipt_date': dates}
+            if Config.LEGACY_DATE_STRINGS:
+                # Bills not yet converted by `flask dates migrate` hold ISO strings
+                legacy = {'$type': 'string', **{op: isoformat(value) for op, value in dates.items()}}
+                conditions.append({'$or': [typed, {'receipt_date': legacy}]})
             else:
-                query['receipt_date'] = {'$lte': filter_data['date_to']}
+                query.update(typed)
         
         # Amount range filters
         if filter_data.get('amount_from'):
@@ -170,37 +898,195 @@ class BillService:
         if filter_data.get('hospital'):
             query['hospital'] = filter_data['hospital']
 
-        return list(self.db.bills.find(query).sort("updated_at", -1))
+        if conditions:
+            query = {"$and": [query, *conditions]} if query else {"$and": conditions}
+        return query
 
-    def update_status_entry(self, bill_id, status_index, update_data):
-        """Update a specific status entry in the bill's status history"""
-        try:
-            bill = self.db.bills.find_one({"_id": ObjectId(bill_id)})
-            if not bill or "status_history" not in bill:
-                return False
+    @staticmethod
+    def _status_entry_update(update_data, status_index=None, entry_id=None):
+        """Pipeline update that edits one history entry in place.
+
+        Only the edited fields travel to the server; the latest_* fields are
+        recomputed there from the last entry. Returns (pipeline, changes).
+        """
+        changes = StatusUpdate.validate_changes(
+            {field: update_data[field] for field in STATUS_ENTRY_FIELDS if field in update_data}
+        )
+        literal = {field: {"$literal": value} for field, value in changes.items()}
+        if entry_id is not None:
+            history = {"$map": {"input": "$status_history", "as": "entry", "in": {"$cond": [
+                # entry_id comes from the URL; unwrapped, a "$..." id would be read as a field path
+                {"$eq": ["$$entry.entry_id", {"$literal": entry_id}]},
+                {"$mergeObjects": ["$$entry", literal]},
+                "$$entry"
+            ]}}}
+        else:
+            history = {"$concatArrays": [
+                {"$slice": ["$status_history", status_index]} if status_index else [],
+                [{"$mergeObjects": [{"$arrayElemAt": ["$status_history", status_index]}, literal]}],
+                {"$slice": ["$status_history", status_index + 1, {"$add": [{"$size": "$status_history"}, 1]}]}
+            ]}
+
+        def latest(field):
+            return {"$let": {"vars": {"last": {"$arrayElemAt": ["$status_history", -1]}}, "in": f"$$last.{field}"}}
+
+        derived = {
+            "latest_reference_number": latest("reference_number"),
+            "latest_approved_amount": latest("approved_amount"),
+            "updated_at": datetime.utcnow(),
+            "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]}
+        }
+        if changes.get('reference_number'):
+            # Keys of the old reference number stay behind; they only widen the
+            # candidate set, the regex check still decides the match
+            derived[REFERENCE_KEYS] = {"$setUnion": [
+                {"$ifNull": [f"${REFERENCE_KEYS}", []]},
+                {"$literal": search_keys(changes['reference_number'])}
+            ]}
+        return [{"$set": {"status_history": history}}, {"$set": derived}], changes
 
-            # Ensure status_index is valid
-            if status_index < 0 or status_index >= len(bill["status_history"]):
+    @staticmethod
+    def _entry_condition(status_index=None, entry_id=None):
+        """Query condition and pre-edit projection for one history entry"""
+        if entry_id is not None:
+            return {"status_history.entry_id": entry_id}, {"$slice": -1}
+        # The entry and its successor, to tell whether it is the last one
+        return {f"status_history.{status_index}": {"$exists": True}}, {"$slice": [status_index, 2]}
+
+    @staticmethod
+    def _entry_change(before, changes, entry_id=None):
+        """Stats view of the bill after an entry edit, from its pre-edit projection"""
+        history = before.pop("status_history", [])
+        after = dict(before)
+        is_last = history[-1].get("entry_id") == entry_id if entry_id is not None else len(history) == 1
+        if is_last and 'approved_amount' in changes:
+            after["latest_approved_amount"] = changes['approved_amount']
+        return after
+
+    def _split_entry_condition(self, condition, in_events):
+        if in_events:
+            # The entry may be older than the summary a split bill keeps
+            return {"$or": [condition, self.history.layout_condition(True)]}
+        return condition
+
+    @steps
+    def _update_status_entry(self, bill_id, update_data, status_index=None, entry_id=None):
+        if entry_id is None and status_index < 0:
+            return False
+        # Whether bill_status_events holds the entry; only then may a split
+        # bill be written without the entry in its summary
+        in_events = False
+        if self.history.split and entry_id is not None:
+            in_events = yield self.history.has_entry(bill_id, entry_id)
+        elif self.history.split and (yield self.history.layout_of(bill_id)) == SPLIT:
+            # Positions of split bills count over the full history
+            entry_id = yield self.history.entry_id_at(bill_id, status_index)
+            if entry_id is None:
                 return False
+            in_events = True
+        expected_version = update_data.get('version')
+        condition, history_projection = self._entry_condition(status_index, entry_id)
+        pipeline, changes = self._status_entry_update(update_data, status_index, entry_id)
+        before = yield self.db.bills.find_one_and_update(
+            {**self._versioned(bill_id, expected_version), **self._split_entry_condition(condition, in_events)},
+            pipeline,
+            projection={**STATS_PROJECTION, "status_history": history_projection, "history_layout": 1}
+        )
+        if not before:
+            yield self._check_conflict(bill_id, expected_version)
+            return False
+        if before.pop("history_layout", None) == SPLIT and not (yield self.history.edit(bill_id, entry_id, changes)):
+            return False
+        generations.bump("bills")
+        yield self.stats.record_change(before, self._entry_change(before, changes, entry_id))
+        return True
 
-            # Update the specific status entry
-            bill["status_history"][status_index].update({
-                k: v for k, v in update_data.items()
-                if k in ["reference_number", "approved_amount", "remarks"]
-            })
-
-            # Update the document
-            result = self.db.bills.update_one(
-                {"_id": ObjectId(bill_id)},
-                {
-                    "$set": {
-                        "status_history": bill["status_history"],
-                        # Update latest values if this is the most recent status
-                        "latest_reference_number": bill["status_history"][-1].get("reference_number"),
-                        "latest_approved_amount": bill["status_history"][-1].get("approved_amount")
-                    }
-                }
-            )
-            return result.modified_count > 0
+    @steps
+    def update_status_entry(self, bill_id, status_index, update_data):
+        """Edit the status history entry at a position in a single round trip"""
+        try:
+            return (yield self._update_status_entry(bill_id, update_data, status_index=status_index))
+        except (VersionConflictError, BillArchivedError):
+            raise
+        except Exception as e:
+            raise ValueError(f"Failed to update status entry: {str(e)}")
+
+    @steps
+    def update_status_entry_by_id(self, bill_id, entry_id, update_data):
+        """Edit the status history entry with the given entry_id in a single round trip"""
+        try:
+            return (yield self._update_status_entry(bill_id, update_data, entry_id=entry_id))
+        except (VersionConflictError, BillArchivedError):
+            raise
         except Exception as e:
-            raise ValueError(f"Failed to update status entry: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Failed to update status entry: {str(e)}")
+
+    def backfill_search_keys(self, batch_size=500):
+        """Compute search keys for every existing bill, returns the number updated"""
+        updated = backfill_keys(
+            self.db.bills,
+            {"bill_number": 1, "status_history.reference_number": 1},
+            lambda bill: {
+                BILL_NUMBER_KEYS: search_keys(bill.get('bill_number')),
+                REFERENCE_KEYS: reference_keys(bill.get('status_history'))
+            },
+            batch_size
+        )
+        if updated:
+            # New keys can widen search results
+            generations.bump("bills")
+        return updated
+
+    @staticmethod
+    def _date_migration(bill):
+        """$set converting a bill's string dates to BSON dates, None if one cannot be parsed"""
+        changes = {}
+        try:
+            for field in DATE_FIELDS:
+                changes[field] = parse_date(bill.get(field), field)
+        except ValueError:
+            return None
+        changes['receipt_month'] = month_of(changes['receipt_date'])
+        return changes
+
+    def migrate_dates(self, batch_size=500):
+        """Convert ISO string dates of bills and archived bills to BSON dates in batches.
+
+        Bills keep their version and updated_at, so the migration runs while the
+        app serves writes and can be stopped and resumed at any time. Returns
+        (converted, skipped); skipped bills changed while their batch was
+        converted, or hold a date that does not parse, and stay as they are.
+        """
+        pending = {"$or": [
+            *({field: {"$type": "string"}} for field in DATE_FIELDS),
+            {"receipt_month": {"$exists": False}}
+        ]}
+        projection = {field: 1 for field in (*DATE_FIELDS, "version")}
+        converted = skipped = 0
+        for collection in (self.db.bills, self.db.bills_archive):
+            last_id = None
+            while True:
+                query = dict(pending)
+                if last_id is not None:
+                    query["_id"] = {"$gt": last_id}
+                bills = list(collection.find(query, projection).sort("_id", 1).limit(batch_size))
+                if not bills:
+                    break
+                last_id = bills[-1]["_id"]
+                updates = []
+                for bill in bills:
+                    changes = self._date_migration(bill)
+                    if changes is None:
+                        continue
+                    version = bill.get("version", 0)
+                    updates.append(UpdateOne(
+                        {"_id": bill["_id"], "version": version if version else {"$in": [0, None]}},
+                        {"$set": changes}
+                    ))
+                modified = collection.bulk_write(updates, ordered=False).modified_count if updates else 0
+                converted += modified
+                skipped += len(bills) - modified
+        if converted:
+            generations.bump("bills")
+        return converted, skipped
+
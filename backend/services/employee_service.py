@@ -1,74 +1,216 @@
+import json
 from models.employee import Employee
 from datetime import datetime
+from config import Config
+from pymongo.errors import DuplicateKeyError
+from utils.cache import LRUCache, get_backend
+from utils.generations import generations
+from utils.ingest import chunked, missing_fields
+from utils.projection import parse_fields, projection
+from utils.search_keys import NAME_KEYS, search_keys, substring_query, backfill_keys
+from utils.steps import SyncIO, steps
 
-class EmployeeService:
-    def __init__(self, db):
+# Derived search keys are internal and never returned to clients
+HIDDEN_FIELDS = {NAME_KEYS: 0}
+
+EMPLOYEE_REQUIRED_FIELDS = ['employee_id', 'name']
+
+# Named fields= views of GET /employees; dropdown is all the employee pickers need
+EMPLOYEE_VIEWS = {
+    "dropdown": ("employee_id", "name"),
+}
+
+# The employee directory changes rarely but is read on every bill creation and
+# every list view, so records and the sorted list are cached per worker. The
+# full list and each view are cached; other field lists go to Mongo.
+ALL_EMPLOYEES_KEY = "all"
+employee_cache = LRUCache(
+    "employees",
+    max_entries=Config.EMPLOYEE_CACHE_SIZE,
+    ttl=Config.EMPLOYEE_CACHE_TTL,
+    backend=get_backend(Config.CACHE_BACKEND, Config.CACHE_URL)
+)
+
+class EmployeeService(SyncIO):
+    def __init__(self, db, cache=employee_cache):
         self.db = db
+        self.cache = cache
 
-    def create_employee(self, employee_data):
-        # Check if employee_id already exists
-        employee_id = employee_data.get('employee_id')
-        if self.db.employees.find_one({"employee_id": employee_id}):
-            raise ValueError("Employee ID already exists")
+    @staticmethod
+    def _cache_key(key):
+        # Entries are keyed by the employees generation, so a write in any
+        # worker orphans the local entries of every worker, not just its own
+        generation, = generations.current("employees")
+        return f"{generation}:{key}"
+
+    @staticmethod
+    def _invalidate():
+        generations.bump("employees")
 
-        employee_id = employee_data.get('employee_id')
-        name = employee_data.get('name')
-        father_name = employee_data.get('father_name')
-        designation = employee_data.get('designation')
+    @staticmethod
+    def _employee_document(employee_data):
+        """Build the stored document for a new employee, including its search keys"""
         status = employee_data.get('status')
-        sub_division = employee_data.get('sub_division')
-        phone = employee_data.get('phone')
         dependents = employee_data.get('dependents')
+        # CSV uploads carry dependents as a JSON list in a single cell
+        if isinstance(dependents, str):
+            dependents = json.loads(dependents)
 
-        # Ensure status is a string
-        status = str(status) if status else "WORKING"
-
-        # Create employee with all fields
         employee = Employee(
-            employee_id=employee_id,
-            name=name,
-            father_name=father_name,
-            designation=designation,
-            status=status,
-            sub_division=sub_division,
-            phone=phone,
+            employee_id=employee_data.get('employee_id'),
+            name=employee_data.get('name'),
+            father_name=employee_data.get('father_name'),
+            designation=employee_data.get('designation'),
+            # Ensure status is a string
+            status=str(status) if status else "WORKING",
+            sub_division=employee_data.get('sub_division'),
+            phone=employee_data.get('phone'),
+            bank_account=employee_data.get('bank_account'),
+            bank_name=employee_data.get('bank_name'),
+            bank_branch=employee_data.get('bank_branch'),
+            retirement_date=employee_data.get('retirement_date'),
+            life_status=employee_data.get('life_status') or "ALIVE",
+            death_date=employee_data.get('death_date'),
             dependents=dependents
         )
-        
-        result = self.db.employees.insert_one(employee.to_dict())
+        employee_doc = employee.to_dict()
+        employee_doc[NAME_KEYS] = search_keys(employee.name)
+        return employee_doc
+
+    @steps
+    def create_employee(self, employee_data):
+        """Insert one employee; duplicate ids are rejected by the unique index"""
+        employee_doc = self._employee_document(employee_data)
+        try:
+            result = yield self.db.employees.insert_one(employee_doc)
+        except DuplicateKeyError:
+            raise ValueError("Employee ID already exists")
+        self._invalidate()
         return str(result.inserted_id)
 
-    def get_all_employees(self):
-        return list(self.db.employees.find().sort("name", 1))
+    @classmethod
+    def _build_documents(cls, chunk, fail):
+        """Validate a chunk of (row_number, row) pairs and build their documents"""
+        row_numbers, documents = [], []
+        for row_number, row in chunk:
+            if isinstance(row, Exception):
+                fail(row_number, str(row))
+                continue
+            missing = missing_fields(row, EMPLOYEE_REQUIRED_FIELDS)
+            if missing:
+                fail(row_number, f"Missing required fields: {', '.join(missing)}")
+                continue
+            try:
+                documents.append(cls._employee_document(row))
+                row_numbers.append(row_number)
+            except (TypeError, ValueError) as e:
+                fail(row_number, str(e))
+        return row_numbers, documents
+
+    @staticmethod
+    def _report_write_errors(row_numbers, write_errors, fail):
+        for index, error in write_errors:
+            fail(row_numbers[index], "Employee ID already exists" if error['code'] == 11000 else error['errmsg'])
 
+    @steps
+    def bulk_create_employees(self, rows, chunk_size=None):
+        """Insert employees from an iterable of (row_number, row) pairs.
+
+        Duplicate employee IDs are rejected by the unique index instead of a
+        lookup per row. Returns a report with per-row errors.
+        """
+        report = {"inserted": 0, "failed": 0, "errors": []}
+
+        def fail(row_number, error):
+            report["failed"] += 1
+            report["errors"].append({"row": row_number, "error": error})
+
+        for chunk in chunked(rows, chunk_size or Config.BULK_CHUNK_SIZE):
+            row_numbers, documents = self._build_documents(chunk, fail)
+            inserted, write_errors = yield self.insert_unordered(self.db.employees, documents)
+            report["inserted"] += inserted
+            if inserted:
+                self._invalidate()
+            self._report_write_errors(row_numbers, write_errors, fail)
+
+        report["errors"].sort(key=lambda error: error["row"])
+        return report
+
+    @classmethod
+    def _list_query(cls, fields):
+        """(projection, cache key) of a fields= value; the key is None for uncached field lists"""
+        fields = parse_fields(fields, EMPLOYEE_VIEWS)
+        if fields is None:
+            key = ALL_EMPLOYEES_KEY
+        else:
+            views = [view for view, view_fields in EMPLOYEE_VIEWS.items() if view_fields == fields]
+            key = f"{ALL_EMPLOYEES_KEY}:{views[0]}" if views else None
+        return projection(fields, HIDDEN_FIELDS), key and cls._cache_key(key)
+
+    @steps
+    def get_all_employees(self, fields=None):
+        list_projection, key = self._list_query(fields)
+        employees = self.cache.get(key) if key else None
+        if employees is None:
+            employees = yield self.to_list(self.db.employees.find({}, list_projection).sort("name", 1))
+            if key:
+                self.cache.set(key, employees)
+        return employees
+
+    @steps
     def get_employee_by_id(self, employee_id):
-        employee = self.db.employees.find_one({"employee_id": employee_id})
-        if employee:
-            # Convert datetime objects to strings if they exist
-            if isinstance(employee.get('created_at'), datetime):
-                employee['created_at'] = employee['created_at'].isoformat()
-            if isinstance(employee.get('updated_at'), datetime):
-                employee['updated_at'] = employee['updated_at'].isoformat()
+        key = self._cache_key(f"id:{employee_id}")
+        employee = self.cache.get(key)
+        if employee is None:
+            employee = yield self.db.employees.find_one({"employee_id": employee_id}, HIDDEN_FIELDS)
+            if employee:
+                self.cache.set(key, employee)
         return employee
 
-    def search_employees(self, name):
-        return list(self.db.employees.find({
-            "name": {"$regex": name, "$options": "i"}
-        }).sort("name", 1))
+    def cache_stats(self):
+        return self.cache.stats()
 
-    def update_employee(self, employee_id, update_data):
+    @steps
+    def search_employees(self, name, fields=None):
+        return (yield self.to_list(self.db.employees.find(
+            substring_query(NAME_KEYS, "name", name), self._list_query(fields)[0]
+        ).sort("name", 1)))
+
+    @staticmethod
+    def _prepare_update(update_data):
         # Remove _id from update data if it exists
         if '_id' in update_data:
             del update_data['_id']
+        update_data.pop(NAME_KEYS, None)
+        Employee.validate_update(update_data)
+        if 'name' in update_data:
+            update_data[NAME_KEYS] = search_keys(update_data['name'])
         
         update_data["updated_at"] = datetime.now()
-        result = self.db.employees.update_one(
+        return update_data
+
+    @steps
+    def update_employee(self, employee_id, update_data):
+        update_data = self._prepare_update(update_data)
+        result = yield self.db.employees.update_one(
             {"employee_id": employee_id},
             {"$set": update_data}
         )
+        self._invalidate()
         return result.modified_count > 0
 
+    @steps
     def delete_employee(self, employee_id):
         """Delete an employee and their data"""
-        result = self.db.employees.delete_one({"employee_id": employee_id})
-        return result.deleted_count > 0
\ No newline at end of file
+        result = yield self.db.employees.delete_one({"employee_id": employee_id})
+        self._invalidate()
+        return result.deleted_count > 0
+
+    def backfill_search_keys(self, batch_size=500):
+        """Compute search keys for every existing employee, returns the number updated"""
+        return backfill_keys(
+            self.db.employees,
+            {"name": 1},
+            lambda employee: {NAME_KEYS: search_keys(employee.get('name'))},
+            batch_size
+        )
@@ -0,0 +1,189 @@
+from collections import defaultdict
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+# Dashboard dimensions and the bill field each one groups on
+DIMENSIONS = ("status", "sub_division", "hospital", "month")
+
+# Bill fields needed to compute stats deltas
+STATS_PROJECTION = {
+    "current_status": 1, "sub_division": 1, "hospital": 1, "receipt_date": 1,
+    "amount_claimed": 1, "latest_approved_amount": 1
+}
+
+
+def _amount(value):
+    try:
+        return float(value) if value not in (None, '') else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _receipt_month(receipt_date):
+    if isinstance(receipt_date, datetime):
+        return receipt_date.strftime('%Y-%m')
+    if isinstance(receipt_date, str) and len(receipt_date) >= 7:
+        return receipt_date[:7]
+    return "Unknown"
+
+
+def _key(value):
+    return "Unknown" if value in (None, '') else value
+
+
+def _key_expression(field):
+    """_key() as an aggregation expression, so rebuilds land in the same groups"""
+    return {"$cond": [{"$eq": [{"$ifNull": [field, '']}, '']}, "Unknown", field]}
+
+
+def group_keys(bill):
+    """The (dimension, key) groups a bill is counted in"""
+    return [
+        ("status", _key(bill.get("current_status"))),
+        ("sub_division", _key(bill.get("sub_division"))),
+        ("hospital", _key(bill.get("hospital"))),
+        ("month", _receipt_month(bill.get("receipt_date"))),
+    ]
+
+
+class StatsService:
+    """Materialized per-group bill counts and totals in the bill_stats collection.
+
+    Writers report deltas as bills change; reads cost one document per group.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    @staticmethod
+    def _add(deltas, bill, sign):
+        claimed = _amount(bill.get("amount_claimed"))
+        approved = _amount(bill.get("latest_approved_amount"))
+        for group in group_keys(bill):
+            delta = deltas[group]
+            delta[0] += sign
+            delta[1] += sign * claimed
+            delta[2] += sign * approved
+
+    @classmethod
+    def _operations(cls, changes):
+        """$inc upserts for (before, after) bill pairs; None stands for a missing bill"""
+        deltas = defaultdict(lambda: [0, 0.0, 0.0])
+        for before, after in changes:
+            if before:
+                cls._add(deltas, before, -1)
+            if after:
+                cls._add(deltas, after, 1)
+        return [
+            UpdateOne(
+                {"_id": {"dimension": dimension, "key": key}},
+                {"$inc": {"count": count, "amount_claimed": claimed, "approved_amount": approved}},
+                upsert=True
+            )
+            for (dimension, key), (count, claimed, approved) in deltas.items()
+            if count or claimed or approved
+        ]
+
+    def record_changes(self, changes):
+        """Apply (before, after) bill pairs; None stands for a missing bill"""
+        operations = self._operations(changes)
+        if operations:
+            self.db.bill_stats.bulk_write(operations, ordered=False)
+
+    def record_created(self, bills):
+        self.record_changes((None, bill) for bill in bills)
+
+    def record_change(self, before, after):
+        self.record_changes([(before, after)])
+
+    def summary(self):
+        """Counts and totals grouped by dimension"""
+        return self._format_summary(self.db.bill_stats.find({"count": {"$gt": 0}}).sort("_id.key", 1))
+
+    @staticmethod
+    def _format_summary(groups):
+        result = {dimension: [] for dimension in DIMENSIONS}
+        for group in groups:
+            result.setdefault(group["_id"]["dimension"], []).append({
+                "key": group["_id"]["key"],
+                "count": group["count"],
+                "amount_claimed": round(group["amount_claimed"], 2),
+                "approved_amount": round(group["approved_amount"], 2)
+            })
+        return result
+
+    def rebuild(self):
+        """Recompute bill_stats from bills and bills_archive and swap it in atomically"""
+        def totals(key):
+            return [
+                {"$group": {
+                    "_id": key,
+                    "count": {"$sum": 1},
+                    "amount_claimed": {"$sum": {"$convert": {"input": "$amount_claimed", "to": "double", "onError": 0, "onNull": 0}}},
+                    "approved_amount": {"$sum": {"$convert": {"input": "$latest_approved_amount", "to": "double", "onError": 0, "onNull": 0}}}
+                }}
+            ]
+
+        month = {"$switch": {
+            "branches": [
+                {
+                    "case": {"$eq": [{"$type": "$receipt_date"}, "date"]},
+                    "then": {"$dateToString": {"date": "$receipt_date", "format": "%Y-%m"}},
+                },
+                {
+                    "case": {"$eq": [{"$type": "$receipt_date"}, "string"]},
+                    "then": {"$cond": [
+                        {"$gte": [{"$strLenCP": "$receipt_date"}, 7]}, {"$substrCP": ["$receipt_date", 0, 7]}, "Unknown"
+                    ]},
+                },
+            ],
+            "default": "Unknown",
+        }}
+        facets = {
+            "status": totals(_key_expression("$current_status")),
+            "sub_division": totals(_key_expression("$sub_division")),
+            "hospital": totals(_key_expression("$hospital")),
+            "month": totals(month),
+        }
+        # Archived bills still count
+        pipeline = [{"$unionWith": "bills_archive"}, {"$facet": facets}]
+        result = next(self.db.bills.aggregate(pipeline, allowDiskUse=True), {})
+
+        groups = [
+            {
+                "_id": {"dimension": dimension, "key": group["_id"]},
+                "count": group["count"],
+                "amount_claimed": group["amount_claimed"],
+                "approved_amount": group["approved_amount"]
+            }
+            for dimension in DIMENSIONS
+            for group in result.get(dimension, [])
+        ]
+        staging = self.db.bill_stats_rebuild
+        staging.drop()
+        if groups:
+            staging.insert_many(groups)
+            staging.rename("bill_stats", dropTarget=True)
+        else:
+            self.db.bill_stats.drop()
+        return len(groups)
+
+
+class AsyncStatsService(StatsService):
+    """StatsService on an async (motor) database"""
+
+    async def record_changes(self, changes):
+        operations = self._operations(changes)
+        if operations:
+            await self.db.bill_stats.bulk_write(operations, ordered=False)
+
+    async def record_created(self, bills):
+        await self.record_changes((None, bill) for bill in bills)
+
+    async def record_change(self, before, after):
+        await self.record_changes([(before, after)])
+
+    async def summary(self):
+        groups = await self.db.bill_stats.find({"count": {"$gt": 0}}).sort("_id.key", 1).to_list(None)
+        return self._format_summary(groups)
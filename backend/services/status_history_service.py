@@ -0,0 +1,261 @@
+import hashlib
+
+from bson import ObjectId
+from config import Config
+from pymongo import UpdateOne
+from utils.generations import generations
+from utils.search_keys import REFERENCE_KEYS, backfill_keys, key_match, search_keys, substring_regex
+
+SPLIT = "split"
+
+# Events are returned in the same shape as embedded status_history entries
+EVENT_PROJECTION = {"_id": 0, "bill_id": 0, REFERENCE_KEYS: 0}
+
+
+def legacy_entry_id(bill_id, position):
+    """Stable entry id for a history entry written before entries had ids"""
+    return hashlib.md5(f"{bill_id}:{position}".encode()).hexdigest()[:24]
+
+
+class StatusHistoryService:
+    """Optional split storage of bill status history.
+
+    With STATUS_HISTORY_LAYOUT=split every history entry is a document in
+    bill_status_events, ordered by _id, and the bill only keeps the last
+    STATUS_SUMMARY_SIZE entries plus a history_count. Bills are marked with
+    history_layout so that documents not migrated yet keep their full
+    embedded history. With the default embedded layout this service does
+    nothing.
+    """
+
+    def __init__(self, db, layout=None, summary_size=None):
+        self.db = db
+        self.split = (layout or Config.STATUS_HISTORY_LAYOUT) == SPLIT
+        self.summary_size = summary_size or Config.STATUS_SUMMARY_SIZE
+
+    @staticmethod
+    def _events(bill_id, entries):
+        # ObjectIds are generated in order, which keeps the history order
+        return [{"_id": ObjectId(), "bill_id": bill_id, **StatusHistoryService._keyed(entry)} for entry in entries]
+
+    @staticmethod
+    def _keyed(fields):
+        """Event fields with the search keys of a reference number among them"""
+        if 'reference_number' not in fields:
+            return fields
+        return {**fields, REFERENCE_KEYS: search_keys(fields['reference_number'])}
+
+    def split_documents(self, bills):
+        """Trim new bill documents to their summary.
+
+        Returns the events that hold their full history, to be recorded once
+        the bills are stored.
+        """
+        if not self.split:
+            return []
+        events = []
+        for bill in bills:
+            bill.setdefault("_id", ObjectId())
+            history = bill.get("status_history") or []
+            events.extend(self._events(bill["_id"], history))
+            bill["status_history"] = history[-self.summary_size:]
+            bill["history_count"] = len(history)
+            bill["history_layout"] = SPLIT
+        return events
+
+    def layout_condition(self, split):
+        return {"history_layout": SPLIT} if split else {"history_layout": {"$ne": SPLIT}}
+
+    def bounded(self, update):
+        """A status $push update rewritten for split bills"""
+        return {
+            **update,
+            "$push": {"status_history": {"$each": [update["$push"]["status_history"]], "$slice": -self.summary_size}},
+            "$inc": {**update["$inc"], "history_count": 1},
+        }
+
+    @staticmethod
+    def reference_filter(number, status_condition=None):
+        # Narrowed through the reference_keys index, the regex checks the candidates
+        query = {**key_match(REFERENCE_KEYS, number), "reference_number": substring_regex(number)}
+        if status_condition is not None:
+            query["status"] = status_condition
+        return query
+
+    def record(self, events):
+        if events:
+            self.db.bill_status_events.insert_many(events, ordered=False)
+
+    def record_pushed(self, bill_ids, entry):
+        self.record([event for bill_id in bill_ids for event in self._events(bill_id, [entry])])
+
+    def load_full(self, bill):
+        """Replace the summary on a split bill with its full history"""
+        if bill and bill.get("history_layout") == SPLIT:
+            bill["status_history"] = list(
+                self.db.bill_status_events.find({"bill_id": bill["_id"]}, EVENT_PROJECTION).sort("_id", 1)
+            )
+        return bill
+
+    def layout_of(self, bill_id):
+        bill = self.db.bills.find_one({"_id": ObjectId(bill_id)}, {"history_layout": 1})
+        return bill.get("history_layout") if bill else None
+
+    def entry_id_at(self, bill_id, position):
+        for event in self.db.bill_status_events.find(
+            {"bill_id": ObjectId(bill_id)}, {"entry_id": 1}
+        ).sort("_id", 1).skip(position).limit(1):
+            return event.get("entry_id")
+        return None
+
+    def has_entry(self, bill_id, entry_id):
+        return self.db.bill_status_events.find_one(
+            {"bill_id": ObjectId(bill_id), "entry_id": entry_id}, {"_id": 1}
+        ) is not None
+
+    def edit(self, bill_id, entry_id, changes):
+        """Apply an entry edit to its event; returns whether the event exists"""
+        result = self.db.bill_status_events.update_one(
+            {"bill_id": ObjectId(bill_id), "entry_id": entry_id}, {"$set": self._keyed(changes)}
+        )
+        return result.matched_count > 0
+
+    def delete(self, bill_id):
+        if self.split:
+            self.db.bill_status_events.delete_many({"bill_id": ObjectId(bill_id)})
+
+    def reference_bill_ids(self, number, status_condition=None):
+        """Ids of split bills with a history entry matching a reference search"""
+        return self.db.bill_status_events.distinct(
+            "bill_id", self.reference_filter(number, status_condition)
+        )
+
+    def backfill_search_keys(self, batch_size=500):
+        """Compute search keys for events written before they existed, returns the number updated"""
+        return backfill_keys(
+            self.db.bill_status_events,
+            {"reference_number": 1},
+            lambda event: {REFERENCE_KEYS: search_keys(event.get('reference_number'))},
+            batch_size
+        )
+
+    def _migration_operations(self, bill):
+        history = bill.get("status_history") or []
+        entries = [
+            entry if entry.get("entry_id") else {**entry, "entry_id": legacy_entry_id(bill["_id"], position)}
+            for position, entry in enumerate(history)
+        ]
+        # Upserts keyed on the entry id, so a rerun after an interrupted batch
+        # refreshes events instead of duplicating them
+        events = [
+            UpdateOne(
+                {"bill_id": bill["_id"], "entry_id": entry["entry_id"]},
+                {"$set": self._keyed(entry), "$setOnInsert": {"_id": ObjectId()}},
+                upsert=True
+            )
+            for entry in entries
+        ]
+        version = bill.get("version", 0)
+        summary = UpdateOne(
+            # Bills written to since they were read are left for the next run
+            {"_id": bill["_id"], "version": version if version else {"$in": [0, None]}},
+            {"$set": {
+                "status_history": entries[-self.summary_size:],
+                "history_count": len(entries),
+                "history_layout": SPLIT,
+            }}
+        )
+        return events, summary
+
+    def _drop_unconverted(self, bill_ids):
+        """Delete the events of bills a migration batch did not mark split"""
+        converted = {bill["_id"] for bill in self.db.bills.find(
+            {"_id": {"$in": bill_ids}, **self.layout_condition(True)}, {"_id": 1}
+        )}
+        unconverted = [bill_id for bill_id in bill_ids if bill_id not in converted]
+        if unconverted:
+            self.db.bill_status_events.delete_many({"bill_id": {"$in": unconverted}})
+
+    def migrate(self, batch_size=500):
+        """Move the history of embedded bills into bill_status_events in batches.
+
+        Events are written before the bill is marked split, so a converted bill
+        never lacks them. Returns (converted, skipped); skipped bills changed
+        while their batch was being converted, lose the events written for
+        them and are picked up by the next run.
+        """
+        converted = skipped = 0
+        last_id = None
+        while True:
+            query = {"history_layout": {"$ne": SPLIT}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            bills = list(
+                self.db.bills.find(query, {"status_history": 1, "version": 1}).sort("_id", 1).limit(batch_size)
+            )
+            if not bills:
+                break
+            events, summaries = [], []
+            for bill in bills:
+                bill_events, summary = self._migration_operations(bill)
+                events.extend(bill_events)
+                summaries.append(summary)
+            if events:
+                self.db.bill_status_events.bulk_write(events, ordered=False)
+            modified = self.db.bills.bulk_write(summaries, ordered=False).modified_count
+            if modified < len(bills):
+                self._drop_unconverted([bill["_id"] for bill in bills])
+            converted += modified
+            skipped += len(bills) - modified
+            last_id = bills[-1]["_id"]
+        if converted:
+            generations.bump("bills")
+        return converted, skipped
+
+
+class AsyncStatusHistoryService(StatusHistoryService):
+    """StatusHistoryService on an async (motor) database; migrations run on the sync service"""
+
+    async def record(self, events):
+        if events:
+            await self.db.bill_status_events.insert_many(events, ordered=False)
+
+    async def record_pushed(self, bill_ids, entry):
+        await self.record([event for bill_id in bill_ids for event in self._events(bill_id, [entry])])
+
+    async def load_full(self, bill):
+        if bill and bill.get("history_layout") == SPLIT:
+            bill["status_history"] = await self.db.bill_status_events.find(
+                {"bill_id": bill["_id"]}, EVENT_PROJECTION
+            ).sort("_id", 1).to_list(None)
+        return bill
+
+    async def layout_of(self, bill_id):
+        bill = await self.db.bills.find_one({"_id": ObjectId(bill_id)}, {"history_layout": 1})
+        return bill.get("history_layout") if bill else None
+
+    async def entry_id_at(self, bill_id, position):
+        events = await self.db.bill_status_events.find(
+            {"bill_id": ObjectId(bill_id)}, {"entry_id": 1}
+        ).sort("_id", 1).skip(position).limit(1).to_list(1)
+        return events[0].get("entry_id") if events else None
+
+    async def has_entry(self, bill_id, entry_id):
+        return await self.db.bill_status_events.find_one(
+            {"bill_id": ObjectId(bill_id), "entry_id": entry_id}, {"_id": 1}
+        ) is not None
+
+    async def edit(self, bill_id, entry_id, changes):
+        result = await self.db.bill_status_events.update_one(
+            {"bill_id": ObjectId(bill_id), "entry_id": entry_id}, {"$set": self._keyed(changes)}
+        )
+        return result.matched_count > 0
+
+    async def delete(self, bill_id):
+        if self.split:
+            await self.db.bill_status_events.delete_many({"bill_id": ObjectId(bill_id)})
+
+    async def reference_bill_ids(self, number, status_condition=None):
+        return await self.db.bill_status_events.distinct(
+            "bill_id", self.reference_filter(number, status_condition)
+        )
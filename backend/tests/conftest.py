@@ -0,0 +1,52 @@
+"""Fixtures on mongomock; Config is read at import, so the environment is set first"""
+import os
+
+os.environ.setdefault("SLOW_QUERY_MS", "0")
+os.environ.setdefault("ENSURE_INDEXES_ON_STARTUP", "false")
+os.environ.setdefault("METRICS_ENABLED", "false")
+
+import mongomock
+import pytest
+
+from services.aging_service import aging_cache
+from services.bill_service import filter_cache
+from services.employee_service import employee_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    # Module caches outlive a test's database
+    for cache in (aging_cache, filter_cache, employee_cache):
+        cache.clear()
+
+
+@pytest.fixture
+def client():
+    return mongomock.MongoClient()
+
+
+@pytest.fixture
+def db(client):
+    return client.bills_management
+
+
+BILL = {
+    "bill_number": "B-1001", "receipt_date": "2024-03-01", "employee_id": "E1", "employee_name": "Asha",
+    "dependent_name": "Ravi", "relationship": "Son", "amount_claimed": 1200, "hospital": "City Hospital",
+}
+
+
+@pytest.fixture
+def bill_data():
+    return dict(BILL)
+
+
+@pytest.fixture
+def app(client):
+    from app import create_app
+    return create_app(client)
+
+
+@pytest.fixture
+def http(app):
+    return app.test_client()
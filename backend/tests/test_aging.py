@@ -0,0 +1,99 @@
+"""Dwell-time aging report, from recorded stages or replayed histories"""
+from datetime import datetime, timedelta
+
+from services.aging_service import AgingService, aging_cache, stage_durations
+
+SENT = "Sent to Medical Superintendent"
+BACK = "Received back from Medical Superintendent"
+
+
+def _history(start, *steps):
+    """Entries starting with a receipt, then (status, days after the previous entry)"""
+    entries, date = [{"status": "Received From North", "date": start.isoformat()}], start
+    for status, days in steps:
+        date += timedelta(days=days)
+        entries.append({"status": status, "date": date.isoformat()})
+    return entries
+
+
+def _legacy_bills(db, now):
+    db.bills.insert_many([
+        {"bill_number": "B-1", "sub_division": "North", "current_status": SENT,
+         "status_history": _history(now - timedelta(days=12), (SENT, 2))},
+        {"bill_number": "B-2", "sub_division": "South", "current_status": BACK,
+         "status_history": _history(now - timedelta(days=9), (SENT, 1), (BACK, 4))},
+        {"bill_number": "B-3", "sub_division": "South", "current_status": "Rejected",
+         "status_history": _history(now - timedelta(days=40), (SENT, 3), ("Rejected", 1))},
+    ])
+
+
+def _statuses(report):
+    return {row["status"]: row for row in report["statuses"]}
+
+
+def test_stages_are_timed_per_status(db):
+    _legacy_bills(db, datetime.utcnow())
+
+    statuses = _statuses(AgingService(db).report(threshold_days=5))
+
+    assert statuses["Received From Subdivision"]["bills"] == 3
+    assert statuses["Received From Subdivision"]["max_days"] == 3.0
+    # B-1 is still waiting (10 days so far), B-2 and B-3 left after 4 and 1
+    assert statuses[SENT]["bills"] == 3
+    assert statuses[SENT]["p50_days"] == 4.0
+    assert "Rejected" not in statuses
+
+
+def test_bills_waiting_past_the_threshold_are_overdue(db):
+    _legacy_bills(db, datetime.utcnow())
+
+    overdue = AgingService(db).report(threshold_days=5)["overdue"]
+
+    assert overdue["count"] == 1
+    assert overdue["bills"][0]["bill_number"] == "B-1"
+    assert round(overdue["bills"][0]["days_in_status"]) == 10
+    assert AgingService(db).report(threshold_days=5, status=BACK)["overdue"]["count"] == 0
+
+
+def test_backfilled_stages_give_the_same_report(db):
+    _legacy_bills(db, datetime.utcnow())
+    service = AgingService(db)
+    replayed = service.report(threshold_days=5)
+
+    assert service.backfill(batch_size=2) == (3, 0)
+    aging_cache.clear()
+    recorded = service.report(threshold_days=5)
+
+    for report in (replayed, recorded):
+        report.pop("generated_at")
+        for bill in report["overdue"]["bills"]:
+            bill["days_in_status"] = round(bill["days_in_status"])
+    assert recorded == replayed
+
+
+def test_each_visit_of_a_stage_is_recorded():
+    start = datetime(2024, 1, 1)
+    entries = _history(start, (SENT, 1), (BACK, 2), (SENT, 3), (BACK, 4))
+
+    assert stage_durations(entries) == [
+        {"status": "Received From North", "seconds": 86400.0},
+        {"status": SENT, "seconds": 2 * 86400.0},
+        {"status": BACK, "seconds": 3 * 86400.0},
+        {"status": SENT, "seconds": 4 * 86400.0},
+    ]
+
+
+def test_revisited_stage_counts_once_per_bill(db):
+    now = datetime.utcnow()
+    db.bills.insert_one({
+        "bill_number": "B-1", "sub_division": "North", "current_status": BACK,
+        "status_history": _history(now - timedelta(days=11), (SENT, 1), (BACK, 2), (SENT, 3), (BACK, 4)),
+    })
+
+    statuses = _statuses(AgingService(db).report())
+
+    assert (statuses[SENT]["bills"], statuses[SENT]["max_days"]) == (1, 6.0)
+
+
+def test_route_rejects_a_bad_threshold(http):
+    assert http.get("/api/bills/aging?threshold_days=-1").status_code == 400
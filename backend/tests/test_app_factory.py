@@ -0,0 +1,81 @@
+"""The app factory connects nothing; each process builds its client on first use"""
+import os
+
+import mongomock
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+
+import app as app_module
+from utils.mongo import LazyClient
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    """MongoClient stand-in counting the clients built"""
+    built = []
+
+    def client(*args, **kwargs):
+        built.append(mongomock.MongoClient())
+        return built[-1]
+
+    monkeypatch.setattr(app_module, "MongoClient", client)
+    return built
+
+
+def test_factory_does_not_connect(connections):
+    app = app_module.create_app()
+
+    assert connections == []
+    assert app.test_client().get("/livez").status_code == 200
+    assert connections == []
+
+
+def test_first_request_connects_once(connections):
+    http = app_module.create_app().test_client()
+
+    http.get("/api/bills")
+    http.get("/api/employees")
+
+    assert len(connections) == 1
+
+
+def test_failed_setup_is_retried():
+    calls = []
+
+    def on_connect(client):
+        calls.append(client)
+        if len(calls) == 1:
+            raise ServerSelectionTimeoutError("no servers")
+
+    lazy = LazyClient(mongomock.MongoClient, on_connect=on_connect)
+    with pytest.raises(ServerSelectionTimeoutError):
+        lazy.get()
+
+    assert lazy.get() is calls[1]
+    assert lazy.get() is calls[1]
+
+
+def test_forked_child_builds_its_own_client():
+    lazy = LazyClient(mongomock.MongoClient)
+    parent = lazy.get()
+
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0 if lazy.get() is not parent else 1)
+    _, status = os.waitpid(pid, 0)
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert lazy.get() is parent
+
+
+def test_readiness_reports_the_database(http, monkeypatch):
+    assert http.get("/readyz").get_json() == {"status": "ready"}
+
+    def unreachable(database, *args, **kwargs):
+        raise ServerSelectionTimeoutError("no servers")
+
+    monkeypatch.setattr(mongomock.database.Database, "command", unreachable)
+    response = http.get("/readyz")
+
+    assert response.status_code == 503
+    assert response.get_json()["status"] == "unavailable"
@@ -0,0 +1,73 @@
+"""Terminal bills move to bills_archive, stay readable and refuse writes"""
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from bson import ObjectId
+
+from services.archive_service import ArchiveService
+from services.bill_service import BillService
+
+
+@pytest.fixture
+def bills(db, bill_data):
+    """Ids of an old rejected bill, a recent rejected bill and an old bill in progress"""
+    service = BillService(db)
+    ids = [service.create_bill({**bill_data, "bill_number": f"B-{n}"}) for n in range(3)]
+    service.update_bills_status_batch(ids[:2], {"status": "Rejected"})
+    old = datetime.utcnow() - timedelta(days=400)
+    db.bills.update_many({"_id": {"$in": [ObjectId(ids[0]), ObjectId(ids[2])]}}, {"$set": {"updated_at": old}})
+    return ids
+
+
+def test_only_old_terminal_bills_move(db, bills):
+    assert ArchiveService(db).archive(older_than_days=30) == (1, 0)
+
+    assert db.bills_archive.distinct("bill_number") == ["B-0"]
+    assert sorted(db.bills.distinct("bill_number")) == ["B-1", "B-2"]
+    assert db.bill_tombstones.find_one({"_id": ObjectId(bills[0])})["archived"] is True
+
+
+def test_archived_bills_stay_readable(http, db, bills):
+    stats = http.get("/api/bills/stats").get_json()
+    ArchiveService(db).archive(older_than_days=30)
+
+    def numbers(url):
+        return sorted(bill["bill_number"] for bill in http.get(url).get_json()["items"])
+
+    assert http.get(f"/api/bills/{bills[0]}").get_json()["bill_number"] == "B-0"
+    assert numbers("/api/bills") == ["B-1", "B-2"]
+    assert numbers("/api/bills?include_archived=true") == ["B-0", "B-1", "B-2"]
+    assert numbers("/api/bills/status/Rejected") == ["B-0", "B-1"]
+    assert http.get("/api/bills/stats").get_json() == stats
+
+
+def test_writes_to_archived_bills_conflict(http, db, bills, bill_data):
+    ArchiveService(db).archive(older_than_days=30)
+    bill_id = bills[0]
+
+    responses = [
+        http.put(f"/api/bills/{bill_id}", json={"hospital": "Other"}),
+        http.put(f"/api/bills/{bill_id}/status", json={"status": "Office Order"}),
+        http.delete(f"/api/bills/{bill_id}"),
+    ]
+
+    assert [response.status_code for response in responses] == [409, 409, 409]
+    assert responses[0].get_json()["error"] == "Bill is archived and can no longer be changed"
+    assert http.post("/api/bills", json={**bill_data, "bill_number": "B-0"}).status_code == 400
+
+
+def test_bill_written_during_the_run_stays_hot(db, bills, monkeypatch):
+    bulk_write = mongomock.collection.Collection.bulk_write
+
+    def status_then_write(collection, requests, **kwargs):
+        if collection.name == "bills_archive":
+            db.bills.update_one({"_id": ObjectId(bills[0])}, {"$inc": {"version": 1}})
+        return bulk_write(collection, requests, **kwargs)
+
+    monkeypatch.setattr(mongomock.collection.Collection, "bulk_write", status_then_write)
+    assert ArchiveService(db).archive(older_than_days=30) == (0, 1)
+    monkeypatch.undo()
+
+    assert db.bills_archive.count_documents({}) == 0
+    assert db.bills.count_documents({"_id": ObjectId(bills[0])}) == 1
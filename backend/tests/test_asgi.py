@@ -0,0 +1,87 @@
+"""The Quart/motor app answers like the Flask/pymongo one"""
+import asyncio
+
+import mongomock_motor
+import pytest
+
+from asgi_app import create_asgi_app
+from utils.steps import run_async, run_sync
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+@pytest.fixture
+def asgi():
+    return create_asgi_app(mongomock_motor.AsyncMongoMockClient()).test_client()
+
+
+def _comparable(bill):
+    # Ids and write times differ between the two databases
+    drop = {"_id", "created_at", "updated_at", "status_since"}
+    history = [{k: v for k, v in entry.items() if k not in ("entry_id", "date")} for entry in bill["status_history"]]
+    stages = [stage["status"] for stage in bill["stage_durations"]]
+    return {**{k: v for k, v in bill.items() if k not in drop}, "status_history": history, "stage_durations": stages}
+
+
+def test_bill_workflow_matches_the_flask_app(http, asgi, bill_data):
+    status = {"status": "Sent to Circle Office", "reference_number": "CO/7", "approved_amount": "900"}
+
+    bill_id = http.post("/api/bills", json=bill_data).get_json()["id"]
+    http.put(f"/api/bills/{bill_id}/status", json=status)
+    flask_bill = http.get(f"/api/bills/{bill_id}").get_json()
+    flask_list = http.get("/api/bills?fields=summary").get_json()
+
+    async def quart():
+        created = await asgi.post("/api/bills", json=bill_data)
+        bill_id = (await created.get_json())["id"]
+        await asgi.put(f"/api/bills/{bill_id}/status", json=status)
+        bill = await (await asgi.get(f"/api/bills/{bill_id}")).get_json()
+        listing = await (await asgi.get("/api/bills?fields=summary")).get_json()
+        return bill, listing
+
+    quart_bill, quart_list = _run(quart())
+
+    assert _comparable(quart_bill) == _comparable(flask_bill)
+    assert [bill["bill_number"] for bill in quart_list["items"]] == [bill["bill_number"] for bill in flask_list["items"]]
+    assert quart_list["items"][0].keys() == flask_list["items"][0].keys()
+
+
+def test_errors_have_the_same_status(http, asgi, bill_data):
+    missing = "65f000000000000000000001"
+
+    async def quart():
+        return [
+            (await asgi.get(f"/api/bills/{missing}")).status_code,
+            (await asgi.put(f"/api/bills/{missing}/status", json={"status": "Lost"})).status_code,
+            (await asgi.post("/api/bills", json={"bill_number": "B-2"})).status_code,
+        ]
+
+    assert _run(quart()) == [
+        http.get(f"/api/bills/{missing}").status_code,
+        http.put(f"/api/bills/{missing}/status", json={"status": "Lost"}).status_code,
+        http.post("/api/bills", json={"bill_number": "B-2"}).status_code,
+    ]
+
+
+def _recovering():
+    try:
+        yield _failing()
+    except KeyError:
+        return "recovered"
+
+
+async def _failing():
+    raise KeyError("lost")
+
+
+def test_async_failures_are_thrown_back_at_the_yield():
+    assert _run(run_async(_recovering())) == "recovered"
+
+
+def test_sync_steps_get_each_result_back():
+    def steps():
+        return (yield 1) + (yield 2)
+
+    assert run_sync(steps()) == 3
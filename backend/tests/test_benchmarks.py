@@ -0,0 +1,56 @@
+"""The benchmark data set is reproducible and the workloads run against it"""
+import random
+
+import pytest
+
+from benchmarks.generator import generate_bills, generate_employees, seed_database
+from benchmarks.run import percentile, run_workload
+from benchmarks.workloads import WORKLOADS, Context
+from services.stats_service import StatsService
+
+
+def _bills(seed, count=20):
+    rng = random.Random(seed)
+    employees = [
+        (e["employee_id"], e["name"], e["sub_division"], e["dependents"] or [{"name": "X", "relation": "Son"}])
+        for e in generate_employees(rng, 5)
+    ]
+    return list(generate_bills(rng, employees, count))
+
+
+def test_same_seed_same_data():
+    assert _bills(7) == _bills(7)
+    assert _bills(7) != _bills(8)
+
+
+def test_bills_carry_their_derived_fields():
+    for bill in _bills(7):
+        assert bill["current_status"] == bill["status_history"][-1]["status"]
+        assert len(bill["stage_durations"]) == len(bill["status_history"]) - 1
+        assert bill["created_at"] <= bill["updated_at"]
+
+
+def test_seeded_stats_match_the_bills(db):
+    seed_database(db, 50, seed=3)
+
+    fresh = StatsService(db.client.stats_check)
+    fresh.record_created(db.bills.find())
+    assert StatsService(db).summary() == fresh.summary()
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+
+    assert [percentile(values, fraction) for fraction in (0.5, 0.95, 0.99)] == [50, 95, 99]
+    assert percentile([], 0.5) is None
+
+
+@pytest.mark.parametrize("name", ["bills.get_bills", "bills.filter_bills", "bills.create_bill", "bills.update_bill_status"])
+def test_workload_runs_without_errors(http, db, name):
+    seed_database(db, 50, seed=3)
+    ctx = Context(random.Random(3), db)
+
+    result = run_workload(http, ctx, WORKLOADS[name], 5)
+
+    assert result["errors"] == 0
+    assert result["requests"] == 5
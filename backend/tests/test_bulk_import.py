@@ -0,0 +1,69 @@
+"""Bulk imports report each rejected row by its number in the upload"""
+import io
+import json
+
+from services.bill_service import BillService
+from utils.ingest import CSV, NDJSON, iter_rows
+
+
+def _ndjson(*rows):
+    return "\n".join(row if isinstance(row, str) else json.dumps(row) for row in rows).encode()
+
+
+def test_unparsable_rows_are_reported_in_place():
+    stream = io.BytesIO(_ndjson({"a": 1}, "{broken", "[1]", "", {"b": 2}) + b"\n\xff\n")
+
+    rows = list(iter_rows(stream, NDJSON))
+
+    assert [number for number, _ in rows] == [1, 2, 3, 5, 6]
+    assert [isinstance(row, Exception) for _, row in rows] == [False, True, True, False, True]
+
+
+def test_csv_empty_cells_are_left_out():
+    stream = io.BytesIO(b"\xef\xbb\xbfa, b\n1,\n")
+
+    assert list(iter_rows(stream, CSV)) == [(1, {"a": "1"})]
+
+
+def test_csv_stops_at_invalid_utf8_with_one_error():
+    stream = io.BytesIO(b"a\n1\n\xff\n2\n")
+
+    rows = list(iter_rows(stream, CSV))
+
+    assert rows[0] == (1, {"a": "1"})
+    assert rows[1][0] == 2 and isinstance(rows[1][1], Exception)
+    assert len(rows) == 2
+
+
+def test_report_lists_each_failed_row(db, bill_data):
+    db.bills.create_index("bill_number", unique=True)
+    BillService(db).create_bill({**bill_data, "bill_number": "B-1"})
+    rows = enumerate([
+        {**bill_data, "bill_number": "B-2"},
+        {**bill_data, "bill_number": "B-1"},
+        {**bill_data, "bill_number": "B-3", "hospital": ""},
+        ValueError("Invalid JSON"),
+        {**bill_data, "bill_number": "B-4"},
+    ], start=1)
+
+    report = BillService(db).bulk_create_bills(rows, chunk_size=2)
+
+    assert report["inserted"] == 2
+    assert report["failed"] == 3
+    assert [error["row"] for error in report["errors"]] == [2, 3, 4]
+    assert db.bills.count_documents({}) == 3
+
+
+def test_route_answers_207_when_some_rows_fail(http, bill_data):
+    body = _ndjson({**bill_data, "bill_number": "B-7"}, {"bill_number": "B-8"})
+
+    response = http.post("/api/bills/bulk", data=body, content_type="application/x-ndjson")
+
+    assert response.status_code == 207
+    assert response.get_json()["errors"][0]["row"] == 2
+
+
+def test_route_rejects_unknown_formats(http):
+    response = http.post("/api/bills/bulk", data=b"x", content_type="text/plain")
+
+    assert response.status_code == 400
@@ -0,0 +1,86 @@
+"""Delta sync: bills written and deleted since a token"""
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from config import Config
+from services.bill_service import BillService
+from utils.changes import ExpiredTokenError, InvalidTokenError, encode_token
+
+
+@pytest.fixture(autouse=True)
+def no_lag(monkeypatch):
+    monkeypatch.setattr(Config, "CHANGES_LAG_SECONDS", 0)
+
+
+@pytest.fixture
+def service(db):
+    return BillService(db)
+
+
+def _create(service, bill_data, *numbers):
+    return [service.create_bill({**bill_data, "bill_number": number}) for number in numbers]
+
+
+def _numbers(changes):
+    return [bill["bill_number"] for bill in changes["upserts"]]
+
+
+def test_sync_returns_writes_and_deletions_since_the_token(service, bill_data):
+    kept, deleted = _create(service, bill_data, "B-1", "B-2")
+    token = service.get_changes()["token"]
+
+    service.update_bill_status(kept, {"status": "Rejected"})
+    service.delete_bill(deleted)
+    _create(service, bill_data, "B-3")
+    changes = service.get_changes(token)
+
+    assert sorted(_numbers(changes)) == ["B-1", "B-3"]
+    assert changes["deleted"] == [ObjectId(deleted)]
+    assert service.get_changes(changes["token"])["upserts"] == []
+
+
+def test_bill_leaving_the_filter_is_removed(service, bill_data):
+    bill_id, = _create(service, bill_data, "B-1")
+    token = service.get_changes()["token"]
+
+    service.update_bill_status(bill_id, {"status": "Office Order"})
+    changes = service.get_changes(token, {"status": "Sent to Circle Office"})
+
+    assert changes["upserts"] == []
+    assert changes["removed"] == [ObjectId(bill_id)]
+
+
+def test_backlog_is_paged_without_gaps(service, bill_data, monkeypatch):
+    monkeypatch.setattr(Config, "CHANGES_PAGE_SIZE", 2)
+    token = encode_token(datetime.utcnow() - timedelta(minutes=1))
+    _create(service, bill_data, "B-1", "B-2", "B-3")
+
+    first = service.get_changes(token)
+    second = service.get_changes(first["token"])
+
+    assert first["has_more"] and not second["has_more"]
+    assert sorted(_numbers(first) + _numbers(second)) == ["B-1", "B-2", "B-3"]
+
+
+def test_writes_inside_the_lag_window_are_sent_again(service, bill_data, monkeypatch):
+    monkeypatch.setattr(Config, "CHANGES_LAG_SECONDS", 60)
+    token = encode_token(datetime.utcnow() - timedelta(minutes=5))
+    _create(service, bill_data, "B-1")
+
+    first = service.get_changes(token)
+
+    assert _numbers(first) == ["B-1"]
+    assert _numbers(service.get_changes(first["token"])) == ["B-1"]
+
+
+def test_old_and_garbled_tokens_are_refused(service, http):
+    expired = encode_token(datetime.utcnow() - timedelta(days=Config.CHANGES_RETENTION_DAYS + 1))
+
+    with pytest.raises(ExpiredTokenError):
+        service.get_changes(expired)
+    with pytest.raises(InvalidTokenError):
+        service.get_changes("garbled")
+    assert http.get(f"/api/bills/changes?since={expired}").status_code == 410
+    assert http.get("/api/bills/changes?since=garbled").status_code == 400
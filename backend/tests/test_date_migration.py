@@ -0,0 +1,75 @@
+"""`flask dates migrate` turns legacy ISO string dates into BSON dates in place"""
+from datetime import datetime
+
+import mongomock
+
+from services.bill_service import BillService
+
+UPDATED = datetime(2024, 1, 2, 3, 4, 5)
+
+
+def _legacy(number, receipt_date="2024-03-01", **fields):
+    return {
+        "bill_number": number, "receipt_date": receipt_date, "treatment_period_from": "2024-02-20",
+        "updated_at": UPDATED, "version": 3, **fields
+    }
+
+
+def test_string_dates_become_dates(db):
+    db.bills.insert_one(_legacy("B-1"))
+    db.bills_archive.insert_one(_legacy("B-2", "2023-12-31T10:00:00"))
+
+    assert BillService(db).migrate_dates(batch_size=1) == (2, 0)
+
+    bill = db.bills.find_one({"bill_number": "B-1"})
+    assert bill["receipt_date"] == datetime(2024, 3, 1)
+    assert bill["treatment_period_from"] == datetime(2024, 2, 20)
+    assert bill["receipt_month"] == "2024-03"
+    # Not an edit: clients syncing on updated_at and version see no change
+    assert (bill["updated_at"], bill["version"]) == (UPDATED, 3)
+    assert db.bills_archive.find_one()["receipt_date"] == datetime(2023, 12, 31, 10)
+
+
+def test_second_run_finds_nothing(db):
+    db.bills.insert_many([_legacy("B-1"), _legacy("B-2")])
+    service = BillService(db)
+    service.migrate_dates()
+
+    assert service.migrate_dates() == (0, 0)
+
+
+def test_unparsable_dates_are_skipped(db):
+    db.bills.insert_many([_legacy("B-1", "soon"), _legacy("B-2")])
+
+    assert BillService(db).migrate_dates() == (1, 1)
+    assert db.bills.find_one({"bill_number": "B-1"})["receipt_date"] == "soon"
+
+
+def test_bill_edited_during_its_batch_is_left_alone(db, monkeypatch):
+    db.bills.insert_many([_legacy("B-1"), _legacy("B-2")])
+    bulk_write = mongomock.collection.Collection.bulk_write
+
+    def edit_then_write(collection, requests, **kwargs):
+        collection.update_one(
+            {"bill_number": "B-1"}, {"$set": {"receipt_date": "2024-04-01"}, "$inc": {"version": 1}}
+        )
+        return bulk_write(collection, requests, **kwargs)
+
+    monkeypatch.setattr(mongomock.collection.Collection, "bulk_write", edit_then_write)
+    assert BillService(db).migrate_dates() == (1, 1)
+    monkeypatch.undo()
+
+    assert db.bills.find_one({"bill_number": "B-1"})["receipt_date"] == "2024-04-01"
+    # The next run picks it up with its new date
+    assert BillService(db).migrate_dates() == (1, 0)
+    assert db.bills.find_one({"bill_number": "B-1"})["receipt_month"] == "2024-04"
+
+
+def test_migrated_bills_match_date_filters(db):
+    db.bills.insert_many([_legacy("B-1"), _legacy("B-2", "2024-05-01")])
+    service = BillService(db)
+    service.migrate_dates()
+
+    page = service.filter_bills({"date_from": "2024-03-01", "date_to": "2024-03-31"})
+
+    assert [bill["bill_number"] for bill in page.items] == ["B-1"]
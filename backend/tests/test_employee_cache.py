@@ -0,0 +1,86 @@
+"""Employee reads are cached per worker and dropped on any worker's write"""
+import pytest
+
+from services.employee_service import EmployeeService
+from utils.cache import LocalBackend, LRUCache
+
+EMPLOYEE = {"employee_id": "E1", "name": "Asha", "sub_division": "North"}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("utils.cache.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache("t", max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    assert cache.evictions == 1
+
+
+def test_entries_are_bounded_by_size():
+    cache = LRUCache("t", max_bytes=10, sizeof=len)
+    cache.set("a", "x" * 6)
+    cache.set("b", "y" * 6)
+    cache.set("c", "z" * 11)
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (None, "y" * 6, None)
+
+
+def test_entries_expire(clock):
+    cache = LRUCache("t", ttl=5)
+    cache.set("a", 1)
+
+    clock[0] += 6
+
+    assert cache.get("a") is None
+
+
+def test_shared_backend_fills_other_workers():
+    backend = LocalBackend()
+    LRUCache("t", backend=backend).set("a", 1)
+
+    other = LRUCache("t", backend=backend)
+
+    assert other.get("a") == 1
+    assert other.hits == 1
+
+
+def test_repeat_reads_are_served_from_the_cache(db):
+    service = EmployeeService(db, LRUCache("employees"))
+    service.create_employee(dict(EMPLOYEE))
+    service.get_employee_by_id("E1")
+
+    db.employees.update_one({"employee_id": "E1"}, {"$set": {"name": "Behind the cache"}})
+
+    assert service.get_employee_by_id("E1")["name"] == "Asha"
+    assert service.cache_stats()["hits"] == 1
+
+
+def test_write_in_one_worker_invalidates_the_others(db):
+    # Separate caches stand for two workers sharing the generation counters
+    worker, other = EmployeeService(db, LRUCache("employees")), EmployeeService(db, LRUCache("employees"))
+    worker.create_employee(dict(EMPLOYEE))
+    other.get_employee_by_id("E1")
+    other.get_all_employees()
+
+    worker.update_employee("E1", {"sub_division": "South"})
+
+    assert other.get_employee_by_id("E1")["sub_division"] == "South"
+    assert [employee["sub_division"] for employee in other.get_all_employees()] == ["South"]
+
+
+def test_missing_employees_are_not_cached(db):
+    service = EmployeeService(db, LRUCache("employees"))
+    assert service.get_employee_by_id("E1") is None
+
+    db.employees.insert_one(dict(EMPLOYEE))
+
+    assert service.get_employee_by_id("E1")["name"] == "Asha"
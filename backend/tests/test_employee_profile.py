@@ -0,0 +1,62 @@
+"""Employee profile: one aggregation, reshaped into totals and recent bills.
+
+mongomock cannot run $lookup sub-pipelines, so the pipeline is checked for
+what it matches and the reshaping runs on a stored aggregation result.
+"""
+from services.bill_service import BillService
+
+FACETS = {
+    "by_status": [
+        {"_id": "Office Order", "count": 2, "amount_claimed": 300.004, "approved_amount": 250.0},
+        {"_id": "Rejected", "count": 1, "amount_claimed": 99.999, "approved_amount": 0.0},
+    ],
+    "by_dependent": [
+        {"_id": {"dependent_name": "Ravi", "relationship": "Son"}, "count": 3, "amount_claimed": 400.003,
+         "approved_amount": 250.0},
+    ],
+    "recent": [{"_id": "65f000000000000000000001", "bill_number": "B-1"}],
+}
+
+
+def test_totals_add_up_the_statuses():
+    profile = BillService._profile({"employee_id": "E1", "bills": [FACETS]})
+
+    assert profile["employee"] == {"employee_id": "E1"}
+    assert profile["bills"]["total"] == {"count": 3, "amount_claimed": 400.0, "approved_amount": 250.0}
+    assert [group["status"] for group in profile["bills"]["by_status"]] == ["Office Order", "Rejected"]
+    assert profile["bills"]["by_dependent"] == [
+        {"dependent_name": "Ravi", "relationship": "Son", "count": 3, "amount_claimed": 400.0, "approved_amount": 250.0}
+    ]
+    assert profile["bills"]["recent"] == FACETS["recent"]
+
+
+def test_employee_without_bills_has_zero_totals():
+    profile = BillService._profile({"employee_id": "E1", "bills": [{}]})
+
+    assert profile["bills"] == {
+        "total": {"count": 0, "amount_claimed": 0.0, "approved_amount": 0.0},
+        "by_status": [], "by_dependent": [], "recent": [],
+    }
+
+
+def test_every_bill_source_is_limited_to_the_employee():
+    pipeline = BillService._profile_pipeline("E1", 5)
+
+    assert pipeline[0] == {"$match": {"employee_id": "E1"}}
+    lookup = pipeline[-1]["$lookup"]
+    assert (lookup["localField"], lookup["foreignField"]) == ("employee_id", "employee_id")
+    union = lookup["pipeline"][0]["$unionWith"]
+    assert union == {"coll": "bills_archive", "pipeline": [{"$match": {"employee_id": "E1"}}]}
+    recent = lookup["pipeline"][1]["$facet"]["recent"]
+    assert {"$limit": 5} in recent
+
+
+def test_unknown_employee_is_not_found(http, monkeypatch):
+    # What the aggregation returns when its $match finds no employee
+    monkeypatch.setattr("mongomock.collection.Collection.aggregate", lambda collection, pipeline, **kwargs: iter([]))
+
+    assert http.get("/api/employees/NOPE/profile").status_code == 404
+
+
+def test_recent_count_must_be_a_number(http):
+    assert http.get("/api/employees/E1/profile?limit=many").status_code == 400
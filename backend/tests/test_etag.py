@@ -0,0 +1,65 @@
+"""Conditional GETs revalidate until a write bumps the collection's generation"""
+import pytest
+
+from config import Config
+
+
+@pytest.fixture(autouse=True)
+def conditional_get(monkeypatch):
+    # Off by default unless generations are shared across workers
+    monkeypatch.setattr(Config, "CONDITIONAL_GET", True)
+
+
+@pytest.fixture
+def bill_id(http, bill_data):
+    return http.post("/api/bills", json=bill_data).get_json()["id"]
+
+
+def _revalidate(http, url, etag):
+    return http.get(url, headers={"If-None-Match": etag})
+
+
+def test_unchanged_listing_is_not_modified(http, bill_id):
+    etag = http.get("/api/bills").headers["ETag"]
+
+    response = _revalidate(http, "/api/bills", etag)
+
+    assert response.status_code == 304
+    assert response.data == b""
+
+
+def test_bill_write_changes_the_etag(http, bill_id):
+    etag = http.get(f"/api/bills/{bill_id}").headers["ETag"]
+
+    http.put(f"/api/bills/{bill_id}/status", json={"status": "Rejected"})
+    response = _revalidate(http, f"/api/bills/{bill_id}", etag)
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.get_json()["current_status"] == "Rejected"
+
+
+def test_rejected_write_keeps_the_etag(http, bill_id):
+    etag = http.get("/api/bills").headers["ETag"]
+
+    http.put(f"/api/bills/{bill_id}/status", json={"status": "Lost"})
+
+    assert _revalidate(http, "/api/bills", etag).status_code == 304
+
+
+def test_query_and_encoding_are_part_of_the_etag(http, bill_id):
+    plain = http.get("/api/bills").headers["ETag"]
+
+    assert http.get("/api/bills?limit=1").headers["ETag"] != plain
+    assert http.get("/api/bills", headers={"Accept-Encoding": "gzip"}).headers["ETag"] != plain
+
+
+def test_generations_are_per_collection(http, bill_id, bill_data):
+    http.post("/api/employees", json={"employee_id": "E1", "name": "Asha", "sub_division": "North"})
+    etag = http.get("/api/employees/E1").headers["ETag"]
+
+    http.post("/api/bills", json={**bill_data, "bill_number": "B-2"})
+    assert _revalidate(http, "/api/employees/E1", etag).status_code == 304
+
+    http.put("/api/employees/E1", json={"sub_division": "South"})
+    assert _revalidate(http, "/api/employees/E1", etag).status_code == 200
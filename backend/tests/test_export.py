@@ -0,0 +1,72 @@
+"""CSV and XLSX exports of filtered bills"""
+import csv
+import io
+import json
+import zipfile
+from urllib.parse import quote
+from xml.etree import ElementTree
+
+from utils.export import EXPORT_COLUMNS, CsvWriter, XlsxWriter, export_chunks
+
+SHEET = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+def _xlsx_rows(data, sheet=1):
+    with zipfile.ZipFile(io.BytesIO(data)) as workbook:
+        root = ElementTree.fromstring(workbook.read(f"xl/worksheets/sheet{sheet}.xml"))
+    return [
+        [cell.findtext(f"{SHEET}v") or cell.findtext(f"{SHEET}is/{SHEET}t") for cell in row]
+        for row in root.iter(f"{SHEET}row")
+    ]
+
+
+def _bills(*numbers):
+    return [{"bill_number": number, "amount_claimed": 10.5, "status_history": [{"date": "2024-03-01T00:00:00"}]}
+            for number in numbers]
+
+
+def test_csv_cells_cannot_start_formulas():
+    text = "".join(export_chunks(CsvWriter(), [{"bill_number": "=HYPERLINK(1)", "hospital": "-x"}]))
+
+    header, row = csv.reader(io.StringIO(text.lstrip("﻿")))
+    assert header == [name for name, _ in EXPORT_COLUMNS]
+    assert row[0] == "'=HYPERLINK(1)"
+    assert row[header.index("Hospital")] == "'-x"
+
+
+def test_xlsx_is_a_readable_workbook():
+    data = b"".join(export_chunks(XlsxWriter(), _bills("B-1", "B<&>2\x01")))
+
+    rows = _xlsx_rows(data)
+    assert rows[0][0] == "Bill Number"
+    assert [row[0] for row in rows[1:]] == ["B-1", "B<&>2"]
+    assert "10.5" in rows[1]
+
+
+def test_xlsx_starts_a_sheet_when_one_is_full(monkeypatch):
+    monkeypatch.setattr("utils.export.XLSX_SHEET_ROWS", 2)
+
+    data = b"".join(export_chunks(XlsxWriter(), _bills("B-1", "B-2", "B-3")))
+
+    assert [row[0] for row in _xlsx_rows(data, 1)] == ["Bill Number", "B-1", "B-2"]
+    assert [row[0] for row in _xlsx_rows(data, 2)] == ["Bill Number", "B-3"]
+
+
+def test_empty_export_has_only_the_header():
+    assert _xlsx_rows(b"".join(export_chunks(XlsxWriter(), []))) == [[name for name, _ in EXPORT_COLUMNS]]
+
+
+def test_route_exports_the_filtered_bills(http, bill_data):
+    for number in ("B-1", "B-2"):
+        http.post("/api/bills", json={**bill_data, "bill_number": number, "hospital": number})
+
+    response = http.get(f"/api/bills/export?filter={quote(json.dumps({'hospital': 'B-2'}))}")
+
+    assert response.headers["Content-Disposition"].endswith('.csv"')
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True).lstrip("﻿"))))
+    assert [row[0] for row in rows[1:]] == ["B-2"]
+
+
+def test_route_rejects_unknown_formats(http):
+    assert http.get("/api/bills/export?format=pdf").status_code == 400
+    assert http.get("/api/bills/export?filter=[1]").status_code == 400
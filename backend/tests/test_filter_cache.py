@@ -0,0 +1,62 @@
+"""filter_bills results are cached per normalized payload until bills change"""
+import pytest
+
+from config import Config
+from services.bill_service import BillService
+from utils.cache import LRUCache
+
+
+@pytest.fixture
+def service(db, monkeypatch):
+    monkeypatch.setattr(Config, "FILTER_CACHE_ENABLED", True)
+    return BillService(db, LRUCache("bill_filters"))
+
+
+def _numbers(page):
+    return [bill["bill_number"] for bill in page.items]
+
+
+def test_equivalent_payloads_share_a_key():
+    key = BillService.filter_cache_key
+
+    assert key({"hospital": "City", "amount_from": "100"}) == key(
+        {"amount_from": 100.0, "hospital": "City", "bill_number": "", "unknown": 1}
+    )
+    assert key({"limit": 10 ** 6}) == key({"limit": Config.MAX_PAGE_SIZE})
+    assert key({"hospital": "City"}) != key({"hospital": "Other"})
+    assert key({"limit": 5}) != key({"limit": 6})
+
+
+def test_repeat_filter_is_served_from_the_cache(service, db, bill_data):
+    service.create_bill(bill_data)
+    service.filter_bills({"hospital": bill_data["hospital"]})
+
+    db.bills.update_many({}, {"$set": {"hospital": "Behind the cache"}})
+
+    assert _numbers(service.filter_bills({"hospital": bill_data["hospital"]})) == ["B-1001"]
+    assert service.cache_stats()["hits"] == 1
+
+
+def test_any_bill_write_invalidates(service, bill_data):
+    bill_id = service.create_bill(bill_data)
+    service.filter_bills({"status": "Rejected"})
+
+    service.update_bill_status(bill_id, {"status": "Rejected"})
+
+    assert _numbers(service.filter_bills({"status": "Rejected"})) == ["B-1001"]
+
+
+def test_cached_page_keeps_its_cursor(service, bill_data):
+    for number in ("B-1", "B-2", "B-3"):
+        service.create_bill({**bill_data, "bill_number": number})
+    first = service.filter_bills({"limit": 2})
+
+    cached = service.filter_bills({"limit": 2})
+
+    assert _numbers(cached) == _numbers(first)
+    assert cached.next_cursor == first.next_cursor is not None
+    assert _numbers(service.filter_bills({"limit": 2, "cursor": cached.next_cursor})) == ["B-1"]
+
+
+def test_disabled_cache_reports_so(db):
+    assert BillService(db).cache_stats() == {"name": "bill_filters", "enabled": False}
@@ -0,0 +1,75 @@
+"""Create requests retried with an Idempotency-Key replay the first response"""
+import json
+from datetime import datetime, timedelta
+
+from config import Config
+from utils.idempotency import claim_record, fingerprint
+
+
+def _body(payload):
+    return json.dumps(payload).encode()
+
+
+def _post(http, payload, key="retry-1"):
+    return http.post(
+        "/api/bills", data=_body(payload), content_type="application/json", headers={"Idempotency-Key": key}
+    )
+
+
+def test_retry_replays_the_first_response(http, db, bill_data):
+    first = _post(http, bill_data)
+    retry = _post(http, bill_data)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.get_json() == first.get_json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert db.bills.count_documents({}) == 1
+
+
+def test_client_errors_are_replayed_too(http, db, bill_data):
+    db.bills.create_index("bill_number", unique=True)
+    _post(http, bill_data, key="other")
+    first = _post(http, bill_data)
+
+    assert first.status_code == 400
+    assert _post(http, bill_data).get_json() == first.get_json()
+
+
+def test_key_reused_for_another_request_is_unprocessable(http, db, bill_data):
+    _post(http, bill_data)
+
+    response = _post(http, {**bill_data, "bill_number": "B-2"})
+
+    assert response.status_code == 422
+    assert db.bills.count_documents({}) == 1
+
+
+def test_key_in_use_is_a_conflict(http, db, bill_data):
+    request_hash = fingerprint("POST", "/api/bills", _body(bill_data))
+    db.idempotency_keys.insert_one(claim_record("retry-1", request_hash, datetime.utcnow()))
+
+    assert _post(http, bill_data).status_code == 409
+    assert db.bills.count_documents({}) == 0
+
+
+def test_stale_claim_is_taken_over(http, db, bill_data):
+    request_hash = fingerprint("POST", "/api/bills", _body(bill_data))
+    died = datetime.utcnow() - timedelta(seconds=Config.IDEMPOTENCY_LOCK_SECONDS + 1)
+    db.idempotency_keys.insert_one(claim_record("retry-1", request_hash, died))
+
+    assert _post(http, bill_data).status_code == 201
+    assert db.bills.count_documents({}) == 1
+
+
+def test_server_errors_free_the_key(http, db, bill_data, monkeypatch):
+    monkeypatch.setattr("routes.bill_routes.bill_service.create_bill", lambda data: 1 / 0)
+    assert _post(http, bill_data).status_code == 500
+    monkeypatch.undo()
+
+    assert _post(http, bill_data).status_code == 201
+
+
+def test_overlong_key_is_a_bad_request(http, bill_data):
+    assert _post(http, bill_data, key="k" * 256).status_code == 400
+
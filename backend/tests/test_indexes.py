@@ -0,0 +1,48 @@
+"""Index registry and the query-plan check"""
+from indexes import INDEXES, QUERY_SHAPES, _plan_stages, check_query_plans, ensure_indexes
+
+
+def _leading_fields(collection):
+    return {next(iter(model.document["key"])) for model in INDEXES[collection]}
+
+
+def test_every_query_shape_leads_with_an_indexed_field(db):
+    for collection, description, query, sort in QUERY_SHAPES:
+        fields = list(query) + [field for field, _ in sort or []][:1]
+        assert _leading_fields(collection).intersection(fields), description
+
+
+def test_indexes_are_created_once(db):
+    assert ensure_indexes(db) == []
+    assert ensure_indexes(db) == []
+
+    assert "bill_number_unique" in db.bills.index_information()
+    assert "reference_keys" in db.bill_status_events.index_information()
+
+
+def test_index_that_cannot_be_built_is_reported(db):
+    db.employees.insert_many([{"employee_id": "E1"}, {"employee_id": "E1"}])
+
+    errors = ensure_indexes(db)
+
+    assert [collection for collection, _ in errors] == ["employees"]
+    assert errors[0][1].startswith("employee_id_unique:")
+    assert "name_keys_name" in db.employees.index_information()
+
+
+def test_plan_stages_are_found_at_any_depth():
+    plan = {"stage": "LIMIT", "inputStage": {"stage": "SORT", "inputStages": [{"stage": "COLLSCAN"}]}}
+
+    assert list(_plan_stages(plan)) == ["LIMIT", "SORT", "COLLSCAN"]
+
+
+def test_plan_check_reports_scans(db, monkeypatch):
+    monkeypatch.setattr(
+        "mongomock.collection.Cursor.explain", lambda cursor: {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}},
+        raising=False
+    )
+
+    failures = check_query_plans(db)
+
+    assert len(failures) == len(QUERY_SHAPES)
+    assert failures[0] == ("bills: find_one by bill_number", ["COLLSCAN"])
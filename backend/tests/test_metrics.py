@@ -0,0 +1,110 @@
+"""Prometheus metrics, and their sum across worker processes"""
+from types import SimpleNamespace
+
+from config import Config
+from utils import metrics
+from utils.metrics import CommandMetrics, Counter, Histogram, Registry, query_shape
+
+
+def _samples(registry):
+    return {
+        line.rsplit(" ", 1)[0]: line.rsplit(" ", 1)[1]
+        for line in registry.render().splitlines() if not line.startswith("#")
+    }
+
+
+def _worker(directory):
+    # Each worker process registers its own instances of the same metrics
+    registry = Registry(directory)
+    requests = registry.register(Counter("requests_total", "Requests.", ("route",)))
+    latency = registry.register(Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0)))
+    return registry, requests, latency
+
+
+def test_histogram_buckets_are_cumulative():
+    registry, _, latency = _worker(None)
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+
+    samples = _samples(registry)
+
+    assert [samples[f'latency_seconds_bucket{{le="{le}"}}'] for le in ("0.1", "1.0", "+Inf")] == ["1", "2", "3"]
+    assert samples["latency_seconds_count"] == "3"
+    assert samples["latency_seconds_sum"] == "5.55"
+
+
+def test_label_values_are_escaped():
+    registry, requests, _ = _worker(None)
+    requests.inc('a"b\\c\nd')
+
+    assert 'requests_total{route="a\\"b\\\\c\\nd"} 1' in registry.render()
+
+
+def test_every_worker_is_counted_whichever_answers(tmp_path):
+    first, first_requests, first_latency = _worker(str(tmp_path))
+    second, second_requests, second_latency = _worker(str(tmp_path))
+    first_requests.inc("bills", amount=2)
+    first_latency.observe(0.05)
+    second_requests.inc("bills")
+    second_requests.inc("employees")
+    second_latency.observe(0.5)
+    second.dump()
+
+    samples = _samples(first)
+
+    assert samples['requests_total{route="bills"}'] == "3"
+    assert samples['requests_total{route="employees"}'] == "1"
+    assert samples['latency_seconds_bucket{le="1.0"}'] == "2"
+
+
+def test_dumps_are_throttled(tmp_path):
+    registry, requests, _ = _worker(str(tmp_path))
+    registry.dump()
+    requests.inc("bills")
+    registry.dump()
+
+    # Another worker's scrape still sees the first dump
+    other, _, _ = _worker(str(tmp_path))
+    assert 'requests_total{route="bills"}' not in _samples(other)
+
+
+def test_unreadable_worker_files_are_skipped(tmp_path):
+    (tmp_path / "metrics_1_dead.pickle").write_bytes(b"garbage")
+    registry, requests, _ = _worker(str(tmp_path))
+    requests.inc("bills")
+
+    assert _samples(registry)['requests_total{route="bills"}'] == "1"
+
+
+def _event(**fields):
+    return SimpleNamespace(connection_id=1, request_id=7, database_name="db", **fields)
+
+
+def test_commands_are_timed_per_collection():
+    listener = CommandMetrics()
+    before = metrics.mongo_documents.state().get(("metrics_test", "find"), 0)
+
+    listener.started(_event(command_name="find", command={"find": "metrics_test", "filter": {}}))
+    listener.succeeded(_event(
+        command_name="find", duration_micros=1500, reply={"cursor": {"firstBatch": [{}, {}]}}
+    ))
+
+    assert metrics.mongo_documents.state()[("metrics_test", "find")] == before + 2
+    assert ("metrics_test", "find") in metrics.mongo_latency.state()
+
+
+def test_query_shape_hides_values():
+    shape = query_shape({"bill_number": "B-1", "$or": [{"amount": {"$gte": 5}}]})
+
+    assert shape == {"bill_number": "str", "$or": [{"amount": {"$gte": "int"}}]}
+
+
+def test_route_latency_is_served(client, monkeypatch):
+    monkeypatch.setattr(Config, "METRICS_ENABLED", True)
+    from app import create_app
+    http = create_app(client).test_client()
+
+    http.get("/api/bills").close()
+    body = http.get("/metrics").get_data(as_text=True)
+
+    assert 'http_request_duration_seconds_count{route="bills.get_bills",method="GET",status="200"}' in body
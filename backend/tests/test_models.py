@@ -0,0 +1,77 @@
+"""Model validation and the types new and updated documents are stored with"""
+from datetime import datetime
+
+import pytest
+
+from models.bill import Bill, StatusUpdate
+from models.employee import Employee
+from models.fields import parse_amount, parse_date
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024-03-01", datetime(2024, 3, 1)),
+    ("2024-03-01T10:00:00Z", datetime(2024, 3, 1, 10)),
+    ("2024-03-01T10:00:00+05:30", datetime(2024, 3, 1, 4, 30)),
+    ({"$date": "2024-03-01T10:00:00Z"}, datetime(2024, 3, 1, 10)),
+    ("", None),
+    (None, None),
+])
+def test_dates_become_naive_utc(value, expected):
+    assert parse_date(value, "date") == expected
+
+
+@pytest.mark.parametrize("value", ["01/03/2024", 20240301, ["2024-03-01"]])
+def test_unreadable_dates_name_their_field(value):
+    with pytest.raises(ValueError, match="receipt_date"):
+        parse_date(value, "receipt_date")
+
+
+@pytest.mark.parametrize("value", ["-1", "nan", "inf", True, "12a"])
+def test_amounts_must_be_finite_and_not_negative(value):
+    with pytest.raises(ValueError, match="amount"):
+        parse_amount(value, "amount")
+
+
+def test_new_bill_document(bill_data):
+    bill = Bill(**bill_data, sub_division="North").to_dict()
+
+    assert bill["receipt_date"] == datetime(2024, 3, 1)
+    assert bill["receipt_month"] == "2024-03"
+    assert bill["amount_claimed"] == 1200.0
+    assert bill["current_status"] == bill["status_history"][0]["status"] == "Received From North"
+    assert bill["status_since"] == bill["status_history"][0]["date"]
+    assert bill["version"] == 1
+
+
+def test_bill_update_drops_server_fields_and_parses_the_rest():
+    update = Bill.validate_update({"created_at": "x", "receipt_date": "2024-05-02", "amount_claimed": ""})
+
+    assert update == {"receipt_date": datetime(2024, 5, 2), "receipt_month": "2024-05", "amount_claimed": 0.0}
+
+
+def test_bill_update_cannot_clear_the_receipt_date():
+    with pytest.raises(ValueError, match="receipt_date is required"):
+        Bill.validate_update({"receipt_date": ""})
+
+
+def test_status_update_checks_status_and_amount():
+    with pytest.raises(ValueError, match="Invalid status"):
+        StatusUpdate.from_payload({"status": "Lost"})
+    with pytest.raises(ValueError, match="approved_amount"):
+        StatusUpdate.from_payload({"status": "Rejected", "approved_amount": "-5"})
+
+    entry = StatusUpdate.from_payload({"status": "Rejected", "approved_amount": "5"}).to_dict()
+    assert entry["approved_amount"] == 5.0
+    assert entry["entry_id"]
+
+
+def test_employee_is_their_own_first_dependent():
+    employee = Employee("E1", "Asha", dependents=[{"name": "Ravi", "relation": "Son"}], retirement_date="2030-01-31")
+
+    assert employee.dependents == [{"name": "Asha", "relation": "Self"}, {"name": "Ravi", "relation": "Son"}]
+    assert employee.retirement_date == "2030-01-31"
+
+
+def test_models_have_no_instance_dict(bill_data):
+    assert not hasattr(Bill(**bill_data), "__dict__")
+    assert not hasattr(StatusUpdate("Rejected", None), "__dict__")
@@ -0,0 +1,75 @@
+"""Keyset pagination stays put while bills are added during a walk"""
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from utils.pagination import InvalidCursorError, encode_cursor, paginate
+
+CREATED = datetime(2024, 3, 1)
+
+
+def _insert(collection, count, created=CREATED):
+    ids = [ObjectId() for _ in range(count)]
+    collection.insert_many([{"_id": _id, "created_at": created} for _id in ids])
+    return ids
+
+
+def _walk(collection, limit, on_page=None):
+    seen, cursor = [], None
+    while True:
+        page = paginate(collection, {}, "created_at", cursor, limit).load()
+        seen += [doc["_id"] for doc in page.items]
+        if on_page:
+            on_page()
+        cursor = page.next_cursor
+        if cursor is None:
+            return seen
+
+
+def test_ties_on_the_sort_field_are_broken_by_id(db):
+    ids = _insert(db.bills, 7)
+
+    assert _walk(db.bills, 3) == sorted(ids, reverse=True)
+
+
+def test_bills_added_during_a_walk_do_not_shift_pages(db):
+    older = _insert(db.bills, 3, CREATED - timedelta(days=1))
+    ids = _insert(db.bills, 5) + older
+    # Newer bills land before the cursor, so they neither repeat nor push any bill out
+    seen = _walk(db.bills, 2, on_page=lambda: _insert(db.bills, 1, CREATED + timedelta(days=1)))
+
+    assert seen == sorted(ids[:5], reverse=True) + sorted(older, reverse=True)
+
+
+def test_last_full_page_has_no_next_cursor(db):
+    _insert(db.bills, 4)
+
+    page = paginate(db.bills, {}, "created_at", None, 4).load()
+
+    assert len(page.items) == 4
+    assert page.next_cursor is None
+
+
+def test_cursor_of_another_listing_is_rejected(db):
+    cursor = encode_cursor({"_id": ObjectId(), "updated_at": CREATED}, "updated_at")
+
+    with pytest.raises(InvalidCursorError):
+        paginate(db.bills, {}, "created_at", cursor)
+
+
+def test_garbled_cursor_is_a_bad_request(http):
+    response = http.get("/api/bills?cursor=not-a-cursor")
+
+    assert response.status_code == 400
+
+
+def test_route_pages_through_every_bill(http, db):
+    ids = {str(_id) for _id in _insert(db.bills, 5)}
+    seen, cursor = [], ""
+    while cursor is not None:
+        body = http.get(f"/api/bills?limit=2&cursor={cursor}").get_json()
+        seen += [bill["_id"]["$oid"] for bill in body["items"]]
+        cursor = body["next_cursor"]
+
+    assert sorted(seen) == sorted(ids)
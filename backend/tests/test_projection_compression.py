@@ -0,0 +1,79 @@
+"""fields= projections and compressed list responses"""
+import gzip
+import json
+
+import pytest
+
+from config import Config
+from services.bill_service import BILL_VIEWS, HIDDEN_FIELDS
+from utils.projection import ProjectionError, parse_fields, projection
+
+
+def test_fields_are_parsed_into_a_sorted_tuple():
+    assert parse_fields("summary", BILL_VIEWS) == BILL_VIEWS["summary"]
+    assert parse_fields(" hospital,bill_number,,", BILL_VIEWS) == ("bill_number", "hospital")
+    # A field covers its sub-fields
+    assert parse_fields(["status_history", "status_history.status"], BILL_VIEWS) == ("status_history",)
+    assert parse_fields("", BILL_VIEWS) is None
+
+
+@pytest.mark.parametrize("raw", ["$where", "a..b", "status_history.$", {"a": 1}, ",".join(f"f{n}" for n in range(51))])
+def test_unsafe_or_oversized_field_lists_are_refused(raw):
+    with pytest.raises(ProjectionError):
+        parse_fields(raw, BILL_VIEWS)
+
+
+def test_hidden_fields_stay_hidden():
+    hidden = next(iter(HIDDEN_FIELDS))
+
+    assert projection((hidden, "bill_number"), HIDDEN_FIELDS, ("_id",)) == {"bill_number": 1, "_id": 1}
+    assert projection(None, HIDDEN_FIELDS) == HIDDEN_FIELDS
+
+
+def test_projected_pages_still_page(http, bill_data):
+    for number in ("B-1", "B-2", "B-3"):
+        http.post("/api/bills", json={**bill_data, "bill_number": number})
+
+    first = http.get("/api/bills?fields=bill_number&limit=2").get_json()
+    second = http.get(f"/api/bills?fields=bill_number&limit=2&cursor={first['next_cursor']}").get_json()
+
+    assert {key for bill in first["items"] for key in bill} == {"_id", "bill_number", "created_at"}
+    assert [bill["bill_number"] for bill in first["items"] + second["items"]] == ["B-3", "B-2", "B-1"]
+
+
+def test_bad_fields_are_a_bad_request(http):
+    assert http.get("/api/bills?fields=$where").status_code == 400
+
+
+@pytest.fixture
+def many_bills(http, bill_data, monkeypatch):
+    monkeypatch.setattr(Config, "COMPRESSION_MIN_BYTES", 200)
+    for number in range(5):
+        http.post("/api/bills", json={**bill_data, "bill_number": f"B-{number}"})
+
+
+def test_large_lists_are_gzipped(http, many_bills):
+    plain = http.get("/api/bills")
+    zipped = http.get("/api/bills", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in plain.headers
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in zipped.headers["Vary"]
+    assert json.loads(gzip.decompress(zipped.get_data())) == plain.get_json()
+
+
+def test_small_responses_are_sent_as_they_are(http, many_bills, monkeypatch):
+    monkeypatch.setattr(Config, "COMPRESSION_MIN_BYTES", 1024)
+    response = http.get("/api/bills?limit=1&fields=_id", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in response.headers
+    assert len(response.get_json()["items"]) == 1
+
+
+def test_brotli_when_installed_and_preferred(http, many_bills):
+    brotli = pytest.importorskip("brotli")
+
+    response = http.get("/api/bills", headers={"Accept-Encoding": "gzip;q=0.5, br"})
+
+    assert response.headers["Content-Encoding"] == "br"
+    assert json.loads(brotli.decompress(response.get_data()))["items"]
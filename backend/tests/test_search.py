@@ -0,0 +1,45 @@
+"""Search through the derived key indexes and the substring recheck"""
+from services.bill_service import BillService
+from services.employee_service import EmployeeService
+from utils.search_keys import key_match, search_keys
+
+
+def test_keys_cover_every_short_substring():
+    assert search_keys("Ab c") == sorted({"a", "b", " ", "c", "ab", "b ", " c", "ab ", "b c"})
+
+
+def test_short_terms_are_looked_up_directly():
+    assert key_match("keys", " AB ") == {"keys": "ab"}
+
+
+def test_long_terms_need_all_their_trigrams():
+    assert key_match("keys", "abcd") == {"keys": {"$all": ["abc", "bcd"]}}
+
+
+def _bill_numbers(service, term):
+    return sorted(bill["bill_number"] for bill in service.filter_bills({"bill_number": term}).items)
+
+
+def test_trigram_candidates_are_checked_for_the_whole_term(db, bill_data):
+    service = BillService(db)
+    for number in ("X-ABCD-1", "ABC-BCD", "Y-abcd"):
+        service.create_bill({**bill_data, "bill_number": number})
+
+    # ABC-BCD holds both trigrams of abcd, but not abcd itself
+    assert _bill_numbers(service, "abcd") == ["X-ABCD-1", "Y-abcd"]
+
+
+def test_terms_with_regex_characters_match_literally(db, bill_data):
+    service = BillService(db)
+    for number in ("A.1", "AB1"):
+        service.create_bill({**bill_data, "bill_number": number})
+
+    assert _bill_numbers(service, "a.1") == ["A.1"]
+
+
+def test_employee_names_match_across_whitespace(db):
+    service = EmployeeService(db)
+    for employee_id, name in (("E1", "Asha  Rao"), ("E2", "Ashar Ao")):
+        service.create_employee({"employee_id": employee_id, "name": name, "sub_division": "North"})
+
+    assert [employee["name"] for employee in service.search_employees("asha rao")] == ["Asha  Rao"]
@@ -0,0 +1,69 @@
+"""Streamed JSON and NDJSON bodies"""
+import json
+from datetime import datetime
+
+from bson import ObjectId, json_util
+
+from utils.pagination import Page
+from utils.serialization import STREAM_ERROR, _json_page, _ndjson_page, extended_encoder, plain_encoder, to_json
+
+DOC = {"_id": ObjectId("65f000000000000000000001"), "at": datetime(2024, 3, 1, 9, 30, 0, 250000), "n": [1, None]}
+
+
+def test_extended_output_matches_json_util():
+    assert json.loads(to_json(DOC)) == json.loads(json_util.dumps(DOC, json_options=json_util.RELAXED_JSON_OPTIONS))
+
+
+def test_plain_output_uses_bare_strings():
+    assert json.loads(to_json(DOC, extended=False)) == {
+        "_id": "65f000000000000000000001", "at": "2024-03-01T09:30:00.250000", "n": [1, None]
+    }
+
+
+class _Docs(list):
+    """Stands in for a Mongo cursor"""
+
+    def close(self):
+        pass
+
+
+class _FailingDocs(_Docs):
+    def __iter__(self):
+        yield from super().__iter__()
+        raise RuntimeError("cursor died")
+
+
+def _page(docs, limit):
+    return Page(docs, "at", limit)
+
+
+def test_json_page_carries_the_cursor_after_the_items():
+    docs = [{"_id": ObjectId(), "at": datetime(2024, 3, day)} for day in (3, 2, 1)]
+
+    body = json.loads("".join(_json_page(_page(_Docs(docs), 2), extended_encoder)))
+
+    assert len(body["items"]) == 2
+    assert body["next_cursor"] is not None
+
+
+def test_failure_midway_still_ends_a_valid_json_body():
+    body = json.loads("".join(_json_page(_page(_FailingDocs([{"a": 1}]), 5), plain_encoder)))
+
+    assert body == {"items": [{"a": 1}], "next_cursor": None, **json.loads(STREAM_ERROR)}
+
+
+def test_ndjson_page_ends_with_the_cursor_line():
+    lines = "".join(_ndjson_page(_page(_Docs([{"a": 1}, {"a": 2}]), 5), plain_encoder)).splitlines()
+
+    assert [json.loads(line) for line in lines] == [{"a": 1}, {"a": 2}, {"next_cursor": None}]
+
+
+def test_route_streams_ndjson_when_asked(http, bill_data):
+    http.post("/api/bills", json=bill_data)
+
+    response = http.get("/api/bills?format=ndjson")
+
+    assert response.mimetype == "application/x-ndjson"
+    first, last = response.get_data(as_text=True).splitlines()
+    assert json.loads(first)["bill_number"] == bill_data["bill_number"]
+    assert json.loads(last) == {"next_cursor": None}
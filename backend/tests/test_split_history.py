@@ -0,0 +1,109 @@
+"""Split status history: bills keep a summary, bill_status_events the full history"""
+import mongomock
+import pytest
+from bson import ObjectId
+
+from config import Config
+from services.bill_service import BillService
+from services.status_history_service import StatusHistoryService
+
+SENT = "Sent to Circle Office"
+
+
+@pytest.fixture(autouse=True)
+def split_layout(monkeypatch):
+    monkeypatch.setattr(Config, "STATUS_HISTORY_LAYOUT", "split")
+    monkeypatch.setattr(Config, "STATUS_SUMMARY_SIZE", 2)
+
+
+def _bill_with_history(http, bill_data, references):
+    bill_id = http.post("/api/bills", json=bill_data).get_json()["id"]
+    for reference in references:
+        http.put(f"/api/bills/{bill_id}/status", json={"status": SENT, "reference_number": reference})
+    return bill_id
+
+
+def test_bill_keeps_its_latest_entries(http, db, bill_data):
+    bill_id = _bill_with_history(http, bill_data, ["CO/1", "CO/2", "CO/3"])
+
+    bill = http.get(f"/api/bills/{bill_id}").get_json()
+    full = http.get(f"/api/bills/{bill_id}?history=full").get_json()
+
+    assert [entry["reference_number"] for entry in bill["status_history"]] == ["CO/2", "CO/3"]
+    assert bill["history_count"] == 4
+    assert [entry["reference_number"] for entry in full["status_history"]] == [None, "CO/1", "CO/2", "CO/3"]
+    assert "reference_keys" not in full["status_history"][1]
+
+
+def test_reference_search_reaches_trimmed_entries(http, bill_data):
+    _bill_with_history(http, bill_data, ["CO/1234", "CO/2", "CO/3"])
+    _bill_with_history(http, {**bill_data, "bill_number": "B-2"}, ["CO/123-4"])
+
+    def found(search):
+        items = http.post("/api/bills/filter", json={"reference_search": search}).get_json()["items"]
+        return [bill["bill_number"] for bill in items]
+
+    assert found({"number": "co/1234"}) == ["B-1001"]
+    assert found({"number": "CO/1234", "status": SENT}) == ["B-1001"]
+    assert found({"number": "CO/1234", "status": "Rejected"}) == []
+
+
+def test_delete_drops_the_events(http, db, bill_data):
+    bill_id = _bill_with_history(http, bill_data, ["CO/1"])
+
+    http.delete(f"/api/bills/{bill_id}")
+
+    assert db.bill_status_events.count_documents({"bill_id": ObjectId(bill_id)}) == 0
+
+
+def _embedded(db, count, entries=3):
+    return db.bills.insert_many([
+        {"bill_number": f"OLD-{n}", "status_history": [{"status": SENT, "reference_number": f"R{i}"} for i in range(entries)]}
+        for n in range(count)
+    ]).inserted_ids
+
+
+def test_migration_moves_embedded_histories(db):
+    ids = _embedded(db, 3)
+    service = StatusHistoryService(db)
+
+    assert service.migrate(batch_size=2) == (3, 0)
+    assert service.migrate() == (0, 0)
+
+    bill = db.bills.find_one({"_id": ids[0]})
+    assert (bill["history_layout"], bill["history_count"], len(bill["status_history"])) == ("split", 3, 2)
+    assert db.bill_status_events.count_documents({"bill_id": ids[0]}) == 3
+    # Old entries get stable ids so they can be edited
+    assert bill["status_history"][-1]["entry_id"]
+    assert set(service.reference_bill_ids("r0")) == set(ids)
+
+
+def test_bill_written_during_migration_keeps_no_events(db, monkeypatch):
+    ids = _embedded(db, 2)
+    bulk_write = mongomock.collection.Collection.bulk_write
+
+    def status_then_write(collection, requests, **kwargs):
+        if collection.name == "bills":
+            collection.update_one(
+                {"_id": ids[0]}, {"$push": {"status_history": {"status": "Rejected"}}, "$inc": {"version": 1}}
+            )
+        return bulk_write(collection, requests, **kwargs)
+
+    monkeypatch.setattr(mongomock.collection.Collection, "bulk_write", status_then_write)
+    assert StatusHistoryService(db).migrate() == (1, 1)
+    monkeypatch.undo()
+
+    assert db.bill_status_events.count_documents({"bill_id": ids[0]}) == 0
+    assert StatusHistoryService(db).migrate() == (1, 0)
+    assert db.bill_status_events.count_documents({"bill_id": ids[0]}) == 4
+
+
+def test_embedded_bills_still_answer_reference_searches(db):
+    _embedded(db, 1)
+    service = BillService(db)
+    # Written before search keys existed
+    service.backfill_search_keys()
+
+    page = service.filter_bills({"reference_search": {"number": "R2"}})
+
+    assert [bill["bill_number"] for bill in page.items] == ["OLD-0"]
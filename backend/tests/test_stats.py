@@ -0,0 +1,47 @@
+"""Stats kept with $inc deltas agree with stats counted from scratch.
+
+mongomock cannot run the rebuild pipeline ($unionWith, $convert), so the
+deltas are checked against record_created() over the final bills, which
+counts each bill once like the rebuild does.
+"""
+import mongomock
+from bson import ObjectId
+
+from services.bill_service import BillService
+from services.stats_service import STATS_PROJECTION, StatsService
+
+
+def _counted_from_scratch(db):
+    fresh = mongomock.MongoClient().bills_management
+    bills = [*db.bills.find({}, STATS_PROJECTION), *db.bills_archive.find({}, STATS_PROJECTION)]
+    StatsService(fresh).record_created(bills)
+    return StatsService(fresh).summary()
+
+
+def test_writes_keep_stats_in_step(db, bill_data):
+    service = BillService(db)
+    db.employees.insert_one({"employee_id": "E2", "name": "Ravi", "sub_division": "South"})
+    ids = [
+        service.create_bill({**bill_data, "bill_number": f"B-{n}", "employee_id": f"E{n % 3}",
+                             "receipt_date": f"2024-0{n % 2 + 1}-10", "amount_claimed": 100 * n})
+        for n in range(1, 6)
+    ]
+    service.bulk_create_bills(enumerate([{**bill_data, "bill_number": "B-6", "hospital": ""}], start=1))
+
+    service.update_bill_status(ids[0], {"status": "Sent to Circle Office", "approved_amount": "80"})
+    service.update_bills_status_batch(ids[1:3], {"status": "Rejected"})
+    service.update_bill(ids[3], {"hospital": "District Hospital", "amount_claimed": 999.5})
+    service.delete_bill(ids[4])
+    db.bills_archive.insert_one(db.bills.find_one_and_delete({"_id": ObjectId(ids[2])}))
+
+    assert service.get_stats() == _counted_from_scratch(db)
+
+
+def test_groups_emptied_by_moves_drop_out(db, bill_data):
+    service = BillService(db)
+    bill_id = service.create_bill(bill_data)
+
+    service.update_bill_status(bill_id, {"status": "Rejected"})
+
+    statuses = [group["key"] for group in service.get_stats()["status"]]
+    assert statuses == ["Rejected"]
@@ -0,0 +1,73 @@
+"""Batch status writes only land on bills still at the version they were read with"""
+import mongomock
+import pytest
+from bson import ObjectId
+
+from services.bill_service import BillService
+
+SENT = {"status": "Sent to Medical Superintendent", "date": "2024-03-05"}
+
+
+@pytest.fixture
+def service(db):
+    return BillService(db)
+
+
+def _create(service, bill_data, count):
+    return [service.create_bill({**bill_data, "bill_number": f"B-{n}"}) for n in range(count)]
+
+
+def _errors(report):
+    return {result["id"]: result.get("error") for result in report["results"]}
+
+
+def test_every_requested_bill_gets_a_result(service, db, bill_data):
+    first, second = _create(service, bill_data, 2)
+    db.bills_archive.insert_one(db.bills.find_one_and_delete({"_id": ObjectId(second)}))
+    missing = str(ObjectId())
+
+    report = service.update_bills_status_batch([{"$oid": first}, second, missing, "nope"], SENT)
+
+    assert report["updated"] == 1
+    assert _errors(report) == {
+        first: None, second: "Bill is archived", missing: "Bill not found", "nope": "Invalid bill id"
+    }
+    assert db.bills.find_one({"_id": ObjectId(first)})["current_status"] == SENT["status"]
+
+
+def test_bill_changed_after_the_read_is_a_conflict(service, db, bill_data, monkeypatch):
+    first, second = _create(service, bill_data, 2)
+    bulk_write = mongomock.collection.Collection.bulk_write
+
+    def edit_then_write(collection, requests, **kwargs):
+        # Another writer gets to the second bill between the batch's read and write
+        collection.update_one({"_id": ObjectId(second)}, {"$inc": {"version": 1}})
+        return bulk_write(collection, requests, **kwargs)
+
+    monkeypatch.setattr(mongomock.collection.Collection, "bulk_write", edit_then_write)
+    report = service.update_bills_status_batch([first, second], SENT)
+    monkeypatch.undo()
+
+    assert report["updated"] == 1
+    assert _errors(report) == {first: None, second: "Bill was modified, try again"}
+    assert db.bills.find_one({"_id": ObjectId(second)})["current_status"] != SENT["status"]
+    # Stats only move for the bill that was written
+    statuses = {group["key"]: group["count"] for group in service.get_stats()["status"]}
+    assert statuses[SENT["status"]] == 1
+
+
+def test_invalid_payload_writes_nothing(service, db, bill_data):
+    (bill_id,) = _create(service, bill_data, 1)
+
+    with pytest.raises(ValueError):
+        service.update_bills_status_batch([bill_id], {"status": "Lost"})
+
+    assert db.bills.find_one({"_id": ObjectId(bill_id)})["status_history"][-1]["status"] != "Lost"
+
+
+def test_route_limits_the_batch_size(http, monkeypatch):
+    monkeypatch.setattr("routes.bill_routes.Config.MAX_BATCH_SIZE", 2)
+
+    response = http.put("/api/bills/status/batch", json={"bill_ids": ["a", "b", "c"], **SENT})
+
+    assert response.status_code == 400
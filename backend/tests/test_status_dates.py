@@ -0,0 +1,31 @@
+from bson import ObjectId
+
+from services.aging_service import AgingService
+from services.bill_service import BillService
+
+
+def test_offset_status_date_is_stored_as_utc(db, bill_data):
+    service = BillService(db)
+    bill_id = service.create_bill(bill_data)
+
+    assert service.update_bill_status(bill_id, {"status": "Sent to Circle Office", "date": "2024-03-10T10:00:00+05:30"})
+    assert service.update_bill_status(bill_id, {"status": "Office Order", "date": "2024-03-11T04:30:00Z"})
+
+    bill = db.bills.find_one({"_id": ObjectId(bill_id)})
+    assert bill["status_since"] == "2024-03-11T04:30:00"
+    assert bill["status_history"][-2]["date"] == "2024-03-10T04:30:00"
+    assert bill["stage_durations"][-1] == {"status": "Sent to Circle Office", "seconds": 86400.0}
+
+
+def test_offset_status_since_of_older_bills_is_converted():
+    bill = {"_id": ObjectId(), "current_status": "Office Order", "status_since": "2024-03-10T10:00:00+05:30"}
+
+    update, = AgingService.transition_operations([bill], {"date": "2024-03-10T05:30:00"})
+
+    assert update._doc["$push"]["stage_durations"]["seconds"] == 3600.0
+
+
+def test_unreadable_status_since_is_skipped():
+    bill = {"_id": ObjectId(), "current_status": "Office Order", "status_since": "not a date"}
+
+    assert AgingService.transition_operations([bill], {"date": "2024-03-10T05:30:00"}) == []
@@ -0,0 +1,98 @@
+"""Pipeline updates of status history entry edits.
+
+mongomock cannot run pipeline updates, so these check the pipeline that is
+built and the stats view computed from the pre-edit projection.
+"""
+from services.bill_service import BillService
+from utils.search_keys import REFERENCE_KEYS, search_keys
+
+
+def _history(pipeline):
+    return pipeline[0]["$set"]["status_history"]
+
+
+def test_entry_id_is_compared_as_a_literal():
+    pipeline, _ = BillService._status_entry_update({"remarks": "ok"}, entry_id="$current_status")
+
+    match = _history(pipeline)["$map"]["in"]["$cond"][0]
+    assert match == {"$eq": ["$$entry.entry_id", {"$literal": "$current_status"}]}
+
+
+def test_edited_fields_are_merged_as_literals():
+    pipeline, changes = BillService._status_entry_update(
+        {"remarks": "$remarks", "status": "Paid", "approved_amount": "100"}, entry_id="a1"
+    )
+
+    assert "status" not in changes
+    merged = _history(pipeline)["$map"]["in"]["$cond"][1]["$mergeObjects"][1]
+    assert merged == {field: {"$literal": value} for field, value in changes.items()}
+    assert merged["remarks"] == {"$literal": "$remarks"}
+
+
+def test_status_index_keeps_the_entries_around_it():
+    pipeline, _ = BillService._status_entry_update({"remarks": "ok"}, status_index=2)
+
+    before, entry, after = _history(pipeline)["$concatArrays"]
+    assert before == {"$slice": ["$status_history", 2]}
+    assert entry[0]["$mergeObjects"][0] == {"$arrayElemAt": ["$status_history", 2]}
+    assert after["$slice"][:2] == ["$status_history", 3]
+
+
+def test_first_entry_has_nothing_before_it():
+    pipeline, _ = BillService._status_entry_update({"remarks": "ok"}, status_index=0)
+
+    assert _history(pipeline)["$concatArrays"][0] == []
+
+
+def test_reference_number_edit_adds_its_search_keys():
+    pipeline, _ = BillService._status_entry_update({"reference_number": "CO/123"}, entry_id="a1")
+
+    keys = pipeline[1]["$set"][REFERENCE_KEYS]["$setUnion"][1]
+    assert keys == {"$literal": search_keys("CO/123")}
+
+
+def test_other_edits_leave_search_keys_alone():
+    pipeline, _ = BillService._status_entry_update({"remarks": "ok"}, entry_id="a1")
+
+    assert REFERENCE_KEYS not in pipeline[1]["$set"]
+
+
+def _before(*entry_ids):
+    return {
+        "_id": 1, "latest_approved_amount": 10.0,
+        "status_history": [{"entry_id": entry_id} for entry_id in entry_ids]
+    }
+
+
+def test_entry_change_by_id_of_the_last_entry():
+    after = BillService._entry_change(_before("b2"), {"approved_amount": 25.0}, entry_id="b2")
+
+    assert after == {"_id": 1, "latest_approved_amount": 25.0}
+
+
+def test_entry_change_by_id_of_an_earlier_entry():
+    # The projection only keeps the last entry, which is not the edited one
+    after = BillService._entry_change(_before("b2"), {"approved_amount": 25.0}, entry_id="a1")
+
+    assert after["latest_approved_amount"] == 10.0
+
+
+def test_entry_change_by_index_of_the_last_entry():
+    # The projection keeps the entry and its successor; there is none
+    after = BillService._entry_change(_before("b2"), {"approved_amount": 25.0})
+
+    assert after["latest_approved_amount"] == 25.0
+
+
+def test_entry_change_by_index_of_an_earlier_entry():
+    after = BillService._entry_change(_before("a1", "b2"), {"approved_amount": 25.0})
+
+    assert after["latest_approved_amount"] == 10.0
+
+
+def test_entry_change_without_an_amount_edit():
+    before = _before("b2")
+    after = BillService._entry_change(before, {"remarks": "ok"}, entry_id="b2")
+
+    assert after == {"_id": 1, "latest_approved_amount": 10.0}
+    assert "status_history" not in before
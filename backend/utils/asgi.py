@@ -0,0 +1,221 @@
+"""Quart counterparts of the Flask response helpers, used by the ASGI app"""
+import io
+import json
+import logging
+from datetime import datetime
+from functools import wraps
+
+from pymongo.errors import DuplicateKeyError
+from quart import Response, current_app, jsonify, make_response, request
+from quart.wrappers.response import DataBody, IterableBody
+from config import Config
+from utils.compression import Compressor, compress, compressible, mark_compressed, negotiate
+from utils.etag import etag_for
+from utils.idempotency import (
+    HEADER, REPLAYED_HEADER, IdempotencyError, claim_record, fingerprint, keeps_response, response_record,
+    stored_response, takeover_query, validate_key
+)
+from utils.ingest import detect_format, iter_rows
+from utils.serialization import (
+    NDJSON_MIMETYPE, CHUNK_SIZE, STREAM_ERROR, extended_encoder, plain_encoder, to_json, _chunked, _json_array, _ndjson
+)
+
+logger = logging.getLogger(__name__)
+
+
+def wants_ndjson():
+    """NDJSON is selected with ?format=ndjson or an Accept header"""
+    if request.args.get('format') == 'ndjson':
+        return True
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+
+async def _achunked(parts):
+    buffer, size = [], 0
+    async for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+async def _json_page(page, encoder):
+    yield '{"items":['
+    first = True
+    try:
+        async for doc in page:
+            text = encoder.encode(doc)
+            yield text if first else ',' + text
+            first = False
+    except Exception:
+        logger.exception("Response stream failed")
+        yield '],"next_cursor":null,' + STREAM_ERROR[1:]
+        return
+    yield '],"next_cursor":' + json.dumps(page.next_cursor) + '}'
+
+
+async def _ndjson_page(page, encoder):
+    try:
+        async for doc in page:
+            yield encoder.encode(doc) + '\n'
+    except Exception:
+        logger.exception("Response stream failed")
+        yield STREAM_ERROR + '\n'
+        return
+    yield json.dumps({"next_cursor": page.next_cursor}) + '\n'
+
+
+def stream_page(page, extended=True):
+    """Stream an AsyncPage, same response shapes as serialization.stream_page"""
+    encoder = extended_encoder if extended else plain_encoder
+    if wants_ndjson():
+        body, mimetype = _ndjson_page(page, encoder), NDJSON_MIMETYPE
+    else:
+        body, mimetype = _json_page(page, encoder), 'application/json'
+    return Response(_achunked(body), mimetype=mimetype)
+
+
+def stream_list(docs, extended=True):
+    """Serialize a list of documents as a JSON array or NDJSON"""
+    encoder = extended_encoder if extended else plain_encoder
+    if wants_ndjson():
+        body, mimetype = _ndjson(docs, encoder), NDJSON_MIMETYPE
+    else:
+        body, mimetype = _json_array(docs, encoder), 'application/json'
+    return Response(list(_chunked(body)), mimetype=mimetype)
+
+
+def json_document(doc, status=200, extended=True):
+    return Response(to_json(doc, extended), status=status, mimetype='application/json')
+
+
+async def rows_from_request():
+    """Rows from a multipart 'file' upload or the raw request body.
+
+    The ASGI server hands the body over asynchronously, so it is buffered
+    before parsing; use the WSGI mode for very large imports.
+    """
+    files = await request.files
+    upload = files.get('file')
+    if upload is not None:
+        fmt = detect_format(upload.mimetype, upload.filename, request.args.get('format'))
+        return iter_rows(upload.stream, fmt)
+    fmt = detect_format(request.mimetype, None, request.args.get('format'))
+    return iter_rows(io.BytesIO(await request.get_data()), fmt)
+
+
+def conditional(*collections):
+    """Async version of etag.conditional for Quart views"""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            if not Config.CONDITIONAL_GET:
+                return await view(*args, **kwargs)
+
+            etag = etag_for(request, collections)
+            if request.if_none_match.contains(etag):
+                response = Response('', status=304)
+                response.set_etag(etag)
+                return response
+
+            response = await make_response(await view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                response.vary.add('Accept')
+            return response
+        return wrapper
+    return decorator
+
+
+async def _claim(collection, key, request_hash):
+    now = datetime.utcnow()
+    try:
+        await collection.insert_one(claim_record(key, request_hash, now))
+        return None
+    except DuplicateKeyError:
+        pass
+    if await collection.find_one_and_update(takeover_query(key, request_hash, now), {"$set": {"locked_at": now}}):
+        return None
+    record = await collection.find_one({"_id": key})
+    return record if record is not None else await _claim(collection, key, request_hash)
+
+
+def idempotent(view):
+    """Async version of idempotency.idempotent for Quart views"""
+    @wraps(view)
+    async def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return await view(*args, **kwargs)
+        collection = current_app.db.idempotency_keys
+        try:
+            validate_key(key)
+            request_hash = fingerprint(request.method, request.path, await request.get_data())
+            record = await _claim(collection, key, request_hash)
+            if record is not None:
+                stored = stored_response(record, request_hash)
+                response = Response(bytes(stored["body"]), status=stored["status"], content_type=stored["content_type"])
+                response.headers[REPLAYED_HEADER] = 'true'
+                return response
+        except IdempotencyError as e:
+            return jsonify({"error": str(e)}), e.status
+
+        try:
+            response = await make_response(await view(*args, **kwargs))
+        except Exception:
+            await collection.delete_one({"_id": key})
+            raise
+        if keeps_response(response.status_code):
+            body = await response.get_data()
+            await collection.update_one({"_id": key}, {"$set": {
+                "response": response_record(response.status_code, body, response.content_type)
+            }})
+        else:
+            await collection.delete_one({"_id": key})
+        return response
+    return wrapper
+
+
+async def _acompressed_chunks(encoding, head, chunks):
+    compressor = Compressor(encoding)
+    try:
+        yield compressor.compress(head)
+        async for chunk in chunks:
+            if chunk:
+                yield compressor.compress(chunk)
+        yield compressor.finish()
+    finally:
+        await chunks.aclose()
+
+
+async def compress_response(response):
+    """Async version of compression.compress_response for Quart apps"""
+    if not compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    if isinstance(response.response, DataBody):
+        data = await response.get_data()
+        if len(data) >= Config.COMPRESSION_MIN_BYTES:
+            response.set_data(compress(encoding, data))
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+    chunks = response.iter_encode()
+    head = b''
+    async for chunk in chunks:
+        head += chunk
+        if len(head) >= Config.COMPRESSION_MIN_BYTES:
+            break
+    else:
+        response.set_data(head)
+        return response
+    response.response = IterableBody(_acompressed_chunks(encoding, head, chunks))
+    mark_compressed(response, encoding)
+    return response
@@ -0,0 +1,208 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LocalBackend:
+    """In-memory stand-in for a shared cache backend.
+
+    Implements the same small interface as RedisBackend so tests and single
+    process deployments need no external service.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl if ttl else None)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            value = (self._data.get(key, (0, None))[0] or 0) + 1
+            self._data[key] = (value, None)
+            return value
+
+    def get_int(self, key):
+        return self.get(key) or 0
+
+    def clear(self, prefix=''):
+        with self._lock:
+            for key in [key for key in self._data if key.startswith(prefix)]:
+                del self._data[key]
+
+
+class RedisBackend:
+    """Shared backend on Redis, values are pickled. Requires the redis package."""
+
+    def __init__(self, url):
+        import redis
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        raw = self._client.get(key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        self._client.set(key, pickle.dumps(value), ex=int(ttl) if ttl else None)
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*keys)
+
+    def incr(self, key):
+        return self._client.incr(key)
+
+    def get_int(self, key):
+        # Counters are stored as plain Redis integers, not pickles
+        raw = self._client.get(key)
+        return int(raw) if raw is not None else 0
+
+    def clear(self, prefix=''):
+        keys = list(self._client.scan_iter(match=f"{prefix}*"))
+        if keys:
+            self._client.delete(*keys)
+
+
+_backends = {}
+
+
+def get_backend(name, url=None):
+    """Return the process-wide backend for a configured name ('local', 'redis' or 'none')"""
+    if name in (None, '', 'none'):
+        return None
+    if name not in _backends:
+        if name == 'local':
+            _backends[name] = LocalBackend()
+        elif name == 'redis':
+            _backends[name] = RedisBackend(url)
+        else:
+            raise ValueError(f"Unknown cache backend: {name}")
+    return _backends[name]
+
+
+class LRUCache:
+    """Per-process LRU cache with a TTL, optionally backed by a shared backend.
+
+    Lookups try the local tier first, then the shared backend. Cached values
+    are shared between callers and must be treated as read-only. With max_bytes
+    the local tier is also bounded by the total of sizeof(value) over its entries.
+    """
+
+    def __init__(self, name, max_entries=1024, ttl=60, backend=None, max_bytes=None, sizeof=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = backend
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _shared_key(self, key):
+        return f"{self.name}:{key}"
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at, size = entry
+                if expires_at >= now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._pop(key)
+
+        if self.backend is not None:
+            value = self.backend.get(self._shared_key(key))
+            if value is not None:
+                self._store(key, value)
+                with self._lock:
+                    self.hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def _over_limits(self):
+        return len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self._bytes > self.max_bytes
+        )
+
+    def _store(self, key, value):
+        size = self.sizeof(value) if self.sizeof else 0
+        with self._lock:
+            self._pop(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._entries[key] = (value, time.monotonic() + self.ttl, size)
+            self._bytes += size
+            while self._over_limits():
+                self._pop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def set(self, key, value):
+        self._store(key, value)
+        if self.backend is not None:
+            self.backend.set(self._shared_key(key), value, self.ttl)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._pop(key)
+        if self.backend is not None:
+            self.backend.delete(*(self._shared_key(key) for key in keys))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.backend is not None:
+            self.backend.clear(f"{self.name}:")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "pid": os.getpid(),
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
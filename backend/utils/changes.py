@@ -0,0 +1,146 @@
+"""Sync tokens and Server-Sent Events for the bill change feed.
+
+A token marks a position in (updated_at, _id) order. Changes are read from a
+few seconds behind the newest write (CHANGES_LAG_SECONDS), so a write whose
+updated_at was taken before a concurrent one but committed after it is
+delivered again on the next sync instead of being skipped. Deltas are
+idempotent, so clients simply apply the same bill twice.
+"""
+import asyncio
+import base64
+import json
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from config import Config
+from utils.generations import generations
+from utils.serialization import to_json
+
+
+class InvalidTokenError(ValueError):
+    pass
+
+
+class ExpiredTokenError(Exception):
+    """The token is older than the tombstones kept, so deletions may be missing"""
+
+    def __init__(self):
+        super().__init__("Sync token expired, reload the list")
+
+
+def encode_token(since, last_id=None):
+    payload = {"t": since.isoformat(), "id": str(last_id) if last_id else None}
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_token(token):
+    """(since, last_id) of a sync token; last_id is set while paging through a backlog"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        last_id = ObjectId(payload["id"]) if payload["id"] else None
+        return datetime.fromisoformat(payload["t"]), last_id
+    except Exception:
+        raise InvalidTokenError("Invalid sync token")
+
+
+def horizon(now):
+    """Newest position a sync can advance to"""
+    return now - timedelta(seconds=Config.CHANGES_LAG_SECONDS)
+
+
+def check_expiry(since, now):
+    if since < now - timedelta(days=Config.CHANGES_RETENTION_DAYS):
+        raise ExpiredTokenError()
+
+
+def validate_token(token):
+    """Raise unless a token can be synced from; streams check this before they start"""
+    if not token:
+        raise InvalidTokenError("since is required")
+    check_expiry(decode_token(token)[0], datetime.utcnow())
+
+
+def changed_query(since, last_id=None):
+    """Bills written at or after a token position, in (updated_at, _id) order"""
+    if last_id is None:
+        return {"updated_at": {"$gte": since}}
+    return {"$or": [
+        {"updated_at": {"$gt": since}},
+        {"updated_at": since, "_id": {"$gt": last_id}},
+    ]}
+
+
+def next_token(since, changed, has_more, now):
+    """Token for the next sync after reading the changed page"""
+    limit = horizon(now)
+    if has_more and changed[-1]["updated_at"] < limit:
+        return encode_token(changed[-1]["updated_at"], changed[-1]["_id"])
+    return encode_token(max(since, limit))
+
+
+def _has_changes(changes):
+    return bool(changes["upserts"] or changes["removed"] or changes["deleted"])
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(changes):
+    return f"id: {changes['token']}\nevent: changes\ndata: {to_json(changes)}\n\n"
+
+
+def _stream_start():
+    # EventSource reconnects after `retry` ms and resends the last id it saw
+    return f"retry: {Config.CHANGES_POLL_SECONDS * 1000}\n\n"
+
+
+def _generation_unchanged(seen):
+    # Only trusted when generations are shared between workers (see CONDITIONAL_GET)
+    return Config.CONDITIONAL_GET and generations.current("bills") == seen
+
+
+def change_events(get_changes, token, filter_data=None):
+    """SSE stream of change deltas, polled every CHANGES_POLL_SECONDS.
+
+    The stream ends after CHANGES_STREAM_SECONDS so a sync worker is not held
+    forever; the browser reconnects from the last event id.
+    """
+    yield _stream_start()
+    deadline = time.monotonic() + Config.CHANGES_STREAM_SECONDS
+    seen = None
+    while time.monotonic() < deadline:
+        if not _generation_unchanged(seen):
+            seen = generations.current("bills")
+            changes = get_changes(token, filter_data)
+            advanced, token = changes["token"] != token, changes["token"]
+            if _has_changes(changes):
+                yield sse_event(changes)
+                # A backlog is sent without waiting, unless it sits inside the lag window
+                if changes["has_more"] and advanced:
+                    seen = None
+                    continue
+        yield ": ping\n\n"
+        time.sleep(Config.CHANGES_POLL_SECONDS)
+
+
+async def change_events_async(get_changes, token, filter_data=None):
+    """change_events for an async service"""
+    yield _stream_start()
+    deadline = time.monotonic() + Config.CHANGES_STREAM_SECONDS
+    seen = None
+    while time.monotonic() < deadline:
+        if not _generation_unchanged(seen):
+            seen = generations.current("bills")
+            changes = await get_changes(token, filter_data)
+            advanced, token = changes["token"] != token, changes["token"]
+            if _has_changes(changes):
+                yield sse_event(changes)
+                # A backlog is sent without waiting, unless it sits inside the lag window
+                if changes["has_more"] and advanced:
+                    seen = None
+                    continue
+        yield ": ping\n\n"
+        await asyncio.sleep(Config.CHANGES_POLL_SECONDS)
@@ -0,0 +1,113 @@
+"""gzip/brotli compression of large JSON, NDJSON and CSV responses.
+
+Responses smaller than COMPRESSION_MIN_BYTES go out as they are. Streamed
+responses are compressed chunk by chunk, each chunk flushed, so pages and
+exports still reach the client while they are being produced. Brotli is
+offered when the brotli package is installed, gzip always.
+"""
+import zlib
+
+from flask import request
+from config import Config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/plain'}
+
+
+def negotiate(accept_encodings):
+    """'br', 'gzip' or None, whichever the client prefers among those available"""
+    if not Config.COMPRESSION_ENABLED:
+        return None
+    return accept_encodings.best_match(('br', 'gzip') if brotli is not None else ('gzip',))
+
+
+def compressible(response):
+    # Server-sent events are left alone, buffering would hold events back
+    return (
+        response.status_code == 200 and 'Content-Encoding' not in response.headers
+        and response.mimetype in COMPRESSIBLE_MIMETYPES
+    )
+
+
+class Compressor:
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=Config.BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(Config.GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        """Compressed data, flushed so the client can decode it right away"""
+        if self.encoding == 'br':
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def compress(encoding, data):
+    compressor = Compressor(encoding)
+    return compressor.compress(data) + compressor.finish()
+
+
+def mark_compressed(response, encoding):
+    response.headers['Content-Encoding'] = encoding
+    response.headers.pop('Content-Length', None)
+
+
+def _compressed_chunks(encoding, head, chunks, source):
+    compressor = Compressor(encoding)
+    try:
+        yield compressor.compress(head)
+        for chunk in chunks:
+            if chunk:
+                yield compressor.compress(chunk)
+        yield compressor.finish()
+    finally:
+        # The replaced body would otherwise never be closed
+        if hasattr(source, 'close'):
+            source.close()
+
+
+def compress_response(response):
+    """Compress a Flask response for the current request when it is worth it"""
+    if not compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    if not response.is_streamed:
+        data = response.get_data()
+        if len(data) >= Config.COMPRESSION_MIN_BYTES:
+            response.set_data(compress(encoding, data))
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+    # A streamed body is only compressed once it turns out to be large enough
+    source = response.response
+    chunks = response.iter_encoded()
+    head = b''
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= Config.COMPRESSION_MIN_BYTES:
+            break
+    else:
+        response.set_data(head)
+        return response
+    response.response = _compressed_chunks(encoding, head, chunks, source)
+    mark_compressed(response, encoding)
+    return response
+
+
+def init_app(app):
+    app.after_request(compress_response)
@@ -0,0 +1,44 @@
+import hashlib
+from functools import wraps
+
+from flask import Response, make_response, request
+from config import Config
+from utils.compression import negotiate
+from utils.generations import generations
+
+
+def etag_for(request, collections):
+    """Strong ETag over the request and the write generations it depends on"""
+    state = "|".join(
+        # The encoding is part of the representation, so gzip and identity bodies differ
+        [request.full_path, request.headers.get('Accept', ''), negotiate(request.accept_encodings) or '']
+        + [f"{collection}:{generation}" for collection, generation in zip(collections, generations.current(*collections))]
+    )
+    return hashlib.sha1(state.encode()).hexdigest()
+
+
+def conditional(*collections):
+    """Serve 304 Not Modified for a matching If-None-Match without running the view.
+
+    The generations are read before the view runs, so a write that lands while
+    the response is being built only makes the next revalidation miss.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not Config.CONDITIONAL_GET:
+                return view(*args, **kwargs)
+
+            etag = etag_for(request, collections)
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                response.vary.add('Accept')
+            return response
+        return wrapper
+    return decorator
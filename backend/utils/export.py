@@ -0,0 +1,292 @@
+"""Flat CSV and XLSX exports of bills, produced row by row.
+
+Both writers turn one bill at a time into output that can be sent right
+away, so an export holds only the current cursor batch in memory whatever
+its size. The XLSX writer streams the zip container itself, no workbook is
+built in memory and no extra package is needed.
+"""
+import csv
+import io
+import json
+import re
+import zipfile
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from utils.serialization import CHUNK_SIZE
+
+# (header, bill field); status_date comes from the last history entry
+EXPORT_COLUMNS = [
+    ("Bill Number", "bill_number"),
+    ("Receipt Date", "receipt_date"),
+    ("Employee ID", "employee_id"),
+    ("Employee Name", "employee_name"),
+    ("Dependent Name", "dependent_name"),
+    ("Relationship", "relationship"),
+    ("Sub Division", "sub_division"),
+    ("Hospital", "hospital"),
+    ("Treatment From", "treatment_period_from"),
+    ("Treatment To", "treatment_period_to"),
+    ("Amount Claimed", "amount_claimed"),
+    ("Current Status", "current_status"),
+    ("Status Date", "status_date"),
+    ("Latest Reference Number", "latest_reference_number"),
+    ("Latest Approved Amount", "latest_approved_amount"),
+    ("Updated At", "updated_at"),
+]
+EXPORT_PROJECTION = {
+    "_id": 0, **{field: 1 for _, field in EXPORT_COLUMNS if field != "status_date"},
+    "status_history": {"$slice": -1},
+}
+CSV_MIMETYPE = 'text/csv; charset=utf-8'
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+# One header row plus data rows per worksheet; Excel stops at 1,048,576
+XLSX_SHEET_ROWS = 1_048_575
+
+# Spreadsheet programs run CSV cells starting with these as formulas
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+# Control characters XML 1.0 cannot carry
+_XML_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class ExportFormatError(ValueError):
+    pass
+
+
+def parse_filter(raw):
+    """The filter_bills payload of an export GET, sent as ?filter=<json>"""
+    if not raw:
+        return {}
+    try:
+        filter_data = json.loads(raw)
+    except ValueError:
+        raise ExportFormatError("filter must be a JSON object")
+    if not isinstance(filter_data, dict):
+        raise ExportFormatError("filter must be a JSON object")
+    return filter_data
+
+
+def export_row(bill):
+    history = bill.get("status_history") or [{}]
+    values = []
+    for _, field in EXPORT_COLUMNS:
+        value = history[-1].get("date") if field == "status_date" else bill.get(field)
+        values.append(value.isoformat() if isinstance(value, datetime) else value)
+    return values
+
+
+def _csv_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class CsvWriter:
+    """CSV text for one row at a time"""
+
+    empty = ''
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def row(self, values):
+        self._writer.writerow([_csv_cell(value) for value in values])
+        text = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return text
+
+    def header(self):
+        # The BOM makes Excel read the file as UTF-8
+        return '\ufeff' + self.row([header for header, _ in EXPORT_COLUMNS])
+
+    def close(self):
+        return ''
+
+
+class _Drain:
+    """Unseekable file that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _column_name(index):
+    name = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(65 + remainder) + name
+    return name
+
+
+_COLUMN_NAMES = [_column_name(i) for i in range(len(EXPORT_COLUMNS))]
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+).encode()
+_SHEET_END = b'</sheetData></worksheet>'
+
+
+class XlsxWriter:
+    """Minimal XLSX (inline strings, no styles) written as a streamed zip.
+
+    Worksheets are compressed as rows arrive; the workbook parts that list
+    them are written last, which spreadsheet programs accept since zip
+    entries are found through the central directory.
+    """
+
+    empty = b''
+
+    def __init__(self):
+        self._out = _Drain()
+        self._zip = zipfile.ZipFile(self._out, 'w', compression=zipfile.ZIP_DEFLATED)
+        self._sheet = None
+        self._sheets = 0
+        self._rows = 0
+
+    def _start_sheet(self):
+        if self._sheet is not None:
+            self._sheet.write(_SHEET_END)
+            self._sheet.close()
+        self._sheets += 1
+        self._rows = 0
+        self._sheet = self._zip.open(f'xl/worksheets/sheet{self._sheets}.xml', 'w', force_zip64=True)
+        self._sheet.write(_SHEET_START)
+        self._write_row([header for header, _ in EXPORT_COLUMNS])
+
+    def _write_row(self, values):
+        self._rows += 1
+        cells = []
+        for column, value in zip(_COLUMN_NAMES, values):
+            if value is None or value == '':
+                continue
+            ref = f'{column}{self._rows}'
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                cells.append(f'<c r="{ref}"><v>{value!r}</v></c>')
+            else:
+                text = escape(_XML_ILLEGAL.sub('', str(value)))
+                cells.append(f'<c r="{ref}" t="inlineStr"><is><t>{text}</t></is></c>')
+        self._sheet.write(f'<row r="{self._rows}">{"".join(cells)}</row>'.encode())
+
+    def header(self):
+        self._start_sheet()
+        return self._out.drain()
+
+    def row(self, values):
+        if self._rows > XLSX_SHEET_ROWS:
+            self._start_sheet()
+        self._write_row(values)
+        return self._out.drain()
+
+    def close(self):
+        if self._sheet is None:
+            self._start_sheet()
+        self._sheet.write(_SHEET_END)
+        self._sheet.close()
+        sheets = range(1, self._sheets + 1)
+        self._zip.writestr('[Content_Types].xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            + ''.join(
+                f'<Override PartName="/xl/worksheets/sheet{n}.xml" '
+                'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                for n in sheets
+            )
+            + '</Types>'
+        ))
+        self._zip.writestr('_rels/.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="xl/workbook.xml" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+            '</Relationships>'
+        ))
+        self._zip.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+            + ''.join(f'<sheet name="Bills {n}" sheetId="{n}" r:id="rId{n}"/>' for n in sheets)
+            + '</sheets></workbook>'
+        ))
+        self._zip.writestr('xl/_rels/workbook.xml.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + ''.join(
+                f'<Relationship Id="rId{n}" Target="worksheets/sheet{n}.xml" '
+                'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+                for n in sheets
+            )
+            + '</Relationships>'
+        ))
+        self._zip.close()
+        return self._out.drain()
+
+
+# format -> (writer class, mimetype)
+EXPORT_FORMATS = {
+    "csv": (CsvWriter, CSV_MIMETYPE),
+    "xlsx": (XlsxWriter, XLSX_MIMETYPE),
+}
+
+
+def export_writer(fmt):
+    """(writer, mimetype, filename) for an export format"""
+    if fmt not in EXPORT_FORMATS:
+        raise ExportFormatError(f"Unsupported export format: {fmt}")
+    writer_class, mimetype = EXPORT_FORMATS[fmt]
+    filename = f"bills-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    return writer_class(), mimetype, filename
+
+
+def export_chunks(writer, bills):
+    """Yield the export of an iterable of bills in CHUNK_SIZE pieces.
+
+    The header goes out on its own so the download starts before the first
+    cursor batch arrives.
+    """
+    yield writer.header()
+    parts, size = [], 0
+    for bill in bills:
+        part = writer.row(export_row(bill))
+        parts.append(part)
+        size += len(part)
+        if size >= CHUNK_SIZE:
+            yield writer.empty.join(parts)
+            parts, size = [], 0
+    parts.append(writer.close())
+    yield writer.empty.join(parts)
+
+
+async def export_chunks_async(writer, bills):
+    """export_chunks for an async cursor"""
+    yield writer.header()
+    parts, size = [], 0
+    async for bill in bills:
+        part = writer.row(export_row(bill))
+        parts.append(part)
+        size += len(part)
+        if size >= CHUNK_SIZE:
+            yield writer.empty.join(parts)
+            parts, size = [], 0
+    parts.append(writer.close())
+    yield writer.empty.join(parts)
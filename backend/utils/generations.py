@@ -0,0 +1,28 @@
+from config import Config
+from utils.cache import LocalBackend, get_backend
+
+
+class GenerationStore:
+    """Per-collection write generation counters.
+
+    Every write path bumps the generation of the collection it touches, so
+    readers can tell whether anything changed without querying Mongo. With more
+    than one worker the counters must live in a shared backend.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or LocalBackend()
+
+    @staticmethod
+    def _key(collection):
+        return f"generation:{collection}"
+
+    def current(self, *collections):
+        return tuple(self.backend.get_int(self._key(collection)) for collection in collections)
+
+    def bump(self, *collections):
+        for collection in collections:
+            self.backend.incr(self._key(collection))
+
+
+generations = GenerationStore(get_backend(Config.CACHE_BACKEND, Config.CACHE_URL))
@@ -0,0 +1,118 @@
+"""Idempotency-Key support for create endpoints.
+
+A client sends the same Idempotency-Key header when it retries a request.
+The first request claims the key in the idempotency_keys collection and
+stores its response there; a retry gets that response replayed, marked with
+Idempotent-Replayed: true, instead of running the view again. Keys expire
+IDEMPOTENCY_KEY_TTL_HOURS after their first use through a TTL index.
+"""
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+
+from bson import Binary
+from flask import Response, current_app, jsonify, make_response, request
+from pymongo.errors import DuplicateKeyError
+from config import Config
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyError(Exception):
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+def fingerprint(method, path, body):
+    """Hash of a request, so a key reused for a different request is refused"""
+    return hashlib.sha256(b"\n".join([method.encode(), path.encode(), body])).hexdigest()
+
+
+def validate_key(key):
+    if len(key) > MAX_KEY_LENGTH:
+        raise IdempotencyError(f"{HEADER} must be at most {MAX_KEY_LENGTH} characters", 400)
+    return key
+
+
+def claim_record(key, request_hash, now):
+    return {"_id": key, "fingerprint": request_hash, "created_at": now, "locked_at": now}
+
+
+def takeover_query(key, request_hash, now):
+    """A key whose request died before storing a response; its lock is taken over once stale"""
+    stale = now - timedelta(seconds=Config.IDEMPOTENCY_LOCK_SECONDS)
+    return {"_id": key, "fingerprint": request_hash, "response": {"$exists": False}, "locked_at": {"$lt": stale}}
+
+
+def stored_response(record, request_hash):
+    """The response to replay for a key already claimed"""
+    if record["fingerprint"] != request_hash:
+        raise IdempotencyError(f"{HEADER} was already used for a different request", 422)
+    if "response" not in record:
+        raise IdempotencyError(f"A request with this {HEADER} is still in progress", 409)
+    return record["response"]
+
+
+def response_record(status, body, content_type):
+    return {"status": status, "body": Binary(body), "content_type": content_type}
+
+
+def keeps_response(status):
+    # Server errors are not stored, so a retry runs the view again
+    return status < 500
+
+
+def _claim(collection, key, request_hash):
+    """None once this request owns the key, otherwise the record to answer from"""
+    now = datetime.utcnow()
+    try:
+        collection.insert_one(claim_record(key, request_hash, now))
+        return None
+    except DuplicateKeyError:
+        pass
+    if collection.find_one_and_update(takeover_query(key, request_hash, now), {"$set": {"locked_at": now}}):
+        return None
+    record = collection.find_one({"_id": key})
+    # Expired between the two reads
+    return record if record is not None else _claim(collection, key, request_hash)
+
+
+def _replay(stored):
+    response = Response(bytes(stored["body"]), status=stored["status"], content_type=stored["content_type"])
+    response.headers[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(view):
+    """Replay the stored response of a request retried with the same Idempotency-Key"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        collection = current_app.db.idempotency_keys
+        try:
+            validate_key(key)
+            request_hash = fingerprint(request.method, request.path, request.get_data())
+            record = _claim(collection, key, request_hash)
+            if record is not None:
+                return _replay(stored_response(record, request_hash))
+        except IdempotencyError as e:
+            return jsonify({"error": str(e)}), e.status
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            collection.delete_one({"_id": key})
+            raise
+        if keeps_response(response.status_code):
+            collection.update_one({"_id": key}, {"$set": {
+                "response": response_record(response.status_code, response.get_data(), response.content_type)
+            }})
+        else:
+            collection.delete_one({"_id": key})
+        return response
+    return wrapper
@@ -0,0 +1,135 @@
+import csv
+import json
+
+from pymongo.errors import BulkWriteError
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+
+
+class IngestError(ValueError):
+    pass
+
+
+def detect_format(content_type=None, filename=None, explicit=None):
+    """Pick CSV or NDJSON from an explicit format, the filename or the content type"""
+    if explicit:
+        if explicit not in (CSV, NDJSON):
+            raise IngestError(f"Unsupported format: {explicit}")
+        return explicit
+    if filename:
+        lowered = filename.lower()
+        if lowered.endswith('.csv'):
+            return CSV
+        if lowered.endswith(('.ndjson', '.jsonl')):
+            return NDJSON
+    if content_type:
+        if 'csv' in content_type:
+            return CSV
+        if 'ndjson' in content_type or 'jsonlines' in content_type:
+            return NDJSON
+    raise IngestError("Could not determine upload format, use CSV or NDJSON")
+
+
+def iter_rows(stream, fmt):
+    """Yield (row_number, row) pairs from a binary stream without reading it whole.
+
+    Rows that cannot be parsed are yielded as (row_number, IngestError) so the
+    caller can report them next to validation failures. A CSV upload that
+    cannot be read past some point (invalid UTF-8, a field over the size
+    limit) ends with one such error, since quoted fields can span lines; the
+    rows before it are still imported.
+    """
+    row_number = 0
+    try:
+        for row_number, row in (_csv_rows(stream) if fmt == CSV else _ndjson_rows(stream)):
+            yield row_number, row
+    except (UnicodeDecodeError, csv.Error) as e:
+        yield row_number + 1, IngestError(f"Could not read the rest of the upload: {e}")
+
+
+def _decoded_lines(stream):
+    # Decoded line by line, so rows before an invalid byte sequence still get through
+    for line_number, line in enumerate(stream, start=1):
+        yield line.decode('utf-8-sig' if line_number == 1 else 'utf-8')
+
+
+def _csv_rows(stream):
+    for row_number, row in enumerate(csv.DictReader(_decoded_lines(stream)), start=1):
+        # Empty cells mean "not provided"
+        yield row_number, {k.strip(): v.strip() for k, v in row.items() if k and v not in (None, '')}
+
+
+def _ndjson_rows(stream):
+    # Invalid UTF-8 only costs its own line
+    for row_number, line in enumerate(stream, start=1):
+        try:
+            line = line.decode('utf-8-sig' if row_number == 1 else 'utf-8')
+        except UnicodeDecodeError as e:
+            yield row_number, IngestError(f"Invalid UTF-8: {e}")
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield row_number, IngestError(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(row, dict):
+            yield row_number, IngestError("Each line must be a JSON object")
+            continue
+        yield row_number, row
+
+
+def missing_fields(row, required):
+    """Required fields a row leaves out; null and empty values count as missing, as empty CSV cells do"""
+    return [field for field in required if row.get(field) in (None, '')]
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def insert_unordered(collection, documents):
+    """insert_many that keeps going past failures.
+
+    Returns the number inserted and (index, write_error) pairs, where index
+    refers to the position in documents.
+    """
+    if not documents:
+        return 0, []
+    try:
+        result = collection.insert_many(documents, ordered=False)
+        return len(result.inserted_ids), []
+    except BulkWriteError as e:
+        details = e.details
+        return details['nInserted'], [(error['index'], error) for error in details['writeErrors']]
+
+
+def rows_from_request(request):
+    """Stream rows from a multipart 'file' upload or from the raw request body"""
+    upload = request.files.get('file')
+    if upload is not None:
+        fmt = detect_format(upload.mimetype, upload.filename, request.args.get('format'))
+        return iter_rows(upload.stream, fmt)
+    fmt = detect_format(request.mimetype, None, request.args.get('format'))
+    return iter_rows(request.stream, fmt)
+
+
+async def insert_unordered_async(collection, documents):
+    """insert_unordered() for an async (motor) collection"""
+    if not documents:
+        return 0, []
+    try:
+        result = await collection.insert_many(documents, ordered=False)
+        return len(result.inserted_ids), []
+    except BulkWriteError as e:
+        details = e.details
+        return details['nInserted'], [(error['index'], error) for error in details['writeErrors']]
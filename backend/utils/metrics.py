@@ -0,0 +1,382 @@
+import bisect
+import logging
+import os
+import pickle
+import queue
+import threading
+import time
+import uuid
+from collections import defaultdict
+from glob import glob
+
+from flask import Response, g, request
+from pymongo import monitoring
+from config import Config
+
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Finds tagged with this comment are candidates for the slow query log,
+# untagged when the log is switched off (SLOW_QUERY_MS=0)
+SLOW_QUERY_COMMENT = 'filter_bills' if Config.METRICS_ENABLED and Config.SLOW_QUERY_MS > 0 else None
+
+# Seconds; tuned for web requests and single Mongo round trips
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names"""
+
+    type = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] += amount
+
+    def state(self):
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(states):
+        values = defaultdict(int)
+        for state in states:
+            for labels, value in state.items():
+                values[labels] += value
+        return values
+
+    def samples(self, state):
+        for labels, value in sorted(state.items()):
+            yield self.name, _labels(self.label_names, labels), value
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed set of label names"""
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def state(self):
+        with self._lock:
+            return {labels: list(values) for labels, values in self._series.items()}
+
+    @staticmethod
+    def merge(states):
+        series = {}
+        for state in states:
+            for labels, values in state.items():
+                if labels in series:
+                    series[labels] = [total + value for total, value in zip(series[labels], values)]
+                else:
+                    series[labels] = list(values)
+        return series
+
+    def samples(self, state):
+        for labels, values in sorted(state.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values):
+                cumulative += count
+                yield (f"{self.name}_bucket",
+                       _labels(self.label_names, labels, [("le", _number(bound))]), cumulative)
+            yield f"{self.name}_sum", _labels(self.label_names, labels), values[-1]
+            yield f"{self.name}_count", _labels(self.label_names, labels), cumulative
+
+
+class Registry:
+    """Metrics of this process, or of every worker when given a directory.
+
+    With a directory each worker writes its values there after its requests,
+    at most once per interval, and /metrics sums the files of all workers,
+    whichever worker answers the scrape. Files of exited workers are kept so
+    counters do not go back; the directory is emptied when the server starts.
+    """
+
+    def __init__(self, directory=None, interval=1.0):
+        self._metrics = []
+        self.directory = directory
+        self.interval = interval
+        self._path = None
+        self._pid = None
+        self._dumped_at = float('-inf')
+        self._dump_lock = threading.Lock()
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def _file(self):
+        # Workers are forked after import, and a pid can come back after a restart
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._path = os.path.join(self.directory, f"metrics_{self._pid}_{uuid.uuid4().hex[:8]}.pickle")
+        return self._path
+
+    def dump(self, force=False):
+        """Write this worker's values for the scrapes other workers answer"""
+        if not self.directory:
+            return
+        with self._dump_lock:
+            now = time.monotonic()
+            if not force and now - self._dumped_at < self.interval:
+                return
+            self._dumped_at = now
+            path = self._file()
+            state = {metric.name: metric.state() for metric in self._metrics}
+            with open(f"{path}.tmp", 'wb') as file:
+                pickle.dump(state, file)
+            os.replace(f"{path}.tmp", path)
+
+    def _states(self):
+        """{metric name: [state per process]}"""
+        if not self.directory:
+            return {metric.name: [metric.state()] for metric in self._metrics}
+        self.dump(force=True)
+        states = defaultdict(list)
+        for path in glob(os.path.join(self.directory, 'metrics_*.pickle')):
+            try:
+                with open(path, 'rb') as file:
+                    for name, state in pickle.load(file).items():
+                        states[name].append(state)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                logger.warning("Could not read metrics file %s", path)
+        return states
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        states = self._states()
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples(metric.merge(states.get(metric.name, []))):
+                lines.append(f"{name}{labels} {_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry(Config.PROMETHEUS_MULTIPROC_DIR or None)
+http_latency = registry.register(Histogram(
+    'http_request_duration_seconds', 'Request latency by route.', ('route', 'method', 'status')
+))
+mongo_latency = registry.register(Histogram(
+    'mongo_command_duration_seconds', 'Mongo command latency by collection and command.',
+    ('collection', 'command')
+))
+mongo_documents = registry.register(Counter(
+    'mongo_documents_returned_total', 'Documents returned by Mongo reads.', ('collection', 'command')
+))
+mongo_failures = registry.register(Counter(
+    'mongo_command_failures_total', 'Failed Mongo commands.', ('collection', 'command')
+))
+
+
+def _returned_documents(command_name, reply):
+    cursor = reply.get('cursor')
+    if cursor is not None:
+        return len(cursor.get('firstBatch', cursor.get('nextBatch', ())))
+    if command_name == 'findAndModify':
+        return 1 if reply.get('value') is not None else 0
+    return 0
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """pymongo listener recording per-collection, per-command latency.
+
+    Commands carrying the slow query comment are also handed to the slow
+    query log when they exceed its threshold.
+    """
+
+    def __init__(self, slow_queries=None):
+        self.slow_queries = slow_queries
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        name = event.command_name
+        collection = event.command.get('collection') if name == 'getMore' else event.command.get(name)
+        if not isinstance(collection, str):
+            return
+        command = event.command if name == 'find' else None
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (collection, event.database_name, command)
+
+    def _finish(self, event):
+        with self._lock:
+            return self._pending.pop((event.connection_id, event.request_id), None)
+
+    def succeeded(self, event):
+        pending = self._finish(event)
+        if pending is None:
+            return
+        collection, database, command = pending
+        seconds = event.duration_micros / 1e6
+        mongo_latency.observe(seconds, collection, event.command_name)
+        returned = _returned_documents(event.command_name, event.reply)
+        if returned:
+            mongo_documents.inc(collection, event.command_name, amount=returned)
+        if command is not None and self.slow_queries is not None:
+            self.slow_queries.observe(database, command, seconds)
+
+    def failed(self, event):
+        pending = self._finish(event)
+        if pending is not None:
+            mongo_failures.inc(pending[0], event.command_name)
+
+
+def query_shape(value):
+    """A filter with its values replaced by their type names, operators kept"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [query_shape(item) for item in value]
+    return type(value).__name__
+
+
+def explain_summary(explain):
+    stats = explain.get('executionStats', {})
+    stages = []
+    plan = explain.get('queryPlanner', {}).get('winningPlan', {})
+    while isinstance(plan, dict) and plan:
+        if 'stage' in plan:
+            stages.append(plan['stage'] + (f"({plan['indexName']})" if 'indexName' in plan else ''))
+        plan = plan.get('inputStage') or plan.get('queryPlan')
+    return {
+        "plan": ' <- '.join(stages),
+        "keys_examined": stats.get('totalKeysExamined'),
+        "docs_examined": stats.get('totalDocsExamined'),
+        "returned": stats.get('nReturned'),
+        "execution_ms": stats.get('executionTimeMillis'),
+    }
+
+
+class SlowQueryLog:
+    """Logs the filter shape and explain() summary of slow tagged finds.
+
+    Listeners must not block the driver, so slow commands are queued and
+    explained on a background thread, at most once per shape per interval.
+    """
+
+    def __init__(self, comment, threshold_ms, interval=300, max_queue=100):
+        self.comment = comment
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self.client = None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._explained = {}
+        self._thread = None
+
+    def bind(self, client):
+        """Use this (sync) client to run explain()"""
+        self.client = client
+
+    def observe(self, database, command, seconds):
+        if self.comment is None or self.client is None:
+            return
+        if seconds < self.threshold or command.get('comment') != self.comment:
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='slow-query-log', daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait((database, command, seconds))
+        except queue.Full:
+            pass
+
+    def _run(self):
+        while True:
+            database, command, seconds = self._queue.get()
+            try:
+                self._explain(database, command, seconds)
+            except Exception:
+                logger.exception("Could not explain slow query")
+
+    def _explain(self, database, command, seconds):
+        shape = query_shape(command.get('filter', {}))
+        key = (command['find'], repr(shape), repr(command.get('sort')))
+        now = time.monotonic()
+        summary = None
+        if now - self._explained.get(key, float('-inf')) >= self.interval:
+            self._explained[key] = now
+            find = {name: command[name] for name in ('find', 'filter', 'sort', 'projection', 'limit') if name in command}
+            summary = explain_summary(
+                self.client[database].command('explain', find, verbosity='executionStats')
+            )
+        logger.warning(
+            "Slow %s query on %s took %.0f ms, shape=%s sort=%s explain=%s",
+            self.comment, command['find'], seconds * 1000, shape, command.get('sort'),
+            summary if summary is not None else "(already explained recently)"
+        )
+
+
+slow_queries = SlowQueryLog(SLOW_QUERY_COMMENT, Config.SLOW_QUERY_MS)
+command_metrics = CommandMetrics(slow_queries)
+
+
+def record_request(seconds, labels):
+    http_latency.observe(seconds, *labels)
+    registry.dump()
+
+
+def route_label(endpoint):
+    # Unmatched URLs share one label so scanners cannot blow up the series count
+    return endpoint or 'unmatched'
+
+
+def init_app(app):
+    """Record per-route latency and serve /metrics on a Flask app"""
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_latency(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            labels = (route_label(request.endpoint), request.method, str(response.status_code))
+            # Streamed bodies are still being produced here, so observe on close
+            response.call_on_close(lambda: record_request(time.perf_counter() - started, labels))
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(registry.render(), content_type=PROMETHEUS_MIMETYPE)
@@ -0,0 +1,94 @@
+"""Mongo clients that are created on first use, once per process.
+
+Under gunicorn --preload the app factory runs in the master, which then forks
+the workers. A client created there would hand its sockets and monitor
+threads to every worker, which pymongo does not support, so the factory only
+wraps a client factory: each worker builds its own client the first time a
+request touches the database, and a forked child drops any client it
+inherited.
+"""
+import os
+import threading
+import weakref
+
+from config import Config
+from utils import metrics
+
+DATABASE = 'bills_management'
+
+_clients = weakref.WeakSet()
+
+
+def client_options(listeners=True):
+    """Pool sizes and timeouts from Config, for MongoClient and AsyncIOMotorClient"""
+    options = {
+        "maxPoolSize": Config.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": Config.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": Config.MONGO_MAX_IDLE_TIME_MS or None,
+        "connectTimeoutMS": Config.MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": Config.MONGO_SOCKET_TIMEOUT_MS or None,
+    }
+    if listeners and Config.METRICS_ENABLED:
+        options["event_listeners"] = [metrics.command_metrics]
+    return options
+
+
+class LazyClient:
+    """Builds its client with factory on first use; on_connect(client) runs once per client"""
+
+    def __init__(self, factory, on_connect=None):
+        self._factory = factory
+        self._on_connect = on_connect
+        self._reset()
+        _clients.add(self)
+
+    def _reset(self):
+        # The inherited client belongs to the parent; it is dropped, not closed
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        client = self._client
+        if client is None:
+            with self._lock:
+                client = self._client
+                if client is None:
+                    client = self._factory()
+                    if self._on_connect is not None:
+                        try:
+                            self._on_connect(client)
+                        except Exception:
+                            # Retried by the next request
+                            client.close()
+                            raise
+                    self._client = client
+        return client
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+    def __getitem__(self, name):
+        return self.get()[name]
+
+
+class LazyDatabase:
+    """A database of a LazyClient, usable wherever the services expect a Database"""
+
+    def __init__(self, client, name=DATABASE):
+        self._lazy_client = client
+        self._name = name
+
+    def __getattr__(self, name):
+        return getattr(self._lazy_client.get()[self._name], name)
+
+    def __getitem__(self, name):
+        return self._lazy_client.get()[self._name][name]
+
+
+def _after_fork():
+    for client in list(_clients):
+        client._reset()
+
+
+os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,246 @@
+import base64
+import heapq
+import inspect
+import json
+from datetime import datetime
+
+from bson import ObjectId
+from config import Config
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def clamp_page_size(limit):
+    """Bound the requested page size to the configured maximum"""
+    if limit in (None, ''):
+        return Config.DEFAULT_PAGE_SIZE
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise InvalidCursorError("limit must be an integer")
+    return max(1, min(limit, Config.MAX_PAGE_SIZE))
+
+
+def encode_cursor(doc, sort_field):
+    """Build an opaque cursor pointing just after the given document"""
+    value = doc.get(sort_field)
+    payload = {
+        "f": sort_field,
+        "v": value.isoformat() if isinstance(value, datetime) else value,
+        "id": str(doc["_id"])
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort_field):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["f"] != sort_field:
+            raise InvalidCursorError("Cursor does not belong to this listing")
+        value = payload["v"]
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        return value, ObjectId(payload["id"])
+    except InvalidCursorError:
+        raise
+    except Exception:
+        raise InvalidCursorError("Invalid cursor")
+
+
+def keyset_query(query, sort_field, cursor):
+    """Restrict a query to documents after the cursor in (sort_field desc, _id desc) order"""
+    if not cursor:
+        return query
+    value, last_id = decode_cursor(cursor, sort_field)
+    after = {
+        "$or": [
+            {sort_field: {"$lt": value}},
+            {sort_field: value, "_id": {"$lt": last_id}}
+        ]
+    }
+    return {"$and": [query, after]} if query else after
+
+
+class Page:
+    """One page of a keyset-paginated listing.
+
+    Documents are pulled lazily from the Mongo cursor, so a page can be streamed
+    to the client without being materialized. next_cursor is set once iteration
+    has finished; use items to materialize the page instead.
+    """
+
+    def __init__(self, docs, sort_field, limit):
+        self._docs = docs
+        self._items = None
+        self.sort_field = sort_field
+        self.limit = limit
+        self.next_cursor = None
+
+    def __iter__(self):
+        if self._items is not None:
+            yield from self._items
+            return
+        count, last = 0, None
+        for doc in self._docs:
+            # The extra document only tells us that another page exists
+            if count == self.limit:
+                self.next_cursor = encode_cursor(last, self.sort_field)
+                break
+            count += 1
+            last = doc
+            yield doc
+        self._docs.close()
+
+    @classmethod
+    def loaded(cls, items, next_cursor):
+        """A page over documents already read, e.g. from a cache"""
+        page = cls(None, None, len(items))
+        page._items = items
+        page.next_cursor = next_cursor
+        return page
+
+    @property
+    def items(self):
+        if self._items is None:
+            self._items = list(self)
+        return self._items
+
+    def load(self):
+        """Materialize the page, like AsyncPage.load()"""
+        self.items
+        return self
+
+    def to_dict(self):
+        return {"items": self.items, "next_cursor": self.next_cursor}
+
+
+class AsyncPage(Page):
+    """Page over an async (motor) cursor, consumed with async for"""
+
+    async def __aiter__(self):
+        if self._items is not None:
+            for doc in self._items:
+                yield doc
+            return
+        count, last = 0, None
+        async for doc in self._docs:
+            if count == self.limit:
+                self.next_cursor = encode_cursor(last, self.sort_field)
+                break
+            count += 1
+            last = doc
+            yield doc
+        closed = self._docs.close()
+        if inspect.isawaitable(closed):
+            await closed
+
+    async def load(self):
+        """Materialize the page, after which items and to_dict() are available"""
+        if self._items is None:
+            self._items = [doc async for doc in self]
+        return self
+
+
+def _sort_key(sort):
+    """(key, reverse) ordering documents like a Mongo sort whose fields share one direction"""
+    fields = [field for field, _ in sort]
+
+    def key(doc):
+        # Missing values sort first, like null does in Mongo
+        return tuple((doc.get(field) is not None, doc.get(field)) for field in fields)
+    return key, sort[0][1] < 0
+
+
+class MergedCursor:
+    """Several cursors over the same sort, read as one cursor in that order.
+
+    A document found in more than one of them, e.g. a bill caught in both
+    tiers by an interrupted archive run, is yielded once.
+    """
+
+    def __init__(self, cursors, sort):
+        self.cursors = cursors
+        self.key, self.reverse = _sort_key(sort)
+
+    def __iter__(self):
+        last_id = None
+        for doc in heapq.merge(*self.cursors, key=self.key, reverse=self.reverse):
+            if doc["_id"] != last_id:
+                last_id = doc["_id"]
+                yield doc
+
+    def close(self):
+        for cursor in self.cursors:
+            cursor.close()
+
+
+async def _next_or_none(iterator):
+    try:
+        return await iterator.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+class AsyncMergedCursor(MergedCursor):
+    """MergedCursor over async (motor) cursors"""
+
+    async def __aiter__(self):
+        iterators = [cursor.__aiter__() for cursor in self.cursors]
+        heads = [await _next_or_none(iterator) for iterator in iterators]
+        pick = max if self.reverse else min
+        last_id = None
+        while any(doc is not None for doc in heads):
+            index = pick(
+                (index for index, doc in enumerate(heads) if doc is not None), key=lambda index: self.key(heads[index])
+            )
+            doc, heads[index] = heads[index], await _next_or_none(iterators[index])
+            if doc["_id"] != last_id:
+                last_id = doc["_id"]
+                yield doc
+
+    async def close(self):
+        for cursor in self.cursors:
+            closed = cursor.close()
+            if inspect.isawaitable(closed):
+                await closed
+
+
+def page_sort(sort_field):
+    return [(sort_field, -1), ("_id", -1)]
+
+
+def _page_cursor(collection, query, sort_field, cursor, limit, projection, comment):
+    return (
+        collection.find(keyset_query(query, sort_field, cursor), projection, comment=comment)
+        .sort(page_sort(sort_field))
+        .limit(limit + 1)
+    )
+
+
+def paginate(collection, query, sort_field, cursor=None, limit=None, projection=None, comment=None, union=()):
+    """Open one page sorted by (sort_field, _id) descending.
+
+    One extra document is requested to detect whether another page exists,
+    so the cost of a page does not depend on how deep the client has scrolled.
+    Collections in union are searched with the same query and merged in.
+    """
+    limit = clamp_page_size(limit)
+    docs = [
+        _page_cursor(each, query, sort_field, cursor, limit, projection, comment) for each in (collection, *union)
+    ]
+    docs = MergedCursor(docs, page_sort(sort_field)) if union else docs[0]
+    return Page(docs, sort_field, limit)
+
+
+def apaginate(collection, query, sort_field, cursor=None, limit=None, projection=None, comment=None, union=()):
+    """paginate() for an async (motor) collection"""
+    limit = clamp_page_size(limit)
+    docs = [
+        _page_cursor(each, query, sort_field, cursor, limit, projection, comment) for each in (collection, *union)
+    ]
+    docs = AsyncMergedCursor(docs, page_sort(sort_field)) if union else docs[0]
+    return AsyncPage(docs, sort_field, limit)
@@ -0,0 +1,56 @@
+"""fields= projections for list endpoints.
+
+A client asks for a named view (?fields=summary) or a comma separated list of
+fields (?fields=bill_number,current_status). The fields become the find()
+projection, so documents are trimmed by the server before they are sent,
+decoded and serialized.
+"""
+import re
+
+# Top level fields and dotted sub-fields; no operators or positional paths
+FIELD_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z0-9_]+)*$')
+MAX_FIELDS = 50
+
+
+class ProjectionError(ValueError):
+    pass
+
+
+def parse_fields(raw, views):
+    """Sorted field names of a fields= value, None for whole documents.
+
+    raw is a view name, a comma separated string or a list of names.
+    """
+    if raw in (None, '', []):
+        return None
+    if isinstance(raw, str):
+        if raw in views:
+            return views[raw]
+        names = raw.split(',')
+    elif isinstance(raw, (list, tuple)):
+        names = raw
+    else:
+        raise ProjectionError("fields must be a view name or a list of field names")
+    names = {str(name).strip() for name in names} - {''}
+    if len(names) > MAX_FIELDS:
+        raise ProjectionError(f"fields can list at most {MAX_FIELDS} fields")
+    for name in names:
+        if not FIELD_PATTERN.match(name):
+            raise ProjectionError(f"Invalid field name: {name}")
+    return tuple(sorted(_outermost(names))) or None
+
+
+def _outermost(names):
+    # A field also covers its sub-fields; Mongo refuses both in one projection
+    return {name for name in names if not any(name.startswith(other + '.') for other in names)}
+
+
+def projection(fields, hidden, always=()):
+    """find() projection returning fields plus always, or everything except hidden"""
+    if fields is None:
+        return hidden
+    excluded = {name for name, value in hidden.items() if not value}
+    included = {name: 1 for name in _outermost({*fields, *always}) if name.split('.')[0] not in excluded}
+    if '_id' not in included:
+        included['_id'] = 0
+    return included
@@ -0,0 +1,70 @@
+import re
+
+from pymongo import UpdateOne
+
+# Every substring up to this length is stored as a key. Search terms up to this
+# length are looked up directly; longer terms must contain all of their
+# trigrams, and the few candidates that match are then checked for the
+# contiguous substring.
+MAX_KEY_LENGTH = 3
+
+# Derived key fields kept next to the searchable source fields
+BILL_NUMBER_KEYS = "bill_number_keys"
+REFERENCE_KEYS = "reference_keys"
+NAME_KEYS = "name_keys"
+
+_whitespace = re.compile(r'\s+')
+
+
+def normalize(value):
+    return _whitespace.sub(' ', str(value)).strip().lower()
+
+
+def search_keys(*values):
+    """Return the sorted set of search keys for one or more field values"""
+    keys = set()
+    for value in values:
+        if value in (None, ''):
+            continue
+        text = normalize(value)
+        for size in range(1, MAX_KEY_LENGTH + 1):
+            for start in range(len(text) - size + 1):
+                keys.add(text[start:start + size])
+    return sorted(keys)
+
+
+def reference_keys(status_history):
+    return search_keys(*(entry.get('reference_number') for entry in status_history or []))
+
+
+def key_match(keys_field, term):
+    """Condition on a key field that every document containing term satisfies"""
+    text = normalize(term)
+    if len(text) <= MAX_KEY_LENGTH:
+        return {keys_field: text}
+    trigrams = sorted({text[i:i + MAX_KEY_LENGTH] for i in range(len(text) - MAX_KEY_LENGTH + 1)})
+    return {keys_field: {"$all": trigrams}}
+
+
+def substring_regex(term):
+    """Case-insensitive regex that verifies the candidates found through key_match"""
+    return {"$regex": re.escape(normalize(term)).replace(r'\ ', r'\s+'), "$options": "i"}
+
+
+def substring_query(keys_field, field, term):
+    """Index-served substring search on field using its derived key field"""
+    return {"$and": [key_match(keys_field, term), {field: substring_regex(term)}]}
+
+
+def backfill_keys(collection, projection, compute, batch_size):
+    """Recompute derived keys for every document in batches of bulk updates"""
+    updated = 0
+    batch = []
+    for doc in collection.find({}, projection).batch_size(batch_size):
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": compute(doc)}))
+        if len(batch) >= batch_size:
+            updated += collection.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        updated += collection.bulk_write(batch, ordered=False).modified_count
+    return updated
@@ -0,0 +1,146 @@
+import json
+import logging
+from datetime import datetime
+
+from bson import ObjectId
+from flask import Response, request, stream_with_context
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+# Flush the response in chunks of roughly this many bytes
+CHUNK_SIZE = 64 * 1024
+# Ends a streamed body whose cursor or encoder failed after the 200 was sent:
+# the last NDJSON line, the last JSON array item or an "error" page member
+STREAM_ERROR = json.dumps({"error": "Response stream failed"})
+
+logger = logging.getLogger(__name__)
+
+
+class BSONEncoder(json.JSONEncoder):
+    """JSON encoder that converts BSON types inline.
+
+    In extended mode ObjectId and datetime are written the same way as
+    bson.json_util's relaxed mode ({"$oid": ...}, {"$date": ...}), which is what
+    the bill views expect. In plain mode they become bare strings, which is what
+    the employee views expect.
+    """
+
+    def __init__(self, extended=True, **kwargs):
+        kwargs.setdefault('separators', (',', ':'))
+        super().__init__(**kwargs)
+        self.extended = extended
+
+    def default(self, o):
+        if isinstance(o, ObjectId):
+            return {"$oid": str(o)} if self.extended else str(o)
+        if isinstance(o, datetime):
+            if not self.extended:
+                return o.isoformat()
+            millis = o.microsecond // 1000
+            return {"$date": o.strftime('%Y-%m-%dT%H:%M:%S') + (f'.{millis:03d}Z' if millis else 'Z')}
+        return super().default(o)
+
+
+extended_encoder = BSONEncoder(extended=True)
+plain_encoder = BSONEncoder(extended=False)
+
+
+def to_json(doc, extended=True):
+    return (extended_encoder if extended else plain_encoder).encode(doc)
+
+
+def wants_ndjson():
+    """NDJSON is selected with ?format=ndjson or an Accept header"""
+    if request.args.get('format') == 'ndjson':
+        return True
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+
+def _chunked(parts):
+    buffer, size = [], 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def _json_array(docs, encoder):
+    yield '['
+    first = True
+    try:
+        for doc in docs:
+            text = encoder.encode(doc)
+            yield text if first else ',' + text
+            first = False
+    except Exception:
+        logger.exception("Response stream failed")
+        yield ('' if first else ',') + STREAM_ERROR + ']'
+        return
+    yield ']'
+
+
+def _json_page(page, encoder):
+    yield '{"items":['
+    first = True
+    try:
+        for doc in page:
+            text = encoder.encode(doc)
+            yield text if first else ',' + text
+            first = False
+    except Exception:
+        logger.exception("Response stream failed")
+        yield '],"next_cursor":null,' + STREAM_ERROR[1:]
+        return
+    # next_cursor is only known once the page has been consumed
+    yield '],"next_cursor":' + json.dumps(page.next_cursor) + '}'
+
+
+def _ndjson(docs, encoder):
+    """Yields the lines; returns False when the stream ended with an error line"""
+    try:
+        for doc in docs:
+            yield encoder.encode(doc) + '\n'
+    except Exception:
+        logger.exception("Response stream failed")
+        yield STREAM_ERROR + '\n'
+        return False
+    return True
+
+
+def _ndjson_page(page, encoder):
+    if (yield from _ndjson(page, encoder)):
+        yield json.dumps({"next_cursor": page.next_cursor}) + '\n'
+
+
+def stream_page(page, extended=True):
+    """Stream a Page straight from its Mongo cursor.
+
+    JSON responses have the shape {"items": [...], "next_cursor": ...}. NDJSON
+    responses carry one document per line followed by a final
+    {"next_cursor": ...} line. A failure midway ends the body with
+    STREAM_ERROR instead, as a last line or an "error" member.
+    """
+    encoder = extended_encoder if extended else plain_encoder
+    if wants_ndjson():
+        body, mimetype = _ndjson_page(page, encoder), NDJSON_MIMETYPE
+    else:
+        body, mimetype = _json_page(page, encoder), 'application/json'
+    return Response(stream_with_context(_chunked(body)), mimetype=mimetype)
+
+
+def stream_list(docs, extended=True):
+    """Stream an iterable of documents as a JSON array or NDJSON"""
+    encoder = extended_encoder if extended else plain_encoder
+    if wants_ndjson():
+        body, mimetype = _ndjson(docs, encoder), NDJSON_MIMETYPE
+    else:
+        body, mimetype = _json_array(docs, encoder), 'application/json'
+    return Response(stream_with_context(_chunked(body)), mimetype=mimetype)
+
+
+def json_document(doc, status=200, extended=True):
+    """Serialize a single document without the json_util dumps/loads round trip"""
+    return Response(to_json(doc, extended), status=status, mimetype='application/json')
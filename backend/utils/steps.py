@@ -0,0 +1,73 @@
+"""Service methods written once for pymongo and motor.
+
+A method decorated with @steps is a generator that yields each Mongo call (or
+call of another service) and gets its result back. The sync services run it
+straight through, since pymongo calls return their results; the async
+services await every awaitable it yields and throw failures back in at the
+yield, so try/except around a call works the same way in both.
+"""
+import inspect
+from functools import wraps
+
+from utils.ingest import insert_unordered, insert_unordered_async
+from utils.pagination import AsyncMergedCursor, AsyncPage, MergedCursor, Page, apaginate, paginate
+
+
+def run_sync(steps):
+    value = None
+    while True:
+        try:
+            value = steps.send(value)
+        except StopIteration as stop:
+            return stop.value
+
+
+async def run_async(steps):
+    value, error = None, None
+    while True:
+        try:
+            value = steps.throw(error) if error is not None else steps.send(value)
+        except StopIteration as stop:
+            return stop.value
+        error = None
+        if inspect.isawaitable(value):
+            try:
+                value = await value
+            except Exception as e:
+                value, error = None, e
+
+
+def steps(method):
+    """Run a generator method with its service's run_steps (run_sync or run_async)"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self.run_steps(method(self, *args, **kwargs))
+    return wrapper
+
+
+class SyncIO:
+    """I/O hooks of the services on pymongo"""
+
+    run_steps = staticmethod(run_sync)
+    insert_unordered = staticmethod(insert_unordered)
+    paginate = staticmethod(paginate)
+    page_class = Page
+    merged_cursor_class = MergedCursor
+
+    @staticmethod
+    def to_list(cursor):
+        return list(cursor)
+
+
+class AsyncIO:
+    """I/O hooks of the services on motor, listed before the sync service in the bases"""
+
+    run_steps = staticmethod(run_async)
+    insert_unordered = staticmethod(insert_unordered_async)
+    paginate = staticmethod(apaginate)
+    page_class = AsyncPage
+    merged_cursor_class = AsyncMergedCursor
+
+    @staticmethod
+    def to_list(cursor):
+        return cursor.to_list(None)
@@ -1,4 +1,8 @@
-from app import app
+from app import create_app
+
+# Creating the app does not connect to Mongo, so gunicorn --preload can build
+# it once in the master and fork workers that share the imported code
+app = create_app()
 
 if __name__ == "__main__":
-    app.run() 
\ No newline at end of file
+    app.run()
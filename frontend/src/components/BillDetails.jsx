@@ -44,11 +44,22 @@ const StatusHistoryItem = ({ update, index, onEdit, bill }) => {
 
   const handleEdit = async () => {
     try {
-      await api.updateStatusEntry(bill._id, actualIndex, editData);
+      const data = { ...editData, version: bill.version };
+      // Entries written before entry ids existed can only be addressed by position
+      if (update.entry_id) {
+        await api.updateStatusEntryById(bill._id, update.entry_id, data);
+      } else {
+        await api.updateStatusEntry(bill._id, actualIndex, data);
+      }
       onEdit(); // Refresh bill data
       setIsEditing(false);
     } catch (err) {
-      setError('Failed to update status');
+      if (err.response?.status === 409) {
+        setError(err.response.data.error);
+        onEdit();
+      } else {
+        setError('Failed to update status');
+      }
     }
   };
 
@@ -202,7 +213,7 @@ const BillDetails = () => {
   useEffect(() => {
     const fetchBill = async () => {
       try {
-        const data = await api.getBill(billId);
+        const data = await api.getBill(billId, { fullHistory: true });
         setBill(data);
       } catch (err) {
         setError('Failed to fetch bill details');
@@ -259,9 +270,10 @@ const BillDetails = () => {
         date: statusDate,
         remarks: remarks,
         reference_number: statusFields.reference_number,
-        approved_amount: statusFields.approved_amount
+        approved_amount: statusFields.approved_amount,
+        version: bill.version
       });
-      const updatedBill = await api.getBill(billId);
+      const updatedBill = await api.getBill(billId, { fullHistory: true });
       setBill(updatedBill);
       setSuccess('Status updated successfully');
       setNewStatus('');
@@ -272,13 +284,18 @@ const BillDetails = () => {
       });
       setRemarks('');
     } catch (err) {
-      setError('Failed to update status');
+      if (err.response?.status === 409) {
+        setError(err.response.data.error);
+        setBill(await api.getBill(billId, { fullHistory: true }));
+      } else {
+        setError('Failed to update status');
+      }
     }
   };
 
   const handleStatusEdit = async () => {
     try {
-      const updatedBill = await api.getBill(billId);
+      const updatedBill = await api.getBill(billId, { fullHistory: true });
       setBill(updatedBill);
     } catch (err) {
       setError('Failed to refresh bill details');
@@ -498,7 +515,7 @@ const BillDetails = () => {
                   .reverse()
                   .map((update, index) => (
                     <StatusHistoryItem 
-                      key={`${update.status}-${update.date}-${index}`}
+                      key={update.entry_id || `${update.status}-${update.date}-${index}`}
                       update={update} 
                       index={index} 
                       onEdit={handleStatusEdit} 
@@ -1,6 +1,6 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { PlusIcon, PencilIcon, TrashIcon, EyeIcon } from '@heroicons/react/24/outline';
+import { PlusIcon, PencilIcon, TrashIcon, EyeIcon, ArrowDownTrayIcon } from '@heroicons/react/24/outline';
 import api from '../services/api';
 import FilterPanel from './FilterPanel';
 import { formatDate, formatAmount } from '../utils/formatters';
@@ -8,15 +8,27 @@ import { formatDate, formatAmount } from '../utils/formatters';
 const BillList = () => {
   const navigate = useNavigate();
   const [bills, setBills] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [activeFilters, setActiveFilters] = useState({});
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
   const [success, setSuccess] = useState('');
+  // Change feed position of the loaded list; syncStart restarts the live stream on every full load
+  const syncToken = useRef(null);
+  const [syncStart, setSyncStart] = useState(null);
   
   const fetchBills = async (filters = {}) => {
     setLoading(true);
     try {
-      const data = await api.filterBills(filters);
-      setBills(data);
+      // The token is taken first so writes made while the list loads are synced afterwards
+      const { token } = await api.getBillChanges();
+      const data = await api.filterBills(filters, null, { fields: 'summary' });
+      setBills(data.items);
+      setNextCursor(data.next_cursor);
+      setActiveFilters(filters);
+      syncToken.current = token;
+      setSyncStart({ token, filters });
     } catch (err) {
       setError('Failed to fetch bills');
     } finally {
@@ -24,10 +36,48 @@ const BillList = () => {
     }
   };
 
+  const applyChanges = (changes) => {
+    setBills((prev) => api.applyBillChanges(prev, changes));
+    syncToken.current = changes.token;
+  };
+
+  // Fetches only the bills changed since the last sync instead of reloading the list
+  const syncBills = async () => {
+    try {
+      let changes;
+      do {
+        changes = await api.getBillChanges(syncToken.current, activeFilters);
+        applyChanges(changes);
+      } while (changes.has_more);
+    } catch (err) {
+      if (err.response?.status === 410) fetchBills(activeFilters);
+      else setError('Failed to refresh bills');
+    }
+  };
+
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const data = await api.filterBills(activeFilters, nextCursor, { fields: 'summary' });
+      setBills((prev) => [...prev, ...data.items]);
+      setNextCursor(data.next_cursor);
+    } catch (err) {
+      setError('Failed to fetch bills');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     fetchBills();
   }, []);
 
+  useEffect(() => {
+    if (!syncStart) return undefined;
+    return api.subscribeBillChanges(syncStart.token, syncStart.filters, applyChanges);
+  }, [syncStart]);
+
   const handleFilter = (filters) => {
     fetchBills(filters);
   };
@@ -41,7 +91,7 @@ const BillList = () => {
       try {
         await api.deleteBill(billId);
         setSuccess('Bill deleted successfully');
-        fetchBills();
+        syncBills();
       } catch (err) {
         setError('Failed to delete bill');
       }
@@ -53,13 +103,25 @@ const BillList = () => {
       <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8">
         <div className="flex justify-between items-center mb-6">
           <h1 className="text-2xl font-semibold text-gray-900">Medical Bills</h1>
-          <button
-            onClick={() => navigate('/bills/create')}
-            className="inline-flex items-center px-4 py-2 bg-primary-600 text-white rounded-lg hover:bg-primary-700"
-          >
-            <PlusIcon className="h-5 w-5 mr-2" />
-            Add Bill
-          </button>
+          <div className="flex items-center gap-2">
+            {['csv', 'xlsx'].map(format => (
+              <a
+                key={format}
+                href={api.exportBillsUrl(activeFilters, format)}
+                className="inline-flex items-center px-4 py-2 border border-gray-300 text-gray-700 rounded-lg hover:bg-gray-50"
+              >
+                <ArrowDownTrayIcon className="h-5 w-5 mr-2" />
+                Export {format.toUpperCase()}
+              </a>
+            ))}
+            <button
+              onClick={() => navigate('/bills/create')}
+              className="inline-flex items-center px-4 py-2 bg-primary-600 text-white rounded-lg hover:bg-primary-700"
+            >
+              <PlusIcon className="h-5 w-5 mr-2" />
+              Add Bill
+            </button>
+          </div>
         </div>
 
         <div className="mb-8">
@@ -191,6 +253,17 @@ const BillList = () => {
                 </tbody>
               </table>
             </div>
+            {nextCursor && (
+              <div className="px-4 py-3 border-t border-gray-200 text-center">
+                <button
+                  onClick={loadMore}
+                  disabled={loadingMore}
+                  className="px-4 py-2 text-sm text-primary-600 hover:text-primary-800 disabled:opacity-50"
+                >
+                  {loadingMore ? 'Loading...' : 'Load more'}
+                </button>
+              </div>
+            )}
           </div>
         )}
       </div>
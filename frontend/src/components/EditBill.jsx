@@ -2,6 +2,7 @@ import { useState, useEffect } from 'react';
 import { useNavigate, useParams } from 'react-router-dom';
 import api from '../services/api';
 import { HOSPITALS } from '../utils/constants';
+import { toDateInput } from '../utils/formatters';
 
 const EditBill = () => {
   const { billId } = useParams();
@@ -34,9 +35,9 @@ const EditBill = () => {
 
         const formattedBill = {
           ...billData,
-          receipt_date: billData.receipt_date?.split('T')[0],
-          treatment_period_from: billData.treatment_period_from?.split('T')[0],
-          treatment_period_to: billData.treatment_period_to?.split('T')[0],
+          receipt_date: toDateInput(billData.receipt_date),
+          treatment_period_from: toDateInput(billData.treatment_period_from),
+          treatment_period_to: toDateInput(billData.treatment_period_to),
         };
 
         setBill(formattedBill);
@@ -112,7 +113,7 @@ const EditBill = () => {
                 </label>
                 <input
                   type="date"
-                  value={bill.receipt_date?.split('T')[0]}
+                  value={toDateInput(bill.receipt_date)}
                   onChange={(e) => setBill(prev => ({ ...prev, receipt_date: e.target.value }))}
                   className="w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-primary-500 focus:border-primary-500"
                   required
@@ -172,7 +173,7 @@ const EditBill = () => {
                 </label>
                 <input
                   type="date"
-                  value={bill.treatment_period_from?.split('T')[0]}
+                  value={toDateInput(bill.treatment_period_from)}
                   onChange={(e) => setBill(prev => ({ ...prev, treatment_period_from: e.target.value }))}
                   className="w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-primary-500 focus:border-primary-500"
                   required
@@ -185,7 +186,7 @@ const EditBill = () => {
                 </label>
                 <input
                   type="date"
-                  value={bill.treatment_period_to?.split('T')[0]}
+                  value={toDateInput(bill.treatment_period_to)}
                   onChange={(e) => setBill(prev => ({ ...prev, treatment_period_to: e.target.value }))}
                   className="w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-primary-500 focus:border-primary-500"
                   required
@@ -19,7 +19,8 @@ const FilterPanel = ({ onFilter, onReset }) => {
       status: '',
       number: ''
     },
-    hospital: ''
+    hospital: '',
+    include_archived: false
   });
 
   const [activeFiltersCount, setActiveFiltersCount] = useState(0);
@@ -28,7 +29,7 @@ const FilterPanel = ({ onFilter, onReset }) => {
   useEffect(() => {
     const fetchEmployees = async () => {
       try {
-        const data = await api.getEmployees();
+        const data = await api.getEmployees('dropdown');
         setEmployees(data);
       } catch (err) {
         console.error('Failed to fetch employees:', err);
@@ -38,7 +39,8 @@ const FilterPanel = ({ onFilter, onReset }) => {
   }, []);
 
   const handleChange = (e) => {
-    const { name, value } = e.target;
+    const { name, type, checked } = e.target;
+    const value = type === 'checkbox' ? checked : e.target.value;
     if (name.includes('.')) {
       const [parent, child] = name.split('.');
       setFilters(prev => ({
@@ -81,7 +83,8 @@ const FilterPanel = ({ onFilter, onReset }) => {
         status: '',
         number: ''
       },
-      hospital: ''
+      hospital: '',
+      include_archived: false
     });
     setActiveFiltersCount(0);
     onReset();
@@ -234,6 +237,22 @@ const FilterPanel = ({ onFilter, onReset }) => {
                     />
                   </div>
                 </div>
+
+                <div>
+                  <label className="form-label">Archive</label>
+                  <label className="flex items-center space-x-2 text-sm text-gray-700">
+                    <input
+                      type="checkbox"
+                      name="include_archived"
+                      checked={filters.include_archived}
+                      onChange={handleChange}
+                    />
+                    <span>Include archived bills</span>
+                  </label>
+                  <p className="mt-1 text-xs text-gray-500">
+                    Date range and Passed/Rejected filters always search the archive
+                  </p>
+                </div>
               </div>
             </div>
           </div>
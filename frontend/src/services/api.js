@@ -4,23 +4,90 @@ const api = axios.create({
   baseURL: import.meta.env.VITE_API_URL || 'http://localhost:5000',
   headers: {
     'Content-Type': 'application/json'
+  },
+  // 304 Not Modified is answered from the validator cache below
+  validateStatus: (status) => (status >= 200 && status < 300) || status === 304
+});
+
+// Conditional GETs: remember the ETag and body of each GET response and send
+// If-None-Match next time. On 304 the cached body is returned instead.
+const validatorCache = new Map();
+
+api.interceptors.request.use((config) => {
+  if ((config.method || 'get').toLowerCase() === 'get') {
+    const cached = validatorCache.get(api.getUri(config));
+    if (cached) {
+      config.headers['If-None-Match'] = cached.etag;
+    }
   }
+  return config;
+});
+
+api.interceptors.response.use((res) => {
+  if ((res.config.method || 'get').toLowerCase() !== 'get') return res;
+  const key = api.getUri(res.config);
+  if (res.status === 304) {
+    const cached = validatorCache.get(key);
+    if (cached) res.data = cached.data;
+  } else if (res.headers.etag) {
+    validatorCache.set(key, { etag: res.headers.etag, data: res.data });
+  }
+  return res;
 });
 
 // Employee endpoints
-const getEmployees = () => api.get('/api/employees').then(res => res.data);
+// fields: a view ('dropdown' is employee_id and name) or a list of field names
+const getEmployees = (fields) =>
+  api.get('/api/employees', { params: { fields: [].concat(fields || []).join(',') || undefined } }).then(res => res.data);
 const getEmployee = (id) => api.get(`/api/employees/${id}`).then(res => res.data);
-const createEmployee = (data) => api.post('/api/employees', data).then(res => res.data);
+// Creates carry an Idempotency-Key and are retried with it when the response is lost
+// (network error) or the first attempt is still running (409): the server replays
+// the stored response instead of creating the record twice.
+const CREATE_RETRIES = 3;
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+const postIdempotent = async (url, data) => {
+  const headers = { 'Idempotency-Key': crypto.randomUUID() };
+  for (let attempt = 1; ; attempt++) {
+    try {
+      return (await api.post(url, data, { headers })).data;
+    } catch (err) {
+      const retryable = !err.response || err.response.status === 409;
+      if (!retryable || attempt > CREATE_RETRIES) throw err;
+      await sleep(500 * attempt);
+    }
+  }
+};
+
+const createEmployee = (data) => postIdempotent('/api/employees', data);
 const updateEmployee = (id, data) => api.put(`/api/employees/${id}`, data).then(res => res.data);
 const deleteEmployee = (id) => api.delete(`/api/employees/${id}`).then(res => res.data);
 
+// Bulk imports take a CSV or NDJSON File and resolve to { inserted, failed, errors }
+const uploadFile = (url, file) => {
+  const formData = new FormData();
+  formData.append('file', file);
+  return api.post(url, formData, {
+    headers: { 'Content-Type': 'multipart/form-data' },
+    validateStatus: (status) => status === 200 || status === 207
+  }).then(res => res.data);
+};
+const bulkCreateEmployees = (file) => uploadFile('/api/employees/bulk', file);
+
 // Bill endpoints
-const getBills = () => api.get('/api/bills').then(res => res.data);
-const getBill = (id) => {
+// List endpoints return one page: { items, next_cursor }. Pass next_cursor back to fetch the next page.
+// options.fields: a view ('summary' has the list columns) or a list of field names
+const getBills = (cursor, { fields } = {}) =>
+  api.get('/api/bills', { params: { cursor, fields: [].concat(fields || []).join(',') || undefined } })
+    .then(res => res.data);
+// options.fullHistory also loads status history stored outside the bill
+const getBill = (id, { fullHistory = false } = {}) => {
   const billId = typeof id === 'object' ? id.$oid : id;
-  return api.get(`/api/bills/${billId}`).then(res => res.data);
+  const params = fullHistory ? { history: 'full' } : undefined;
+  return api.get(`/api/bills/${billId}`, { params }).then(res => res.data);
 };
-const createBill = (data) => api.post('/api/bills', data).then(res => res.data);
+const createBill = (data) => postIdempotent('/api/bills', data);
+const bulkCreateBills = (file) => uploadFile('/api/bills/bulk', file);
 const updateBill = (id, data) => {
   // Create a clean copy of data without _id
   const cleanData = { ...data };
@@ -33,7 +100,12 @@ const deleteBill = (id) => {
   const billId = typeof id === 'object' ? id.$oid : id;
   return api.delete(`/api/bills/${billId}`).then(res => res.data);
 };
-const getEmployeeBills = (employeeId) => api.get(`/api/employees/${employeeId}/bills`).then(res => res.data);
+const getEmployeeBills = (employeeId, cursor) => 
+  api.get(`/api/employees/${employeeId}/bills`, { params: { cursor } }).then(res => res.data);
+// Employee plus bill counts and totals by status and dependent and the most recent bills:
+// { employee, bills: { total, by_status, by_dependent, recent } }
+const getEmployeeProfile = (employeeId, limit) =>
+  api.get(`/api/employees/${employeeId}/profile`, { params: { limit } }).then(res => res.data);
 
 // Bill status endpoints
 const updateBillStatus = (id, statusData) => {
@@ -41,29 +113,96 @@ const updateBillStatus = (id, statusData) => {
   return api.put(`/api/bills/${billId}/status`, statusData).then(res => res.data);
 };
 
-const getBillsByStatus = (status) => api.get(`/api/bills/status/${status}`).then(res => res.data);
+// Moves many bills to one status in a single request; resolves to { updated, results }
+const updateBillsStatusBatch = (billIds, statusData) => 
+  api.put('/api/bills/status/batch', { ...statusData, bill_ids: billIds }).then(res => res.data);
+
+const getBillsByStatus = (status, cursor) => 
+  api.get(`/api/bills/status/${status}`, { params: { cursor } }).then(res => res.data);
 
-const filterBills = (filters) => api.post('/api/bills/filter', filters).then(res => res.data);
+// Dashboard totals grouped by status, sub_division, hospital and month
+const getBillStats = () => api.get('/api/bills/stats').then(res => res.data);
+
+const filterBills = (filters, cursor, { fields } = {}) =>
+  api.post('/api/bills/filter', { ...filters, cursor, fields }).then(res => res.data);
+
+// Download link for the bills matching a filter payload, streamed by the server as CSV or XLSX
+const exportBillsUrl = (filters, format = 'csv') =>
+  api.getUri({ url: '/api/bills/export', params: { format, filter: JSON.stringify(filters || {}) } });
+
+// Change feed. getBillChanges() without a token returns a starting { token }; take it
+// before loading a list, then fetch { upserts, removed, deleted, token, has_more } since it.
+// A 410 means the token is too old and the list has to be reloaded.
+// Days spent per status (p50/p90/p95/max) overall and per sub-division, and the bills
+// waiting longer than thresholdDays in their current status
+const getBillAging = (thresholdDays, status) =>
+  api.get('/api/bills/aging', { params: { threshold_days: thresholdDays, status } }).then(res => res.data);
+
+const getBillChanges = (since, filters) =>
+  api.get('/api/bills/changes', {
+    params: { since, filter: filters ? JSON.stringify(filters) : undefined }
+  }).then(res => res.data);
+
+// Pushes the same deltas over Server-Sent Events; returns a function that closes the stream
+const subscribeBillChanges = (since, filters, onChanges, onError) => {
+  const source = new EventSource(api.getUri({
+    url: '/api/bills/changes/stream', params: { since, filter: JSON.stringify(filters || {}) }
+  }));
+  source.addEventListener('changes', (event) => onChanges(JSON.parse(event.data)));
+  if (onError) source.onerror = () => {
+    // The browser reconnects by itself unless the server refused the stream
+    if (source.readyState === EventSource.CLOSED) onError();
+  };
+  return () => source.close();
+};
+
+const billKey = (bill) => bill._id.$oid;
+
+// Applies a delta to a list sorted by updated_at, newest first. Deltas can be applied more
+// than once; a changed bill moves to the top like it would in a fresh listing.
+const applyBillChanges = (bills, changes) => {
+  const dropped = new Set(
+    [...changes.removed, ...changes.deleted, ...changes.upserts.map(bill => bill._id)].map(id => id.$oid)
+  );
+  return [...changes.upserts, ...bills.filter(bill => !dropped.has(billKey(bill)))];
+};
 
 const updateStatusEntry = (billId, statusIndex, data) => {
   const actualBillId = typeof billId === 'object' ? billId.$oid : billId;
   return api.put(`/api/bills/${actualBillId}/status/${statusIndex}`, data).then(res => res.data);
 };
 
+// Edits one history entry by its entry_id; pass the bill's version to get a 409 on conflicting edits
+const updateStatusEntryById = (billId, entryId, data) => {
+  const actualBillId = typeof billId === 'object' ? billId.$oid : billId;
+  return api.put(`/api/bills/${actualBillId}/status/entries/${entryId}`, data).then(res => res.data);
+};
+
 export default {
   getEmployees,
   getEmployee,
   createEmployee,
   updateEmployee,
   deleteEmployee,
+  bulkCreateEmployees,
   getBills,
   getBill,
   createBill,
+  bulkCreateBills,
   updateBill,
   deleteBill,
   getEmployeeBills,
+  getEmployeeProfile,
   updateBillStatus,
+  updateBillsStatusBatch,
   getBillsByStatus,
   filterBills,
-  updateStatusEntry
+  exportBillsUrl,
+  getBillAging,
+  getBillChanges,
+  subscribeBillChanges,
+  applyBillChanges,
+  getBillStats,
+  updateStatusEntry,
+  updateStatusEntryById
 }; 
\ No newline at end of file
@@ -36,6 +36,15 @@ export const formatDateTime = (dateString) => {
   });
 };
 
+// Value for an <input type="date">: the UTC date part of an ISO string or { $date }
+export const toDateInput = (value) => {
+  if (!value) return '';
+  if (typeof value === 'object' && value.$date) {
+    value = value.$date;
+  }
+  return typeof value === 'string' ? value.split('T')[0] : '';
+};
+
 export const formatAmount = (amount) => {
   if (!amount) return '₹0.00';
   